@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI 
 from controllers.health_controller import router as health_router
 from controllers.prediction_controller import router as prediction_router
@@ -5,17 +6,32 @@ from controllers.labels_controller import router as labels_router
 from controllers.image_controller import router as image_router
 from controllers.user_controller import router as user_router
 from controllers.stats_controller import router as stats_router
+from controllers.metrics_controller import router as metrics_router
+from controllers.export_controller import router as export_router
+from controllers.auth_controller import router as auth_router
 from db.utils import init_db
 import os
 
-# Disable GPU usage
-import torch
-torch.cuda.is_available = lambda: False
+from services.yolo_service import start_warmup, WARMUP_IMAGE_SIZES
+from services.inference_profiles import profile_image_sizes
+from services.upload_queue import upload_queue
 
-app = FastAPI()
 
-# Initialize database
-init_db()
+@asynccontextmanager
+async def lifespan(app):
+    # Load and warm the model up in the background; /ready reports when it's done
+    start_warmup(sorted(set(WARMUP_IMAGE_SIZES) | profile_image_sizes()))
+    # Resume the predicted-image uploads left queued by a previous run
+    upload_queue.start()
+    yield
+
+
+app = FastAPI(lifespan=lifespan)
+
+# Initialize database. Spawned child processes re-run `python app.py` as __mp_main__ and must
+# not drop the tables; uvicorn's --reload and --workers processes import this module as `app`
+if __name__ != "__mp_main__":
+    init_db()
 
 # Import middleware to ensure registration
 import middlewares.auth
@@ -27,6 +43,9 @@ app.include_router(labels_router)
 app.include_router(image_router)
 app.include_router(user_router)
 app.include_router(stats_router)
+app.include_router(metrics_router)
+app.include_router(export_router)
+app.include_router(auth_router)
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,46 @@
+"""
+Compare inference latency of the torch, ONNX Runtime and OpenVINO backends.
+
+Usage: python -m benchmarks.backend_latency [image ...] [--runs N] [--batch N]
+"""
+import argparse
+import importlib.util
+import statistics
+import time
+from services.model_backends import load_model, BACKENDS
+from services.yolo_service import MODEL_NAME
+
+RUNTIME_MODULES = {"torch": "torch", "onnx": "onnxruntime", "openvino": "openvino"}
+
+
+def measure(model, images, runs, batch):
+    model(images[:batch], device="cpu", batch=batch, verbose=False)  # warmup
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        model(images[:batch], device="cpu", batch=batch, verbose=False)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="*", default=["tests/assets/cat.jpg", "tests/assets/bear.jpg"])
+    parser.add_argument("--runs", type=int, default=20)
+    parser.add_argument("--batch", type=int, default=1)
+    args = parser.parse_args()
+    images = (args.images * args.batch)[:max(args.batch, len(args.images))]
+
+    print(f"{'backend':<10} {'median ms':>10} {'p90 ms':>10} {'images/s':>10}")
+    for backend in BACKENDS:
+        if not importlib.util.find_spec(RUNTIME_MODULES[backend]):
+            print(f"{backend:<10} {'skipped (runtime not installed)':>32}")
+            continue
+        timings = sorted(measure(load_model(MODEL_NAME, backend), images, args.runs, args.batch))
+        median = statistics.median(timings)
+        p90 = timings[int(len(timings) * 0.9) - 1]
+        print(f"{backend:<10} {median:>10.1f} {p90:>10.1f} {args.batch * 1000 / median:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Measure the per-request S3 overhead (download the original + upload the annotated image)
+with a new client per request (the old behaviour) and with the shared, pooled client.
+
+Runs against a local moto S3 server unless --endpoint-url points to another S3 (e.g. MinIO).
+
+Usage: python -m benchmarks.s3_overhead [image] [--requests N] [--endpoint-url URL]
+"""
+import argparse
+import io
+import os
+import logging
+import statistics
+import time
+
+
+def before(endpoint_url, key, data):
+    import boto3
+    s3 = boto3.client("s3", endpoint_url=endpoint_url)
+    buffer = io.BytesIO()
+    s3.download_fileobj(BUCKET, key, buffer)
+    s3.upload_fileobj(io.BytesIO(data), BUCKET, key.replace("/original/", "/predicted/"))
+
+
+def after(endpoint_url, key, data):
+    download_from_s3(get_s3_client(), key)
+    upload_to_s3(get_s3_client(), key.replace("/original/", "/predicted/"), data)
+
+
+def measure(request, endpoint_url, key, data, requests):
+    request(endpoint_url, key, data)  # warmup
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        request(endpoint_url, key, data)
+        timings.append((time.perf_counter() - start) * 1000)
+    return sorted(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("image", nargs="?", default="tests/assets/cat.jpg")
+    parser.add_argument("--requests", type=int, default=50)
+    parser.add_argument("--endpoint-url", default=None)
+    args = parser.parse_args()
+
+    server = None
+    endpoint_url = args.endpoint_url
+    if endpoint_url is None:
+        from moto.server import ThreadedMotoServer
+        for name in ("AWS_ACCESS_KEY_ID", "AWS_SECRET_ACCESS_KEY"):
+            os.environ.setdefault(name, "testing")
+        os.environ.setdefault("AWS_DEFAULT_REGION", "us-east-1")
+        logging.getLogger("werkzeug").setLevel(logging.ERROR)
+        server = ThreadedMotoServer(port=0, verbose=False)
+        server.start()
+        host, port = server.get_host_and_port()
+        endpoint_url = f"http://{host}:{port}"
+    os.environ["S3_ENDPOINT_URL"] = endpoint_url
+
+    # imported after S3_ENDPOINT_URL is set, the settings are read at import time
+    global BUCKET, get_s3_client, download_from_s3, upload_to_s3
+    from services.s3_service import S3_BUCKET as BUCKET, get_s3_client, download_from_s3, upload_to_s3
+
+    with open(args.image, "rb") as f:
+        data = f.read()
+    key = "benchmark/original/" + os.path.basename(args.image)
+    if server is not None:
+        get_s3_client().create_bucket(Bucket=BUCKET)
+    upload_to_s3(get_s3_client(), key, data)
+
+    try:
+        print(f"{'client':<22} {'median ms':>10} {'p90 ms':>10}")
+        for name, request in (("new client/request", before), ("shared pooled client", after)):
+            timings = measure(request, endpoint_url, key, data, args.requests)
+            p90 = timings[int(len(timings) * 0.9) - 1]
+            print(f"{name:<22} {statistics.median(timings):>10.1f} {p90:>10.1f}")
+    finally:
+        if server is not None:
+            server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+"""
+Compare tiled (sliced) inference against single-pass inference: latency and detection count.
+
+Usage: python -m benchmarks.tiled_inference [image ...] [--runs N] [--tile-size N] [--overlap N] [--batch N]
+"""
+import argparse
+import statistics
+import time
+from services.prediction_service import decode_image
+from services.tiling import run_tiled_inference, TILE_SIZE, TILE_OVERLAP, TILE_BATCH_SIZE
+from services.yolo_service import run_inference, warmup
+
+
+def measure(run, runs):
+    timings, detections = [], 0
+    for _ in range(runs):
+        start = time.perf_counter()
+        results = run()
+        timings.append((time.perf_counter() - start) * 1000)
+        detections = len(results[0].boxes)
+    return statistics.median(timings), detections
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("images", nargs="*", default=["tests/assets/cat.jpg", "tests/assets/bear.jpg"])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--tile-size", type=int, default=TILE_SIZE)
+    parser.add_argument("--overlap", type=int, default=TILE_OVERLAP)
+    parser.add_argument("--batch", type=int, default=TILE_BATCH_SIZE)
+    args = parser.parse_args()
+    warmup([args.tile_size])
+
+    print(f"{'image':<28} {'mode':<8} {'median ms':>10} {'detections':>11}")
+    for path in args.images:
+        with open(path, "rb") as f:
+            image = decode_image(f.read())
+        single = measure(lambda: run_inference(image, verbose=False), args.runs)
+        tiled = measure(lambda: run_tiled_inference(image, args.tile_size, args.overlap, args.batch, verbose=False),
+                        args.runs)
+        print(f"{path:<28} {'single':<8} {single[0]:>10.1f} {single[1]:>11}")
+        print(f"{'':<28} {'tiled':<8} {tiled[0]:>10.1f} {tiled[1]:>11}")
+
+
+if __name__ == "__main__":
+    main()
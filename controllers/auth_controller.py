@@ -0,0 +1,23 @@
+from fastapi import APIRouter, Depends, Body
+from sqlalchemy.orm import Session
+from db.utils import get_db
+from services.token_service import create_tokens, refresh_tokens
+
+router = APIRouter()
+
+@router.post("/auth/token")
+def create_token(username: str = Body(...),
+                 password: str = Body(...),
+                 db: Session = Depends(get_db)):
+    """
+    Exchange credentials for a short-lived bearer access token and a refresh token
+    """
+    return create_tokens(username, password, db)
+
+
+@router.post("/auth/refresh")
+def refresh_token(refresh_token: str = Body(..., embed=True), db: Session = Depends(get_db)):
+    """
+    Exchange a refresh token for a new pair of tokens
+    """
+    return refresh_tokens(refresh_token, db)
@@ -0,0 +1,16 @@
+from datetime import datetime
+from typing import Optional
+from fastapi import APIRouter, Query
+from services.export_service import export_predictions
+
+router = APIRouter()
+
+@router.get("/predictions/export")
+def export_predictions_endpoint(export_format: str = Query("ndjson", alias="format"),
+                                since: Optional[datetime] = None, until: Optional[datetime] = None,
+                                label: Optional[str] = None):
+    """
+    Stream prediction sessions joined with their detections (one row per detection)
+    as ndjson, csv, arrow or parquet, optionally in a time range or of one label
+    """
+    return export_predictions(export_format, since, until, label)
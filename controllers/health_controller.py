@@ -1,4 +1,6 @@
 from fastapi import APIRouter
+from fastapi.responses import JSONResponse
+from services.yolo_service import model_ready
 
 router = APIRouter()
 
@@ -8,3 +10,12 @@ def health():
     Health check endpoint
     """
     return {"status": "ok"}
+
+@router.get("/ready")
+def ready():
+    """
+    Readiness check endpoint: ready once the model is loaded and warmed up
+    """
+    if not model_ready.is_set():
+        return JSONResponse(status_code=503, content={"status": "warming_up"})
+    return {"status": "ready"}
@@ -1,18 +1,19 @@
-from fastapi import APIRouter,Depends
+from fastapi import APIRouter,Depends, Query, Request
 from sqlalchemy.orm import Session
 from services.labels_service import get_unique_labels
+from services.query_cache import etag_response
 from db.utils import get_db
 
 router = APIRouter()
 
 @router.get("/labels")
-def get_labels(db: Session = Depends(get_db)):
+def get_labels(request: Request, days: int = Query(7, ge=1), db: Session = Depends(get_db)):
     """
     Get all distinct labels detected in the last N days (default 7)
     """
-    labels = get_unique_labels(db)
+    labels = get_unique_labels(db, days)
     
     if not labels or len(labels) == 0:
-        return {"labels": []}
+        return etag_response(request, {"labels": []})
     
-    return {"labels": labels}
\ No newline at end of file
+    return etag_response(request, {"labels": labels})
\ No newline at end of file
@@ -0,0 +1,27 @@
+from fastapi import APIRouter
+from services.prediction_cache import prediction_cache
+from services.upload_queue import upload_queue
+from services.image_cache import image_cache
+from services.query_cache import query_cache
+from services.credential_cache import credential_cache
+from services.admission import prediction_admission
+from services.yolo_service import scheduler
+from services.prediction_jobs import job_queue
+
+router = APIRouter()
+
+@router.get("/metrics")
+def metrics():
+    """
+    Get runtime metrics of the service caches and background queues
+    """
+    return {
+        "prediction_cache": prediction_cache.stats(),
+        "upload_queue": upload_queue.stats(),
+        "image_cache": image_cache.stats(),
+        "query_cache": query_cache.stats(),
+        "credential_cache": credential_cache.stats(),
+        "admission": prediction_admission.stats(),
+        "inference_lanes": scheduler.stats(),
+        "prediction_jobs": job_queue.stats(),
+    }
@@ -1,4 +1,8 @@
-from fastapi import APIRouter, HTTPException, UploadFile, File, Request,Depends
+from datetime import datetime
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException, UploadFile, File, Request,Depends, Query, Body
+from fastapi.responses import JSONResponse, Response
+from pydantic import BaseModel
 from sqlalchemy.orm import Session
 from db.utils import get_db
 from services.prediction_service import (
@@ -8,39 +12,117 @@ from services.prediction_service import (
     delete_prediction_by_uid,
     get_all_predictions_by_label,
     get_all_predictions_by_score,
+    get_predictions_by_region,
+    get_predictions_by_min_area,
     get_prediction_image_by_uid
 )
+from services.prediction_jobs import enqueue_prediction
+from services.batch_prediction import create_batch_prediction, resolve_batch_items
+from services.s3_service import get_s3_client
+from services.query_cache import etag_response
+from services.admission import admit_prediction, admit_batch_prediction, charge_predictions
+from services.inference_profiles import resolve_inference_params
+from services.priority_lanes import request_priority, DeadlineExceeded, BULK
 
 router = APIRouter()
 
-@router.post("/predict")
-def predict(chat_id: str,img_name: str, request: Request = None, db: Session = Depends(get_db)):
+@router.post("/predict", dependencies=[Depends(admit_prediction)])
+def predict(chat_id: str,img_name: str, request: Request = None, db: Session = Depends(get_db),
+            async_mode: bool = Query(False, alias="async"),
+            profile: Optional[str] = None,
+            imgsz: Optional[int] = None,
+            conf: Optional[float] = None,
+            iou: Optional[float] = None,
+            classes: Optional[List[str]] = Query(None),
+            max_det: Optional[int] = None,
+            tiled: Optional[bool] = None):
     """
-    Predict objects in an image
+    Predict objects in an image.
+    Inference settings come from a named profile (e.g. fast, accurate) and/or explicit
+    imgsz, conf, iou, classes and max_det params, validated against the server allowlist.
+    With tiled=true large images are sliced into overlapping tiles to find small objects.
+    With ?async=true the prediction is queued and 202 is returned right away;
+    poll GET /prediction/{uid} for its status.
+    Over the per-user rate limit it returns 429, when the server is saturated 503 (both with Retry-After).
+    The X-Priority header (interactive, the default, or bulk) picks the queue lane, and
+    X-Deadline-Ms gives up with 504 when the prediction can't start within that many milliseconds.
     """
+    params = resolve_inference_params(profile, imgsz, conf, iou, classes, max_det, tiled)
+    request.state.inference_params = params
+    lane, deadline = request_priority(request)
+
+    if async_mode:
+        try:
+            user_id = getattr(request.state, "user_id", None)
+            job = enqueue_prediction(chat_id, img_name, user_id, db, params, lane=lane, deadline=deadline)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+        return JSONResponse(status_code=202, content=job,
+                            headers={"Location": f"/prediction/{job['prediction_uid']}"})
+
     try:    
        prediction = create_prediction(chat_id,img_name, request, db)
        return prediction
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=504, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
+class BatchItem(BaseModel):
+    chat_id: str
+    image_name: str
+
+
+@router.post("/predict/batch", dependencies=[Depends(admit_batch_prediction)])
+def predict_batch(request: Request,
+                  items: Optional[List[BatchItem]] = Body(None),
+                  prefix: Optional[str] = Body(None),
+                  db: Session = Depends(get_db),
+                  s3=Depends(get_s3_client),
+                  profile: Optional[str] = None,
+                  imgsz: Optional[int] = None,
+                  conf: Optional[float] = None,
+                  iou: Optional[float] = None,
+                  classes: Optional[List[str]] = Query(None),
+                  max_det: Optional[int] = None,
+                  tiled: Optional[bool] = None):
+    """
+    Predict many images in one request: either a list of {chat_id, image_name} items
+    or every original image under an S3 prefix (e.g. "chat123/").
+    Returns one result per image; failed images are reported with their error.
+    Runs in the bulk lane unless X-Priority says otherwise; with X-Deadline-Ms, images not
+    started in time fail with "Deadline exceeded".
+    A batch takes one prediction slot, and counts one prediction per image against the rate limit (429).
+    """
+    params = resolve_inference_params(profile, imgsz, conf, iou, classes, max_det, tiled)
+    lane, deadline = request_priority(request, default=BULK)
+    user_id = getattr(request.state, "user_id", None)
+    batch_items = resolve_batch_items(s3, [item.model_dump() for item in items or []], prefix)
+    charge_predictions(request, len(batch_items))
+    try:
+        return create_batch_prediction(batch_items, None, user_id, db, params, s3=s3, lane=lane, deadline=deadline)
+    except Exception as e:
+        status_code = getattr(e, "status_code", 500)
+        detail = getattr(e, "detail", f"Batch prediction failed: {str(e)}")
+        raise HTTPException(status_code=status_code, detail=detail)
+
 @router.get("/prediction/count")
-def prediction_count(db: Session = Depends(get_db)):
+def prediction_count(request: Request, days: int = Query(7, ge=1), db: Session = Depends(get_db)):
     """
-    Get the total count of prediction sessions from the last 7 days
+    Get the total count of prediction sessions from the last N days (default 7)
     """
-    return get_predictions_count(db)
+    return etag_response(request, get_predictions_count(db, days))
 
 
 @router.get("/prediction/{uid}")
-def get_prediction_by_uid(uid: str, db: Session = Depends(get_db)):
+def get_prediction_by_uid(uid: str, request: Request, db: Session = Depends(get_db)):
     """
     Get prediction session by uid with all detected objects
     """
     prediction = prediction_by_uid(uid, db)
     if not prediction:
         raise HTTPException(status_code=404, detail="Prediction not found")
-    return prediction
+    return etag_response(request, prediction)
 
 @router.delete("/prediction/{uid}")
 def delete_prediction(uid: str,db: Session = Depends(get_db)):
@@ -55,24 +137,57 @@ def delete_prediction(uid: str,db: Session = Depends(get_db)):
         raise HTTPException(status_code=status_code, detail=detail)
 
 @router.get("/predictions/label/{label}")
-def get_predictions_by_label(label: str,db: Session = Depends(get_db)):
+def get_predictions_by_label(label: str, response: Response, limit: Optional[int] = Query(None, ge=1),
+                             cursor: Optional[str] = None, since: Optional[datetime] = None,
+                             until: Optional[datetime] = None, db: Session = Depends(get_db)):
     """
-    Get prediction sessions containing objects with specified label
+    Get prediction sessions containing objects with specified label, newest first.
+    Pages hold `limit` sessions; the X-Next-Cursor header is the `cursor` of the next page
     """
-    predictions = get_all_predictions_by_label(label,db)
+    predictions, next_cursor = get_all_predictions_by_label(label, db, limit, cursor, since, until)
     if not predictions:
         raise HTTPException(status_code=404, detail="No predictions found for this label")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
     return predictions
 
 
 @router.get("/predictions/score/{min_score}")
-def get_predictions_by_score(min_score: float, db: Session = Depends(get_db)):
+def get_predictions_by_score(min_score: float, response: Response, limit: Optional[int] = Query(None, ge=1),
+                             cursor: Optional[str] = None, since: Optional[datetime] = None,
+                             until: Optional[datetime] = None, db: Session = Depends(get_db)):
     """
-    Get prediction sessions containing objects with score >= min_score
+    Get prediction sessions containing objects with score >= min_score, newest first.
+    Pages hold `limit` sessions; the X-Next-Cursor header is the `cursor` of the next page
     """
-    predictions = get_all_predictions_by_score(min_score, db)
+    predictions, next_cursor = get_all_predictions_by_score(min_score, db, limit, cursor, since, until)
     if not predictions:
         raise HTTPException(status_code=404, detail="No predictions found for this score")
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return predictions
+
+@router.get("/predictions/region")
+def get_predictions_in_region(x1: float, y1: float, x2: float, y2: float, contained: bool = False,
+                              label: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Get prediction sessions with objects overlapping the (x1, y1, x2, y2) pixel region,
+    or lying entirely inside it with contained=true; optionally only objects with a label
+    """
+    predictions = get_predictions_by_region(x1, y1, x2, y2, contained, label, db)
+    if not predictions:
+        raise HTTPException(status_code=404, detail="No predictions found in this region")
+    return predictions
+
+
+@router.get("/predictions/area/{min_area}")
+def get_predictions_by_area(min_area: float, db: Session = Depends(get_db)):
+    """
+    Get prediction sessions containing objects with a box area >= min_area (pixels)
+    """
+    predictions = get_predictions_by_min_area(min_area, db)
+    if not predictions:
+        raise HTTPException(status_code=404, detail="No predictions found for this area")
     return predictions
 
 # [ ] - add tests for get_prediction_image
@@ -1,16 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.orm import Session
 from db.utils import get_db
 from services.stats_service import get_stats_data
+from services.query_cache import etag_response
 
 router = APIRouter()
 
 @router.get("/stats")
-def stats_endpoint(db: Session = Depends(get_db)):
+def stats_endpoint(request: Request, days: int = Query(7, ge=1), db: Session = Depends(get_db)):
     """
     Get statistics about predictions in the last N days (default 7)
     """
     try:
-        return get_stats_data(db)
+        return etag_response(request, get_stats_data(db, days))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
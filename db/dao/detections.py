@@ -1,17 +1,56 @@
 from models.detection_object import DetectionObject
-from sqlalchemy import func
+from models.prediction_session import PredictionSession
+from datetime import datetime
+from sqlalchemy import func, insert, update
+from db.dao.stats import add_to_stats_rollups_dao
+
+def detection_row(prediction_uid, label, score, box):
+    """
+    Column values of a detection object; the box is stored both as text and as numeric columns
+    """
+    x1, y1, x2, y2 = (float(value) for value in box)
+    return {
+        "prediction_uid": prediction_uid,
+        "label": label,
+        "score": score,
+        "box": str(box),
+        "x1": x1,
+        "y1": y1,
+        "x2": x2,
+        "y2": y2,
+        "area": (x2 - x1) * (y2 - y1),
+    }
 
 def save_detection_object_dao(db,prediction_uid, label, score, box):
     """
     Save detection object to database
     """
-    row = DetectionObject(
-        prediction_uid=prediction_uid,
-        label=label,
-        score=score,
-        box=str(box)
-    )
+    row = DetectionObject(**detection_row(prediction_uid, label, score, box), timestamp=datetime.utcnow())
     db.add(row)
+    add_to_stats_rollups_dao(db, detections=[(row.timestamp, label, score)])
+    db.commit()
+
+def save_detection_objects_dao(db, prediction_uid, detections, session=None, session_update=None):
+    """
+    Save all detection objects of a prediction ({"label", "score", "box"} dicts) with one
+    executemany. When `session` (prediction session column -> value dict) is given, the
+    prediction session row is inserted in the same transaction: one commit per prediction.
+    `session_update` (column -> value dict) updates an existing session row in that transaction instead.
+    The stats rollups are updated in that transaction too.
+    """
+    now = datetime.utcnow()
+    if session is not None:
+        session = {"timestamp": now, **session}
+        db.execute(insert(PredictionSession), [{"uid": prediction_uid, **session}])
+    elif session_update:
+        db.execute(update(PredictionSession).where(PredictionSession.uid == prediction_uid).values(**session_update))
+    if detections:
+        db.execute(insert(DetectionObject), [
+            {**detection_row(prediction_uid, detection["label"], detection["score"], detection["box"]), "timestamp": now}
+            for detection in detections
+        ])
+    add_to_stats_rollups_dao(db, [session["timestamp"]] if session is not None else [],
+                             [(now, detection["label"], detection["score"]) for detection in detections])
     db.commit()
     
 def get_detection_objects_by_prediction_uid_dao(db, prediction_uid):
@@ -1,13 +1,64 @@
 from models.prediction_session import PredictionSession
 from models.detection_object import DetectionObject
+from datetime import datetime
+from sqlalchemy import insert, select, and_, or_
+from db.dao.stats import add_to_stats_rollups_dao, rebuild_stats_rollups_dao, hour_of, ONE_HOUR
 
-def save_prediction_session_dao(db,uid, original_image, predicted_image, user_id):
+def save_prediction_session_dao(db,uid, original_image, predicted_image, user_id, status="done",
+                                original_s3_key=None, predicted_s3_key=None, rendered=True, upload_status=None):
     """
     Save prediction session to database
     """
-    row = PredictionSession(uid=uid, predicted_image=predicted_image, original_image=original_image, user_id=user_id)
+    row = PredictionSession(uid=uid, predicted_image=predicted_image, original_image=original_image, user_id=user_id,
+                            status=status, original_s3_key=original_s3_key, predicted_s3_key=predicted_s3_key,
+                            rendered=rendered, upload_status=upload_status, timestamp=datetime.utcnow())
     
     db.add(row)
+    add_to_stats_rollups_dao(db, session_timestamps=[row.timestamp])
+    db.commit()
+
+def save_prediction_batch_dao(db, sessions, detections):
+    """
+    Save many prediction sessions and their detection objects in a single transaction.
+    `sessions` and `detections` are lists of column -> value dicts.
+    The stats rollups are updated in the same transaction.
+    """
+    now = datetime.utcnow()
+    sessions = [{"timestamp": now, **session} for session in sessions]
+    detections = [{"timestamp": now, **detection} for detection in detections]
+    if sessions:
+        db.execute(insert(PredictionSession), sessions)
+    if detections:
+        db.execute(insert(DetectionObject), detections)
+    add_to_stats_rollups_dao(db, [session["timestamp"] for session in sessions],
+                             [(detection["timestamp"], detection["label"], detection["score"]) for detection in detections])
+    db.commit()
+
+def update_prediction_status_dao(db, uid, status, error=None):
+    """
+    Update the status (and failure reason) of a prediction session
+    """
+    db.query(PredictionSession).filter(PredictionSession.uid == uid).update(
+        {PredictionSession.status: status, PredictionSession.error: error}
+    )
+    db.commit()
+
+def mark_prediction_rendered_dao(db, uid):
+    """
+    Mark the annotated image of a prediction session as rendered and queued for upload
+    """
+    db.query(PredictionSession).filter(PredictionSession.uid == uid).update(
+        {PredictionSession.rendered: True, PredictionSession.upload_status: "pending"}
+    )
+    db.commit()
+
+def update_upload_status_dao(db, uid, upload_status):
+    """
+    Record the outcome of the background upload of a prediction's annotated image
+    """
+    db.query(PredictionSession).filter(PredictionSession.uid == uid).update(
+        {PredictionSession.upload_status: upload_status}
+    )
     db.commit()
     
 def get_predictions_count_dao(db, timestamp=None):
@@ -23,24 +74,103 @@ def get_predictions_count_dao(db, timestamp=None):
 def get_prediction_by_uid_dao(db, uid):
     return db.query(PredictionSession).filter(PredictionSession.uid == uid).first()
 
+def get_prediction_by_image_path_dao(db, image_type, path):
+    """
+    Get the latest prediction session whose original or predicted image is stored at `path`
+    """
+    column = PredictionSession.original_image if image_type == "original" else PredictionSession.predicted_image
+    return db.query(PredictionSession).filter(column == path).order_by(PredictionSession.timestamp.desc()).first()
+
 def delete_prediction_by_uid_dao(db, uid):
     """
-    Delete prediction session by uid
+    Delete prediction session by uid, and recompute the stats rollups of the hours it was counted in
     """
+    timestamps = [row[0] for row in db.query(PredictionSession.timestamp).filter(PredictionSession.uid == uid)]
+    timestamps += [row[0] for row in db.query(DetectionObject.timestamp).filter(DetectionObject.prediction_uid == uid)]
     db.query(PredictionSession).filter(PredictionSession.uid == uid).delete()
     db.query(DetectionObject).filter(DetectionObject.prediction_uid == uid).delete()
+    for hour in sorted({hour_of(timestamp) for timestamp in timestamps if timestamp is not None}):
+        rebuild_stats_rollups_dao(db, hour, hour + ONE_HOUR)
     db.commit()
     
-def get_all_predictions_by_label_dao(db, label):
+def get_all_predictions_by_label_dao(db, label, limit=None, after=None, since=None, until=None):
     """
-    Get prediction sessions containing objects with specified label
+    Get prediction sessions containing objects with specified label, newest first
     """
-    return db.query(PredictionSession).join(DetectionObject).filter(DetectionObject.label == label).all()
+    return _sessions_with_detections(db, DetectionObject.label == label, limit, after, since, until)
+
+def get_all_predictions_by_score_dao(db, min_score, limit=None, after=None, since=None, until=None):
+    """
+    Get prediction sessions containing objects with score >= min_score, newest first
+    """
+    return _sessions_with_detections(db, DetectionObject.score >= min_score, limit, after, since, until)
+
+def _sessions_with_detections(db, condition, limit, after, since, until):
+    # One row per session (EXISTS instead of a join), walked in (timestamp, uid) order so a page
+    # starting after the (timestamp, uid) keyset `after` costs the same at any depth
+    matching = select(DetectionObject.id).where(DetectionObject.prediction_uid == PredictionSession.uid, condition)
+    query = db.query(PredictionSession).filter(matching.exists())
+    if since is not None:
+        query = query.filter(PredictionSession.timestamp >= since)
+    if until is not None:
+        query = query.filter(PredictionSession.timestamp < until)
+    if after is not None:
+        timestamp, uid = after
+        query = query.filter(or_(PredictionSession.timestamp < timestamp,
+                                 and_(PredictionSession.timestamp == timestamp, PredictionSession.uid < uid)))
+    query = query.order_by(PredictionSession.timestamp.desc(), PredictionSession.uid.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query.all()
 
-def get_all_predictions_by_score_dao(db, min_score):
+def get_predictions_by_region_dao(db, x1, y1, x2, y2, contained=False, label=None):
     """
-    Get prediction sessions containing objects with score >= min_score
+    Get prediction sessions with objects overlapping the (x1, y1, x2, y2) region,
+    or lying entirely inside it when contained=True
     """
-    return db.query(PredictionSession).join(DetectionObject).filter(DetectionObject.score >= min_score).all()    
+    if contained:
+        conditions = [DetectionObject.x1 >= x1, DetectionObject.y1 >= y1,
+                      DetectionObject.x2 <= x2, DetectionObject.y2 <= y2]
+    else:
+        conditions = [DetectionObject.x1 < x2, DetectionObject.x2 > x1,
+                      DetectionObject.y1 < y2, DetectionObject.y2 > y1]
+    if label is not None:
+        conditions.append(DetectionObject.label == label)
+    matching = select(DetectionObject.prediction_uid).where(*conditions)
+    return db.query(PredictionSession).filter(PredictionSession.uid.in_(matching)).all()
+
+def get_predictions_by_min_area_dao(db, min_area):
+    """
+    Get prediction sessions containing objects with a box area >= min_area (pixels)
+    """
+    matching = select(DetectionObject.prediction_uid).where(DetectionObject.area >= min_area)
+    return db.query(PredictionSession).filter(PredictionSession.uid.in_(matching)).all()    
     
     
+
+EXPORT_COLUMNS = ["uid", "timestamp", "user_id", "original_image", "predicted_image",
+                  "label", "score", "x1", "y1", "x2", "y2", "area"]
+
+def iter_prediction_detections_dao(db, since=None, until=None, label=None, chunk_size=1000):
+    """
+    Stream prediction sessions joined with their detection objects (one row per detection,
+    sessions without detections once with empty detection columns), in chunks of chunk_size rows.
+    The rows are read through a server-side cursor where the database supports it (yield_per)
+    """
+    query = select(PredictionSession.uid, PredictionSession.timestamp, PredictionSession.user_id,
+                   PredictionSession.original_image, PredictionSession.predicted_image,
+                   DetectionObject.label, DetectionObject.score, DetectionObject.x1, DetectionObject.y1,
+                   DetectionObject.x2, DetectionObject.y2, DetectionObject.area)
+    if label is None:
+        query = query.outerjoin(DetectionObject, DetectionObject.prediction_uid == PredictionSession.uid)
+    else:
+        query = query.join(DetectionObject, DetectionObject.prediction_uid == PredictionSession.uid)
+        query = query.where(DetectionObject.label == label)
+    if since is not None:
+        query = query.where(PredictionSession.timestamp >= since)
+    if until is not None:
+        query = query.where(PredictionSession.timestamp < until)
+    query = query.order_by(PredictionSession.timestamp, PredictionSession.uid, DetectionObject.id)
+    result = db.execute(query.execution_options(yield_per=chunk_size))
+    for rows in result.partitions():
+        yield rows
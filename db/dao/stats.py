@@ -0,0 +1,130 @@
+from datetime import timedelta
+from sqlalchemy import func, delete, select
+from sqlalchemy.dialects import postgresql, sqlite
+from models.stats_rollup import PredictionHourlyStats, LabelHourlyStats
+from models.prediction_session import PredictionSession
+from models.detection_object import DetectionObject
+
+ONE_HOUR = timedelta(hours=1)
+
+def hour_of(timestamp):
+    """
+    Start of the hour bucket of a timestamp
+    """
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+def add_to_stats_rollups_dao(db, session_timestamps=(), detections=()):
+    """
+    Add prediction sessions (their timestamps) and detection objects ((timestamp, label, score)
+    tuples) to the hourly rollups. Doesn't commit: it runs in the transaction inserting the rows
+    """
+    sessions = {}
+    for timestamp in session_timestamps:
+        hour = hour_of(timestamp)
+        sessions[hour] = sessions.get(hour, 0) + 1
+    labels = {}
+    for timestamp, label, score in detections:
+        key = (hour_of(timestamp), label)
+        rollup = labels.get(key)
+        if rollup is None:
+            labels[key] = [1, score, score, score]
+        else:
+            rollup[0] += 1
+            rollup[1] += score
+            rollup[2] = min(rollup[2], score)
+            rollup[3] = max(rollup[3], score)
+
+    # Sorted, so concurrent transactions lock the rollup rows in the same order
+    if sessions:
+        _upsert(db, PredictionHourlyStats, [{"hour": hour, "count": count} for hour, count in sorted(sessions.items())],
+                {"count": "sum"})
+    if labels:
+        _upsert(db, LabelHourlyStats, [
+            {"hour": hour, "label": label, "count": count, "score_sum": score_sum, "score_min": score_min,
+             "score_max": score_max}
+            for (hour, label), (count, score_sum, score_min, score_max) in sorted(labels.items())
+        ], {"count": "sum", "score_sum": "sum", "score_min": "min", "score_max": "max"})
+
+def _upsert(db, model, rows, merge):
+    # INSERT ... ON CONFLICT DO UPDATE merging into the existing bucket (SQLite and PostgreSQL)
+    table = model.__table__
+    if db.get_bind().dialect.name == "postgresql":
+        statement, least, greatest = postgresql.insert(table), func.least, func.greatest
+    else:
+        statement, least, greatest = sqlite.insert(table), func.min, func.max
+    combine = {"sum": lambda current, new: current + new, "min": least, "max": greatest}
+    statement = statement.on_conflict_do_update(
+        index_elements=[column.name for column in table.primary_key],
+        set_={column: combine[how](table.c[column], statement.excluded[column]) for column, how in merge.items()},
+    )
+    db.execute(statement, rows)
+
+def rebuild_stats_rollups_dao(db, since=None, until=None, chunk_size=5000):
+    """
+    Recompute the rollups of the hours in [since, until) (the whole history by default) from the
+    prediction_sessions and detection_objects tables. `since` and `until` are rounded down to the hour.
+    Doesn't commit.
+    """
+    since = hour_of(since) if since is not None else None
+    until = hour_of(until) if until is not None else None
+    for model in (PredictionHourlyStats, LabelHourlyStats):
+        db.execute(delete(model).where(*_range(model.hour, since, until)))
+
+    sessions = db.execute(select(PredictionSession.timestamp)
+                          .where(PredictionSession.timestamp.is_not(None),
+                                 *_range(PredictionSession.timestamp, since, until))
+                          .execution_options(yield_per=chunk_size))
+    for rows in sessions.partitions():
+        add_to_stats_rollups_dao(db, session_timestamps=[row[0] for row in rows])
+    detections = db.execute(select(DetectionObject.timestamp, DetectionObject.label, DetectionObject.score)
+                            .where(DetectionObject.timestamp.is_not(None),
+                                   *_range(DetectionObject.timestamp, since, until))
+                            .execution_options(yield_per=chunk_size))
+    for rows in detections.partitions():
+        add_to_stats_rollups_dao(db, detections=[tuple(row) for row in rows])
+
+def _range(column, since, until):
+    conditions = []
+    if since is not None:
+        conditions.append(column >= since)
+    if until is not None:
+        conditions.append(column < until)
+    return conditions
+
+def get_hourly_prediction_count_dao(db, since=None):
+    """
+    Count of prediction sessions in the hours from `since` (rounded down to the hour)
+    """
+    query = db.query(func.coalesce(func.sum(PredictionHourlyStats.count), 0))
+    if since is not None:
+        query = query.filter(PredictionHourlyStats.hour >= hour_of(since))
+    return query.scalar()
+
+def get_hourly_average_score_dao(db, since):
+    """
+    Average detection score in the hours from `since`, or None without detections
+    """
+    count, score_sum = db.query(func.sum(LabelHourlyStats.count), func.sum(LabelHourlyStats.score_sum)) \
+        .filter(LabelHourlyStats.hour >= hour_of(since)).one()
+    return score_sum / count if count else None
+
+def get_hourly_most_common_labels_dao(db, since, limit=5):
+    """
+    (label, count) of the most detected labels in the hours from `since`
+    """
+    total = func.sum(LabelHourlyStats.count)
+    return (
+        db.query(LabelHourlyStats.label, total.label("count"))
+        .filter(LabelHourlyStats.hour >= hour_of(since))
+        .group_by(LabelHourlyStats.label)
+        .order_by(total.desc())
+        .limit(limit)
+        .all()
+    )
+
+def get_hourly_unique_labels_dao(db, since):
+    """
+    Distinct labels detected in the hours from `since`
+    """
+    return [row[0] for row in db.query(LabelHourlyStats.label)
+            .filter(LabelHourlyStats.hour >= hour_of(since)).distinct().all()]
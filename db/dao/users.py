@@ -15,4 +15,8 @@ def create_user_dao(db, user):
     db.refresh(user)
     return user
 
-
+def get_user_by_id_dao(db, user_id):
+    """
+    Get user by id
+    """
+    return db.query(User).filter(User.id == user_id).first()
@@ -0,0 +1,33 @@
+"""
+Create the hourly stats rollup tables and (re)build them from the prediction_sessions
+and detection_objects tables, e.g. to backfill the predictions stored before them.
+
+Usage: python -m db.migrations.stats_rollups [--days N]
+"""
+import argparse
+from datetime import datetime, timedelta
+from db.setup_db import engine as default_engine, SessionLocal
+from db.dao.stats import rebuild_stats_rollups_dao
+from models.stats_rollup import PredictionHourlyStats, LabelHourlyStats
+
+
+def upgrade(engine=default_engine, days=None):
+    """
+    Rebuild the rollups of the last `days` days (the whole history by default); safe to run more than once
+    """
+    for model in (PredictionHourlyStats, LabelHourlyStats):
+        model.__table__.create(bind=engine, checkfirst=True)
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+    db = SessionLocal(bind=engine)
+    try:
+        rebuild_stats_rollups_dao(db, since=since)
+        db.commit()
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--days", type=int, default=None, help="Only rebuild the last N days")
+    upgrade(days=parser.parse_args().days)
+    print("Rebuilt the stats rollups")
@@ -0,0 +1,63 @@
+"""
+Add the numeric box columns and the query indexes to an existing database, and backfill
+the new columns of the detection objects stored before them.
+
+Usage: python -m db.migrations.structured_detections
+"""
+import json
+from sqlalchemy import inspect, text, bindparam, update, select
+from db.setup_db import engine as default_engine
+from models.detection_object import DetectionObject
+from models.prediction_session import PredictionSession
+
+BOX_COLUMNS = ("x1", "y1", "x2", "y2", "area")
+BACKFILL_BATCH_SIZE = 5000
+
+
+def upgrade(engine=default_engine, batch_size=BACKFILL_BATCH_SIZE):
+    """
+    Bring the detection_objects table up to date; safe to run more than once.
+    Returns the number of backfilled rows.
+    """
+    existing = {column["name"] for column in inspect(engine).get_columns(DetectionObject.__tablename__)}
+    with engine.begin() as conn:
+        for name in BOX_COLUMNS:
+            if name not in existing:
+                conn.execute(text(f"ALTER TABLE {DetectionObject.__tablename__} ADD COLUMN {name} FLOAT"))
+
+    backfilled = 0
+    last_id = 0
+    while True:
+        with engine.begin() as conn:
+            rows = conn.execute(
+                select(DetectionObject.id, DetectionObject.box)
+                .where(DetectionObject.x1.is_(None), DetectionObject.id > last_id)
+                .order_by(DetectionObject.id)
+                .limit(batch_size)
+            ).all()
+            if not rows:
+                break
+            last_id = rows[-1][0]
+            values = [columns for columns in (_box_columns(row_id, box) for row_id, box in rows) if columns]
+            if values:
+                table = DetectionObject.__table__
+                conn.execute(update(table).where(table.c.id == bindparam("row_id")), values)
+            backfilled += len(values)
+
+    # Indexes are created after the backfill so they are built once
+    for index in (*DetectionObject.__table__.indexes, *PredictionSession.__table__.indexes):
+        index.create(bind=engine, checkfirst=True)
+    return backfilled
+
+
+def _box_columns(row_id, box):
+    try:
+        x1, y1, x2, y2 = (float(value) for value in json.loads(box))
+    except (TypeError, ValueError):
+        # Left NULL: the row is excluded from region and area queries
+        return None
+    return {"row_id": row_id, "x1": x1, "y1": y1, "x2": x2, "y2": y2, "area": (x2 - x1) * (y2 - y1)}
+
+
+if __name__ == "__main__":
+    print(f"Backfilled {upgrade()} detection objects")
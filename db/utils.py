@@ -3,6 +3,7 @@ from db.setup_db import SessionLocal, Base, engine
 import models.detection_object
 import models.prediction_session
 import models.user
+import models.stats_rollup
 # END of models imports
 
 def get_db():
@@ -1,58 +1,91 @@
+import os
+import asyncio
+import base64
+import binascii
+from concurrent.futures import ThreadPoolExecutor
 from fastapi import Request
 from fastapi.responses import JSONResponse
 from app import app
-import base64
-import bcrypt
 from db.setup_db import SessionLocal
-from models.user import User
-
-@app.middleware("http")
-async def basic_auth_middleware(request: Request, call_next):
-    # Allow /health without auth
-    if request.url.path == "/health" or request.url.path == "/users":
-        return await call_next(request)
-    
-    # Extract Basic Auth from headers
-    username, password = get_credentials_from_headers(request)
-    user_id= verify_credentials(username,password)
-    
-    if request.method == "POST" and request.url.path == "/predict":
-        request.state.user_id = user_id
-        return await call_next(request)
-    
-    if not user_id:
-        # If credentials are not provided or invalid, raise HTTPException
-         return JSONResponse(
-            status_code=401,
-            content={"detail": "Unauthorized"},
-            headers={"WWW-Authenticate": "Basic"},
-        )
-    
-    return await call_next(request)
+from services.user_service import authenticate_user
+from services.token_service import verify_token
+
+# Threads verifying Basic credentials (DB lookup + bcrypt on a credential cache miss). Bounded,
+# so a burst of logins queues up instead of taking every thread of the server
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", "8"))
+
+# Routes served without credentials, and routes where credentials are optional (anonymous
+# requests get user_id None); both are looked up in O(1)
+PUBLIC_PATHS = frozenset({"/health", "/ready", "/users", "/auth/token", "/auth/refresh"})
+OPTIONAL_AUTH_ROUTES = frozenset({("POST", "/predict")})
+
+auth_executor = ThreadPoolExecutor(max_workers=AUTH_WORKERS, thread_name_prefix="auth")
+
+
+class AuthMiddleware:
+    """
+    Pure ASGI authentication middleware: sets request.state.user_id from a Bearer token
+    or Basic credentials, and answers 401 to unauthenticated requests of protected routes.
+    Blocking credential checks run on the auth executor, never on the event loop.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] in PUBLIC_PATHS:
+            return await self.app(scope, receive, send)
 
+        request = Request(scope)
+        # Bearer tokens are checked in memory; Basic credentials may need bcrypt
+        token = get_bearer_token(request)
+        if token is not None:
+            user_id = verify_token(token)
+        else:
+            username, password = get_credentials_from_headers(request)
+            user_id = await asyncio.get_running_loop().run_in_executor(
+                auth_executor, verify_credentials, username, password)
+
+        if not user_id and (scope["method"], scope["path"]) not in OPTIONAL_AUTH_ROUTES:
+            response = JSONResponse(
+                status_code=401,
+                content={"detail": "Unauthorized"},
+                headers={"WWW-Authenticate": "Bearer" if token is not None else "Basic"},
+            )
+            return await response(scope, receive, send)
+
+        scope.setdefault("state", {})["user_id"] = user_id
+        return await self.app(scope, receive, send)
+
+
+app.add_middleware(AuthMiddleware)
 
 
 def get_credentials_from_headers(request: Request):
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.startswith("Basic "):
         encoded_credentials = auth_header.split(" ", 1)[1]
-        decoded_credentials = base64.b64decode(encoded_credentials).decode("utf-8")
-        username, password = decoded_credentials.split(":", 1)
+        try:
+            decoded_credentials = base64.b64decode(encoded_credentials).decode("utf-8")
+            username, password = decoded_credentials.split(":", 1)
+        except (binascii.Error, UnicodeDecodeError, ValueError):
+            return None, None
         return username, password
     return None, None
 
 
+def get_bearer_token(request: Request):
+    auth_header = request.headers.get("Authorization")
+    if auth_header and auth_header.startswith("Bearer "):
+        return auth_header.split(" ", 1)[1].strip()
+    return None
+
+
 def verify_credentials(username: str, user_password: str):
     if not username or not user_password:
         return None
-    username = username.lower().strip()
     db = SessionLocal()
     try:
-        user = db.query(User).filter(User.username == username).first()
-        if not user:
-            return None
-        if bcrypt.checkpw(user_password.encode("utf-8"), user.password.encode("utf-8")):
-            return user.id
-        return None
+        return authenticate_user(username, user_password, db)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, DateTime, ForeignKey, Index
 from datetime import datetime
 # All models inherit from this base class
 from db.setup_db import Base
@@ -14,13 +14,21 @@ class DetectionObject(Base):
     label = Column(String, nullable=False)
     score = Column(Float, nullable=False)
     box = Column(String, nullable=False)
+    # The box as numbers (image pixels), for region and area queries
+    x1 = Column(Float)
+    y1 = Column(Float)
+    x2 = Column(Float)
+    y2 = Column(Float)
+    area = Column(Float)
     timestamp = Column(DateTime, default=datetime.utcnow)
 
-
-
-
-
-
-
-
-
+    # One index per query shape; the trailing columns make them covering indexes
+    __table_args__ = (
+        Index("ix_detection_objects_prediction_uid", "prediction_uid"),
+        Index("ix_detection_objects_label_prediction_uid", "label", "prediction_uid"),
+        Index("ix_detection_objects_score_prediction_uid", "score", "prediction_uid"),
+        Index("ix_detection_objects_timestamp_label", "timestamp", "label"),
+        Index("ix_detection_objects_timestamp_score", "timestamp", "score"),
+        Index("ix_detection_objects_area_prediction_uid", "area", "prediction_uid"),
+        Index("ix_detection_objects_x1_y1", "x1", "y1"),
+    )
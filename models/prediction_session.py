@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Integer
+from sqlalchemy import Column, String, DateTime, ForeignKey, Integer, Boolean, Index
 from datetime import datetime
 # All models inherit from this base class
 from db.setup_db import Base
@@ -13,6 +13,21 @@ class PredictionSession(Base):
     
     uid = Column(String, primary_key=True)
     user_id = Column(Integer, ForeignKey('users.id'), nullable=True)
-    timestamp = Column(DateTime, default=datetime.utcnow)
-    original_image = Column(String)
-    predicted_image = Column(String)
\ No newline at end of file
+    timestamp = Column(DateTime, default=datetime.utcnow, index=True)
+    original_image = Column(String, index=True)
+    predicted_image = Column(String, index=True)
+    # pending -> running -> done | failed (async predictions), done for sync ones
+    status = Column(String, default="done", nullable=False)
+    error = Column(String, nullable=True)
+    original_s3_key = Column(String, nullable=True)
+    predicted_s3_key = Column(String, nullable=True)
+    # False while the annotated image is deferred (RENDER_MODE lazy/background)
+    rendered = Column(Boolean, default=True, nullable=False)
+    # pending -> uploaded | failed while the predicted image is in the background upload queue;
+    # None when the session has no upload of its own (deferred rendering, cached result)
+    upload_status = Column(String, nullable=True)
+
+    # Keyset pagination of the listings walks sessions newest first by (timestamp, uid)
+    __table_args__ = (
+        Index("ix_prediction_sessions_timestamp_uid", "timestamp", "uid"),
+    )
@@ -0,0 +1,26 @@
+from sqlalchemy import Column, String, DateTime, Integer, Float
+# All models inherit from this base class
+from db.setup_db import Base
+
+class PredictionHourlyStats(Base):
+    """
+    Model for prediction_hourly_stats table: prediction sessions created per hour
+    """
+    __tablename__ = 'prediction_hourly_stats'
+
+    hour = Column(DateTime, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class LabelHourlyStats(Base):
+    """
+    Model for label_hourly_stats table: detection objects per hour and label
+    """
+    __tablename__ = 'label_hourly_stats'
+
+    hour = Column(DateTime, primary_key=True)
+    label = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+    score_sum = Column(Float, nullable=False, default=0.0)
+    score_min = Column(Float)
+    score_max = Column(Float)
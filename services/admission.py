@@ -0,0 +1,227 @@
+import os
+import math
+import time
+import asyncio
+import threading
+from collections import OrderedDict
+from fastapi import HTTPException, Request
+from services.priority_lanes import LaneQueue, LANES, INTERACTIVE, BULK, request_priority
+
+# At most PREDICT_MAX_IN_FLIGHT predictions run at once; up to PREDICT_MAX_QUEUE more wait
+# for a slot (at most PREDICT_QUEUE_TIMEOUT_S), anything beyond is rejected with 503
+PREDICT_MAX_IN_FLIGHT = int(os.getenv("PREDICT_MAX_IN_FLIGHT", "16"))
+PREDICT_MAX_QUEUE = int(os.getenv("PREDICT_MAX_QUEUE", "32"))
+PREDICT_QUEUE_TIMEOUT_S = float(os.getenv("PREDICT_QUEUE_TIMEOUT_S", "5"))
+PREDICT_RETRY_AFTER_S = int(os.getenv("PREDICT_RETRY_AFTER_S", "1"))
+# Per-user token bucket: PREDICT_RATE_PER_S predictions per second on average, bursts of
+# up to PREDICT_BURST (0 disables rate limiting)
+PREDICT_RATE_PER_S = float(os.getenv("PREDICT_RATE_PER_S", "5"))
+PREDICT_BURST = int(os.getenv("PREDICT_BURST", "30"))
+# Buckets tracked at once; the least recently seen users are forgotten (their bucket starts full again)
+PREDICT_RATE_MAX_USERS = int(os.getenv("PREDICT_RATE_MAX_USERS", "10000"))
+
+
+class TokenBuckets:
+    """
+    Per-key token buckets refilled at `rate` tokens per second up to `burst`
+    """
+
+    def __init__(self, rate, burst, max_keys):
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1):
+        """
+        Take `cost` tokens; returns 0 on success, else the seconds until they are available.
+        A cost above the burst only needs a full bucket, and leaves it in debt for the rest.
+        """
+        if self.rate <= 0:
+            return 0
+        now = time.monotonic()
+        needed = min(cost, self.burst)
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated) * self.rate)
+            wait = 0 if tokens >= needed else (needed - tokens) / self.rate
+            self._buckets[key] = (tokens - cost if tokens >= needed else tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return wait
+
+
+class AdmissionController:
+    """
+    Admission control of the prediction endpoints: per-user rate limits (429), a global limit
+    of predictions in flight and a bounded queue of requests waiting for a slot (503 when it's
+    full or the wait times out). Waiting requests are parked on the event loop, not on a thread.
+    Freed slots go to the interactive lane first, interleaved with bulk requests (see LaneQueue);
+    a request whose deadline passes while it waits gets 504 without doing any work.
+    """
+
+    def __init__(self, max_in_flight, max_queue, queue_timeout_s, rate_per_s, burst, max_users=10000,
+                 retry_after_s=1):
+        self.max_in_flight = max_in_flight
+        self.max_queue = max_queue
+        self.queue_timeout_s = queue_timeout_s
+        self.retry_after_s = retry_after_s
+        self.buckets = TokenBuckets(rate_per_s, burst, max_users)
+        self._in_flight = 0
+        self._waiters = LaneQueue()
+        self._lock = threading.Lock()
+        self._counters = {"admitted": 0, "queued": 0, "rate_limited": 0, "overloaded": 0, "timed_out": 0}
+        self._lane_counters = {lane: {"admitted": 0, "queued": 0, "expired": 0} for lane in LANES}
+
+    async def acquire(self, key, lane=INTERACTIVE, deadline=None, cost=1):
+        """
+        Take a prediction slot for `key` (user id or client address) in a lane, or raise 429/503,
+        or 504 when `deadline` (time.monotonic()) passes first.
+        `cost` tokens are taken from the key's rate limit bucket (0 when the caller charges it later).
+        """
+        timeout = self.queue_timeout_s
+        if deadline is not None:
+            timeout = min(timeout, deadline - time.monotonic())
+            if timeout <= 0:
+                self._count_lane(lane, "expired")
+                raise _deadline_exceeded()
+
+        if cost:
+            self.charge(key, cost)
+
+        with self._lock:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+                self._counters["admitted"] += 1
+                self._lane_counters[lane]["admitted"] += 1
+                return
+            if len(self._waiters) >= self.max_queue:
+                self._counters["overloaded"] += 1
+                raise self._overloaded()
+            waiter = asyncio.get_running_loop().create_future()
+            self._waiters.append(waiter, lane)
+            self._counters["queued"] += 1
+            self._lane_counters[lane]["queued"] += 1
+
+        try:
+            # release() hands its slot straight to the waiter, so _in_flight is already counted
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+        except asyncio.TimeoutError:
+            with self._lock:
+                if self._waiters.remove(waiter):
+                    if timeout < self.queue_timeout_s:
+                        self._lane_counters[lane]["expired"] += 1
+                        raise _deadline_exceeded()
+                    self._counters["timed_out"] += 1
+                    raise self._overloaded()
+            # The slot was handed over just as the wait timed out: keep it
+        except asyncio.CancelledError:
+            # The client went away: give up the place in the queue, or the slot if it was handed over
+            with self._lock:
+                handed_over = not self._waiters.remove(waiter)
+            if handed_over:
+                self.release()
+            raise
+        with self._lock:
+            self._counters["admitted"] += 1
+            self._lane_counters[lane]["admitted"] += 1
+
+    def charge(self, key, cost):
+        """
+        Take `cost` tokens from the key's rate limit bucket, or raise 429
+        """
+        wait = self.buckets.take(key, cost)
+        if wait:
+            self._count("rate_limited")
+            raise HTTPException(status_code=429, detail="Too many predictions, slow down",
+                                headers={"Retry-After": str(math.ceil(wait))})
+
+    def release(self):
+        """
+        Free a slot, handing it to the next waiting request if there is one
+        """
+        with self._lock:
+            while self._waiters:
+                waiter, _ = self._waiters.popleft()
+                if not waiter.done():
+                    waiter.get_loop().call_soon_threadsafe(_grant, waiter)
+                    return
+            self._in_flight -= 1
+
+    def stats(self):
+        with self._lock:
+            lanes = {lane: {"waiting": self._waiters.depth(lane), **counters}
+                     for lane, counters in self._lane_counters.items()}
+            return {"in_flight": self._in_flight, "waiting": len(self._waiters),
+                    "max_in_flight": self.max_in_flight, "max_queue": self.max_queue, **self._counters,
+                    "lanes": lanes}
+
+    def _overloaded(self):
+        return HTTPException(status_code=503, detail="Server busy, retry later",
+                             headers={"Retry-After": str(self.retry_after_s)})
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+    def _count_lane(self, lane, counter):
+        with self._lock:
+            self._lane_counters[lane][counter] += 1
+
+
+def _deadline_exceeded():
+    return HTTPException(status_code=504, detail="Deadline exceeded")
+
+
+def _grant(waiter):
+    if not waiter.done():
+        waiter.set_result(None)
+
+
+prediction_admission = AdmissionController(PREDICT_MAX_IN_FLIGHT, PREDICT_MAX_QUEUE, PREDICT_QUEUE_TIMEOUT_S,
+                                           PREDICT_RATE_PER_S, PREDICT_BURST, max_users=PREDICT_RATE_MAX_USERS,
+                                           retry_after_s=PREDICT_RETRY_AFTER_S)
+
+
+def client_key(request: Request):
+    """
+    Rate limit key of a request: its user, or its client address for anonymous requests
+    """
+    user_id = getattr(request.state, "user_id", None)
+    if user_id is not None:
+        return f"user:{user_id}"
+    return f"client:{request.client.host if request.client else 'unknown'}"
+
+
+def charge_predictions(request: Request, count):
+    """
+    Count `count` predictions of a request against its rate limit (429 when over)
+    """
+    prediction_admission.charge(client_key(request), count)
+
+
+async def admit_prediction(request: Request):
+    """
+    FastAPI dependency holding a prediction slot for the duration of the request,
+    queued in the request's lane (X-Priority) until its deadline (X-Deadline-Ms)
+    """
+    lane, deadline = request_priority(request)
+    await prediction_admission.acquire(client_key(request), lane, deadline)
+    try:
+        yield
+    finally:
+        prediction_admission.release()
+
+
+async def admit_batch_prediction(request: Request):
+    """
+    FastAPI dependency holding a prediction slot for the duration of a batch (bulk lane by default).
+    The rate limit bucket is charged per image by the endpoint, once the images are known.
+    """
+    lane, deadline = request_priority(request, default=BULK)
+    await prediction_admission.acquire(client_key(request), lane, deadline, cost=0)
+    try:
+        yield
+    finally:
+        prediction_admission.release()
@@ -0,0 +1,248 @@
+import os
+import time
+import uuid
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from services import prediction_service
+from services.yolo_service import scheduler, MODEL_ID
+from services.prediction_cache import prediction_cache, cache_key
+from services.tiling import run_tiled_inference
+from services.s3_service import get_s3_client, download_from_s3, list_s3_keys
+from services.prediction_service import (decode_image,
+                                         write_local_copy,
+                                         encode_predicted_image,
+                                         detections_from_result,
+                                         prediction_session_row,
+                                         prediction_paths,
+                                         prediction_s3_keys,
+                                         render_executor,
+                                         _render_in_background)
+from services.upload_queue import enqueue_upload
+from services.image_cache import image_cache
+from services.query_cache import query_cache, AGGREGATES
+from services.priority_lanes import BULK, check_deadline
+from db.dao.predictions import save_prediction_batch_dao
+from db.dao.detections import detection_row
+
+# Max number of images of one POST /predict/batch
+BATCH_MAX_ITEMS = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+# Images are processed BATCH_CHUNK_SIZE at a time: the next chunk is downloaded
+# while the current one is on the model, and each chunk is stored in one transaction
+BATCH_CHUNK_SIZE = int(os.getenv("BATCH_CHUNK_SIZE", "32"))
+# Threads downloading originals and rendering annotated images
+BATCH_IO_WORKERS = int(os.getenv("BATCH_IO_WORKERS", "16"))
+
+logger = logging.getLogger(__name__)
+
+io_executor = ThreadPoolExecutor(max_workers=BATCH_IO_WORKERS, thread_name_prefix="batch-io")
+
+
+def create_batch_prediction(items, prefix, user_id, db, params=None, s3=None, lane=BULK, deadline=None):
+    """
+    Predict a list of {"chat_id", "image_name"} items, or every original image under an S3 prefix
+    """
+    s3 = s3 or get_s3_client()
+    items = resolve_batch_items(s3, items, prefix)
+    return run_batch_prediction(s3, items, user_id, db, params, lane=lane, deadline=deadline)
+
+
+def resolve_batch_items(s3, items, prefix):
+    """
+    Validate the requested items, or list them from the original images under `prefix`
+    """
+    if items and prefix:
+        raise HTTPException(status_code=400, detail="Pass either items or a prefix, not both")
+    if prefix:
+        # Only originals count against the limit: listing stops once there are too many of them
+        keys = list_s3_keys(s3, prefix, limit=BATCH_MAX_ITEMS + 1, match=is_original_key)
+        items = [{"chat_id": key.split("/")[0], "image_name": key.split("/")[2]} for key in keys]
+    if not items:
+        raise HTTPException(status_code=400, detail="No images to predict")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"A batch is limited to {BATCH_MAX_ITEMS} images")
+    return items
+
+
+def is_original_key(key):
+    # originals are stored as <chat_id>/original/<image_name>
+    parts = key.split("/")
+    return len(parts) == 3 and parts[1] == "original" and bool(parts[2])
+
+
+def run_batch_prediction(s3, items, user_id, db, params=None, lane=BULK, deadline=None):
+    """
+    Predict many images: originals are downloaded concurrently, run through the batching
+    scheduler together (in the bulk lane by default), and each chunk's sessions and detections
+    are stored in one transaction before the annotated images are queued for upload.
+    A failing image is reported in its own result and doesn't fail the rest of the batch;
+    images not downloaded or run by the deadline fail with "Deadline exceeded".
+    """
+    params = params or {}
+    start_time = time.time()
+    chunks = [items[start:start + BATCH_CHUNK_SIZE] for start in range(0, len(items), BATCH_CHUNK_SIZE)]
+
+    results = []
+    next_downloads = _fetch_chunk(s3, chunks[0], params, deadline) if chunks else []
+    for index, chunk in enumerate(chunks):
+        downloads = next_downloads
+        # Prefetch the next chunk while this one is on the model
+        if index + 1 < len(chunks):
+            next_downloads = _fetch_chunk(s3, chunks[index + 1], params, deadline)
+        results.extend(_predict_chunk(chunk, downloads, user_id, db, params, lane, deadline))
+
+    succeeded = sum(1 for result in results if result["status"] == "done")
+    return {
+        "total": len(results),
+        "succeeded": succeeded,
+        "failed": len(results) - succeeded,
+        "time_took": round(time.time() - start_time, 2),
+        "results": results,
+    }
+
+
+def _fetch_chunk(s3, chunk, params, deadline=None):
+    return [io_executor.submit(_fetch, s3, item["chat_id"], item["image_name"], params, deadline) for item in chunk]
+
+
+def _fetch(s3, chat_id, image_name, params, deadline=None):
+    """
+    Download an original image for a new prediction uid;
+    returns the uid, cache key, cached result and decoded image (None on a cache hit)
+    """
+    check_deadline(deadline)
+    uid = str(uuid.uuid4())
+    original_s3_key, _ = prediction_s3_keys(chat_id, image_name)
+    original_path, _ = prediction_paths(chat_id, image_name)
+    original_bytes = download_from_s3(s3, original_s3_key)
+    if prediction_service.KEEP_LOCAL_COPIES:
+        write_local_copy(original_path, original_bytes, uid)
+
+    key = cache_key(original_bytes, MODEL_ID, params)
+    cached = prediction_cache.get(key)
+    image = decode_image(original_bytes) if cached is None else None
+    return uid, key, cached, image
+
+
+def _infer(image, params, lane=BULK, deadline=None):
+    """
+    Queue an image on the model and return a Future of its Results
+    """
+    model_params = {name: value for name, value in params.items() if name != "tiled"}
+    if params.get("tiled"):
+        return io_executor.submit(
+            lambda: run_tiled_inference(image, lane=lane, deadline=deadline, **model_params)[0])
+    return scheduler.submit(image, lane=lane, deadline=deadline, **model_params)
+
+
+def _failure(item, error):
+    return {
+        "chat_id": item["chat_id"],
+        "image_name": item["image_name"],
+        "status": "failed",
+        "error": str(getattr(error, "detail", error)),
+    }
+
+
+def _predict_chunk(chunk, downloads, user_id, db, params, lane=BULK, deadline=None):
+    render_mode = prediction_service.RENDER_MODE
+    outcomes = [None] * len(chunk)
+    predictions = {}
+
+    # Queue every downloaded image on the model at once so the scheduler can batch them
+    for index, (item, download) in enumerate(zip(chunk, downloads)):
+        try:
+            uid, key, cached, image = download.result()
+        except Exception as e:
+            outcomes[index] = _failure(item, e)
+            continue
+        original_path, predicted_path = prediction_paths(item["chat_id"], item["image_name"])
+        original_s3_key, predicted_s3_key = prediction_s3_keys(item["chat_id"], item["image_name"])
+        predictions[index] = {
+            "uid": uid,
+            "key": key,
+            "cached": cached,
+            "inference": _infer(image, params, lane, deadline) if cached is None else None,
+            "original_path": original_path,
+            "original_s3_key": original_s3_key,
+            "predicted_path": cached["predicted_image"] if cached else predicted_path,
+            "predicted_s3_key": cached["predicted_s3_key"] if cached else predicted_s3_key,
+        }
+        if cached:
+            image_cache.link(uid, cached["predicted_image"])
+
+    for index, prediction in list(predictions.items()):
+        if prediction["cached"] is not None:
+            prediction["detections"] = prediction["cached"]["detections"]
+            continue
+        try:
+            prediction["result"] = prediction["inference"].result()
+            prediction["detections"] = detections_from_result(prediction["result"])
+        except Exception as e:
+            outcomes[index] = _failure(chunk[index], e)
+            del predictions[index]
+
+    # Render the annotated images in parallel, unless rendering is deferred
+    if render_mode == "eager":
+        renders = {
+            index: io_executor.submit(lambda result, path, uid: encode_predicted_image(result.plot(), path, uid),
+                                      prediction["result"], prediction["predicted_path"], prediction["uid"])
+            for index, prediction in predictions.items() if prediction["cached"] is None
+        }
+        for index, render in renders.items():
+            try:
+                predictions[index]["predicted_bytes"] = render.result()
+            except Exception as e:
+                outcomes[index] = _failure(chunk[index], e)
+                del predictions[index]
+
+    sessions = []
+    detections = []
+    for prediction in predictions.values():
+        sessions.append({"uid": prediction["uid"], **prediction_session_row(
+            prediction["original_path"], prediction["predicted_path"], user_id, prediction["original_s3_key"],
+            prediction["predicted_s3_key"], rendered=render_mode == "eager",
+            upload_status="pending" if "predicted_bytes" in prediction else None,
+        )})
+        detections.extend(
+            detection_row(prediction["uid"], detection["label"], detection["score"], detection["box"])
+            for detection in prediction["detections"]
+        )
+
+    try:
+        save_prediction_batch_dao(db, sessions, detections)
+        query_cache.invalidate(AGGREGATES)
+    except Exception as e:
+        db.rollback()
+        logger.exception("Storing a batch of %d predictions failed", len(sessions))
+        for index in predictions:
+            outcomes[index] = _failure(chunk[index], e)
+        return outcomes
+
+    for index, prediction in predictions.items():
+        if prediction["cached"] is None:
+            prediction_cache.put(prediction["key"], {
+                "detections": prediction["detections"],
+                "predicted_image": prediction["predicted_path"],
+                "predicted_s3_key": prediction["predicted_s3_key"],
+            })
+            if "predicted_bytes" in prediction:
+                enqueue_upload(prediction["uid"], prediction["predicted_s3_key"], prediction["predicted_bytes"])
+            if render_mode == "background":
+                render_executor.submit(_render_in_background, prediction["uid"], prediction["result"],
+                                       prediction["predicted_path"], prediction["predicted_s3_key"])
+
+        outcome = {
+            "chat_id": chunk[index]["chat_id"],
+            "image_name": chunk[index]["image_name"],
+            "status": "done",
+            "prediction_uid": prediction["uid"],
+            "detection_count": len(prediction["detections"]),
+            "labels": [detection["label"] for detection in prediction["detections"]],
+            "user_id": user_id,
+            "predicted_s3_key": prediction["predicted_s3_key"],
+        }
+        if prediction["cached"] is not None:
+            outcome["cached"] = True
+        outcomes[index] = outcome
+    return outcomes
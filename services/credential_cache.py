@@ -0,0 +1,102 @@
+import os
+import hmac
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+
+AUTH_CACHE_SIZE = int(os.getenv("AUTH_CACHE_SIZE", "10000"))
+# How long a verified credential is trusted without running bcrypt again (0 disables the cache)
+AUTH_CACHE_TTL_S = float(os.getenv("AUTH_CACHE_TTL_S", "300"))
+# Key of the HMAC the credentials are cached under; random per process unless set
+AUTH_CACHE_SECRET = os.getenv("AUTH_CACHE_SECRET", "").encode("utf-8") or os.urandom(32)
+
+
+class CredentialCache:
+    """
+    Bounded LRU of verified credentials -> user id, so bcrypt runs once per credential and TTL.
+
+    Entries are keyed by an HMAC of the username and password: neither the plaintext nor a plain
+    hash of the password is kept in memory. Only successful verifications are cached, so wrong
+    passwords always pay the bcrypt cost.
+    """
+
+    def __init__(self, max_entries, ttl_s, secret):
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._secret = secret
+        self._entries = OrderedDict()
+        # username -> keys of its cached credentials, to invalidate a user
+        self._user_keys = {}
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "invalidations": 0}
+
+    def key(self, username, password):
+        return hmac.new(self._secret, f"{username}\0{password}".encode("utf-8"), hashlib.sha256).digest()
+
+    def get(self, username, password):
+        """
+        The user id of verified credentials, or None on a miss
+        """
+        if self.ttl_s <= 0:
+            return None
+        key = self.key(username, password)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                self._forget(key)
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._counters["hits"] += 1
+            return entry[1]
+
+    def put(self, username, password, user_id):
+        if self.ttl_s <= 0:
+            return
+        key = self.key(username, password)
+        with self._lock:
+            self._forget(key)
+            self._entries[key] = (time.monotonic() + self.ttl_s, user_id, username)
+            self._user_keys.setdefault(username, set()).add(key)
+            while len(self._entries) > self.max_entries:
+                self._forget(next(iter(self._entries)))
+                self._counters["evictions"] += 1
+
+    def invalidate_user(self, username):
+        """
+        Forget the cached credentials of a user, e.g. after it was created or its password changed
+        """
+        with self._lock:
+            for key in list(self._user_keys.get(username, ())):
+                self._forget(key)
+            self._counters["invalidations"] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._user_keys.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+            }
+
+    def _forget(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        keys = self._user_keys.get(entry[2])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._user_keys[entry[2]]
+
+
+credential_cache = CredentialCache(AUTH_CACHE_SIZE, AUTH_CACHE_TTL_S, AUTH_CACHE_SECRET)
@@ -0,0 +1,137 @@
+import io
+import os
+import csv
+import json
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+from db.setup_db import SessionLocal
+from db.dao.predictions import iter_prediction_detections_dao, EXPORT_COLUMNS
+
+# Rows fetched from the database and encoded at a time; memory stays bounded by one chunk
+EXPORT_CHUNK_SIZE = int(os.getenv("EXPORT_CHUNK_SIZE", "5000"))
+
+EXPORT_FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def export_predictions(export_format, since=None, until=None, label=None):
+    """
+    Stream the prediction sessions joined with their detections as NDJSON, CSV,
+    Arrow IPC stream or Parquet (Arrow and Parquet need pyarrow)
+    """
+    if export_format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400,
+                            detail=f"Unknown export format '{export_format}', expected one of {', '.join(EXPORT_FORMATS)}")
+    if export_format in ("arrow", "parquet"):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=501, detail=f"The {export_format} export needs pyarrow installed")
+
+    encoders = {"ndjson": _ndjson, "csv": _csv, "arrow": _arrow, "parquet": _parquet}
+    media_type, extension = EXPORT_FORMATS[export_format]
+    return StreamingResponse(encoders[export_format](_chunks(since, until, label)), media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="predictions.{extension}"'})
+
+
+def _chunks(since, until, label):
+    # The stream outlives the request's DB session, so it reads through a session of its own
+    db = SessionLocal()
+    try:
+        yield from iter_prediction_detections_dao(db, since, until, label, chunk_size=EXPORT_CHUNK_SIZE)
+    finally:
+        db.close()
+
+
+def _ndjson(chunks):
+    for rows in chunks:
+        lines = []
+        for row in rows:
+            record = row._asdict()
+            record["timestamp"] = record["timestamp"].isoformat() if record["timestamp"] else None
+            lines.append(json.dumps(record))
+        yield ("\n".join(lines) + "\n").encode("utf-8")
+
+
+def _csv(chunks):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for rows in chunks:
+        writer.writerows(rows)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
+
+
+def _arrow_schema():
+    import pyarrow as pa
+    return pa.schema([
+        ("uid", pa.string()), ("timestamp", pa.timestamp("us")), ("user_id", pa.int64()),
+        ("original_image", pa.string()), ("predicted_image", pa.string()), ("label", pa.string()),
+        ("score", pa.float64()), ("x1", pa.float64()), ("y1", pa.float64()), ("x2", pa.float64()),
+        ("y2", pa.float64()), ("area", pa.float64()),
+    ])
+
+
+def _record_batches(chunks, schema):
+    import pyarrow as pa
+    for rows in chunks:
+        columns = list(zip(*rows))
+        yield pa.RecordBatch.from_arrays([pa.array(column, type=field.type)
+                                          for column, field in zip(columns, schema)], schema=schema)
+
+
+class _ChunkSink(io.RawIOBase):
+    """
+    Write-only file collecting what pyarrow writes, drained after every record batch
+    """
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._parts)
+        self._parts = []
+        return data
+
+
+def _arrow(chunks):
+    import pyarrow as pa
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for batch in _record_batches(chunks, schema):
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _parquet(chunks):
+    import pyarrow.parquet as pq
+    schema = _arrow_schema()
+    sink = _ChunkSink()
+    with pq.ParquetWriter(sink, schema) as writer:
+        for batch in _record_batches(chunks, schema):
+            # Every chunk is a row group, written out as soon as it's complete
+            writer.write_batch(batch)
+            yield sink.drain()
+    yield sink.drain()
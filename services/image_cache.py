@@ -0,0 +1,185 @@
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+
+UPLOAD_DIR = "uploads/original"
+PREDICTED_DIR = "uploads/predicted"
+# Byte budget of the local image copies; the least recently used images are evicted past it
+IMAGE_CACHE_MAX_MB = int(os.getenv("IMAGE_CACHE_MAX_MB", "2048"))
+# Images not read for this long are evicted (0 disables the TTL)
+IMAGE_CACHE_TTL_HOURS = float(os.getenv("IMAGE_CACHE_TTL_HOURS", "168"))
+
+class ImageDiskCache:
+    """
+    Size-bounded cache of the local image copies under `directories`.
+
+    Files are tracked in an LRU index (path -> size, last access) and evicted when the total
+    size exceeds `max_bytes` or when they haven't been read for `ttl_s` seconds.
+    A uid -> paths index finds the images of a prediction in O(1).
+    Files already on disk are indexed on first use, oldest first.
+    """
+
+    def __init__(self, directories, max_bytes, ttl_s=0):
+        self.directories = [os.path.normpath(directory) for directory in directories]
+        self.max_bytes = max_bytes
+        self.ttl_s = ttl_s
+        self._entries = OrderedDict()
+        # uid -> paths of its images, and path -> uids using it (images are shared by identical predictions)
+        self._uids = {}
+        self._path_uids = {}
+        self._size = 0
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._counters = {"hits": 0, "misses": 0, "evictions": 0, "expirations": 0}
+
+    def put(self, path, data, uid=None):
+        """
+        Write an image and track it, evicting the least recently used images past the byte budget
+        """
+        path = os.path.normpath(path)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # A temp file of its own, so concurrent writes of the same image don't race on it
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            self._load()
+            previous = self._entries.pop(path, None)
+            if previous is not None:
+                self._size -= previous[0]
+            self._entries[path] = [len(data), time.time()]
+            self._size += len(data)
+            if uid is not None:
+                self._link(uid, path)
+            self._evict(keep=path)
+        return path
+
+    def get(self, path):
+        """
+        Read a cached image, or None on a miss (unknown, expired or deleted file)
+        """
+        path = os.path.normpath(path)
+        with self._lock:
+            self._load()
+            entry = self._entries.get(path)
+            if entry is not None and self.ttl_s and time.time() - entry[1] > self.ttl_s:
+                self._delete(path)
+                self._counters["expirations"] += 1
+                entry = None
+            if entry is None:
+                self._counters["misses"] += 1
+                return None
+            entry[1] = time.time()
+            self._entries.move_to_end(path)
+
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            # Keep the access time on disk too, so the LRU order survives a restart
+            os.utime(path)
+        except FileNotFoundError:
+            with self._lock:
+                self._forget(path)
+                self._counters["misses"] += 1
+            return None
+        with self._lock:
+            self._counters["hits"] += 1
+        return data
+
+    def link(self, uid, path):
+        """
+        Record that a prediction uses an already cached image
+        """
+        path = os.path.normpath(path)
+        with self._lock:
+            if path in self._entries:
+                self._link(uid, path)
+
+    def paths_of(self, uid):
+        with self._lock:
+            return sorted(self._uids.get(uid, ()))
+
+    def remove(self, path):
+        """
+        Delete a cached image
+        """
+        with self._lock:
+            self._load()
+            self._delete(os.path.normpath(path))
+
+    def remove_uid(self, uid):
+        """
+        Delete the cached images of a prediction
+        """
+        with self._lock:
+            self._load()
+            for path in list(self._uids.get(uid, ())):
+                self._delete(path)
+
+    def stats(self):
+        with self._lock:
+            return {"files": len(self._entries), "bytes": self._size, "max_bytes": self.max_bytes,
+                    **self._counters}
+
+    def _load(self):
+        # Index the files left by previous runs, least recently used first
+        if self._loaded:
+            return
+        self._loaded = True
+        found = []
+        for directory in self.directories:
+            os.makedirs(directory, exist_ok=True)
+            for entry in os.scandir(directory):
+                if entry.is_file() and not entry.name.endswith(".tmp"):
+                    stat = entry.stat()
+                    found.append((stat.st_mtime, os.path.normpath(entry.path), stat.st_size))
+        for mtime, path, size in sorted(found):
+            self._entries[path] = [size, mtime]
+            self._size += size
+        self._evict()
+
+    def _evict(self, keep=None):
+        now = time.time()
+        while self._entries:
+            path, (size, last_access) = next(iter(self._entries.items()))
+            expired = self.ttl_s and now - last_access > self.ttl_s
+            if not expired and self._size <= self.max_bytes:
+                break
+            if path == keep:
+                # Never evict the image just written, even if it alone exceeds the budget
+                self._entries.move_to_end(path)
+                if len(self._entries) == 1:
+                    break
+                continue
+            self._delete(path)
+            self._counters["expirations" if expired else "evictions"] += 1
+
+    def _link(self, uid, path):
+        self._uids.setdefault(uid, set()).add(path)
+        self._path_uids.setdefault(path, set()).add(uid)
+
+    def _forget(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._size -= entry[0]
+        for uid in self._path_uids.pop(path, ()):
+            paths = self._uids.get(uid)
+            if paths is not None:
+                paths.discard(path)
+                if not paths:
+                    del self._uids[uid]
+
+    def _delete(self, path):
+        self._forget(path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+image_cache = ImageDiskCache([UPLOAD_DIR, PREDICTED_DIR], IMAGE_CACHE_MAX_MB * 1024 * 1024,
+                             ttl_s=IMAGE_CACHE_TTL_HOURS * 3600)
@@ -1,11 +1,26 @@
 from fastapi import HTTPException
-from fastapi.responses import FileResponse
+from fastapi.responses import Response
 import os
+import mimetypes
+from db.dao.predictions import get_prediction_by_image_path_dao
+from services.prediction_service import read_image, UPLOAD_DIR, PREDICTED_DIR
 
-def get_image_by_type_and_filename(type, filename):
-    if type not in ["original", "predicted"]:
+IMAGE_DIRS = {"original": UPLOAD_DIR, "predicted": PREDICTED_DIR}
+
+def get_image_by_type_and_filename(type, filename, db):
+    if type not in IMAGE_DIRS:
         raise HTTPException(status_code=400, detail="Invalid image type")
-    path = os.path.join("uploads", type, filename)
-    if not os.path.exists(path):
+    if os.path.basename(filename) != filename:
+        raise HTTPException(status_code=400, detail="Invalid filename")
+    path = os.path.join(IMAGE_DIRS[type], filename)
+
+    # Local copies may have been evicted from the disk cache: look up the image's S3 key
+    prediction = get_prediction_by_image_path_dao(db, type, path)
+    if not prediction:
+        raise HTTPException(status_code=404, detail="Image not found")
+    s3_key = prediction.original_s3_key if type == "original" else prediction.predicted_s3_key
+    try:
+        data = read_image(path, s3_key, prediction.uid)
+    except HTTPException:
         raise HTTPException(status_code=404, detail="Image not found")
-    return FileResponse(path)
\ No newline at end of file
+    return Response(content=data, media_type=mimetypes.guess_type(filename)[0] or "application/octet-stream")
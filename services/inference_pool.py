@@ -0,0 +1,312 @@
+import os
+import time
+import itertools
+import threading
+import multiprocessing as mp
+from multiprocessing import shared_memory, resource_tracker
+from multiprocessing.connection import wait
+from concurrent.futures import Future, TimeoutError as FuturesTimeoutError
+import numpy as np
+
+
+def core_shares(n_workers, cores=None):
+    """
+    Split the cores available to this process into `n_workers` contiguous shares.
+    When there are more workers than cores, workers share cores round-robin.
+    """
+    if cores is None:
+        cores = os.sched_getaffinity(0) if hasattr(os, "sched_getaffinity") else range(os.cpu_count() or 1)
+    cores = sorted(cores)
+    shares = []
+    for i in range(n_workers):
+        share = cores[i * len(cores) // n_workers:(i + 1) * len(cores) // n_workers]
+        shares.append(share or [cores[i % len(cores)]])
+    return shares
+
+
+def share_image(image):
+    """
+    Copy an image into a new shared memory block.
+    Returns the block (owned by the caller, who must unlink it) and a picklable descriptor.
+    """
+    shm = shared_memory.SharedMemory(create=True, size=max(1, image.nbytes))
+    np.ndarray(image.shape, dtype=image.dtype, buffer=shm.buf)[:] = image
+    return shm, (shm.name, image.shape, image.dtype.str)
+
+
+def attach_image(descriptor):
+    """
+    Map an image shared by `share_image` without copying it.
+    Returns the block (to be closed, not unlinked) and an ndarray view over it.
+    """
+    name, shape, dtype = descriptor
+    shm = shared_memory.SharedMemory(name=name)
+    # The creating process owns the block's lifetime; don't let this process' tracker unlink it
+    resource_tracker.unregister(shm._name, "shared_memory")
+    return shm, np.ndarray(shape, dtype=np.dtype(dtype), buffer=shm.buf)
+
+
+def load_image(source):
+    """
+    Load an inference source as a BGR ndarray, the layout YOLO expects for arrays
+    """
+    if isinstance(source, np.ndarray):
+        return source
+    import cv2
+    image = cv2.imread(str(source))
+    if image is None:
+        raise FileNotFoundError(f"Could not read image: {source}")
+    return image
+
+
+def _worker_main(model_name, backend, cores, warmup_sizes, tasks, results, index=0):
+    if hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cores)
+    import torch
+    torch.set_num_threads(len(cores))
+    from services.model_backends import load_model
+    model = load_model(model_name, backend)
+    for size in warmup_sizes:
+        model(np.zeros((size, size, 3), dtype=np.uint8), device="cpu", imgsz=size, verbose=False)
+    results.send((READY, index, model.names, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        job_id, descriptors, params = task
+        handles = []
+        try:
+            images = []
+            for descriptor in descriptors:
+                shm, image = attach_image(descriptor)
+                handles.append(shm)
+                images.append(image)
+            predictions = model(images, device="cpu", batch=len(images), verbose=False, **params)
+            payload = [(p.boxes.data.cpu().numpy(), p.speed) for p in predictions]
+            results.send((job_id, payload, model.names, None))
+        except Exception as e:
+            results.send((job_id, None, None, f"{type(e).__name__}: {e}"))
+        finally:
+            for shm in handles:
+                try:
+                    shm.close()
+                except BufferError:
+                    # The predictor keeps a reference to the last batch; the mapping is
+                    # released as soon as the next batch replaces it
+                    pass
+
+
+READY = "ready"
+
+
+class InferenceProcessPool:
+    """
+    Pool of worker processes, each holding its own model copy pinned to a share of the cores.
+    Images are handed to workers through shared memory; only boxes come back, over a pipe per worker.
+    When a worker dies (OOM, segfault, crash at spawn) the batches it was running fail and it's
+    respawned; a worker dying mid-write can't block the others since nothing is shared between them.
+    """
+
+    # Pause before respawning a dead worker, so a worker crashing at spawn doesn't spin
+    RESPAWN_DELAY_S = 1.0
+
+    def __init__(self, model_name, n_workers, backend="torch", warmup_sizes=(), result_timeout_s=None):
+        self.model_name = model_name
+        self.backend = backend
+        self.warmup_sizes = list(warmup_sizes)
+        self.n_workers = max(1, int(n_workers))
+        self.result_timeout_s = result_timeout_s
+        # Class names of the model, reported by the workers once they're ready
+        self.names = None
+        self._ready_workers = set()
+        self._ready = threading.Event()
+        self._ids = itertools.count()
+        self._pending = {}
+        self._lock = threading.Lock()
+        # One slot per worker: process, task queue, result pipe and the ids of the jobs sent to it
+        self._workers = []
+        self._respawn_at = {}
+        # Jobs submitted while every worker is down, sent to the first one respawned
+        self._backlog = []
+        self._stopping = False
+        self._generation = 0
+
+    def start(self):
+        with self._lock:
+            if self._workers:
+                return
+            self._stopping = False
+            self._generation += 1
+            self._ready_workers = set()
+            self._ready.clear()
+            self._ctx = mp.get_context("spawn")
+            self._shares = core_shares(self.n_workers)
+            self._workers = [None] * self.n_workers
+            for index in range(self.n_workers):
+                self._spawn(index)
+            threading.Thread(target=self._collect_results, args=(self._generation,), name="inference-pool-results",
+                             daemon=True).start()
+
+    def wait_ready(self, timeout=None):
+        """
+        Wait until every worker has loaded and warmed up its model
+        """
+        return self._ready.wait(timeout)
+
+    def shutdown(self):
+        with self._lock:
+            self._stopping = True
+            workers = [worker for worker in self._workers if worker is not None]
+            self._workers = []
+            self._respawn_at = {}
+            futures = list(self._pending.values())
+            self._pending = {}
+            self._backlog = []
+        for future in futures:
+            future.set_exception(RuntimeError("Inference pool was shut down"))
+        for worker in workers:
+            worker["tasks"].put(None)
+        for worker in workers:
+            worker["process"].join(timeout=10)
+            if worker["process"].is_alive():
+                worker["process"].kill()
+
+    def run_batch(self, sources, params):
+        """
+        Run a batch of images on one of the workers and rebuild YOLO Results in this process
+        """
+        from ultralytics.engine.results import Results
+        import torch
+
+        self.start()
+        images = [load_image(source) for source in sources]
+        blocks, descriptors = [], []
+        job_id = None
+        try:
+            for image in images:
+                shm, descriptor = share_image(image)
+                blocks.append(shm)
+                descriptors.append(descriptor)
+            job_id, future = self._submit(descriptors, params)
+            try:
+                payload, names = future.result(timeout=self.result_timeout_s)
+            except FuturesTimeoutError:
+                raise TimeoutError(f"Inference worker didn't answer within {self.result_timeout_s}s") from None
+        finally:
+            if job_id is not None:
+                self._pending.pop(job_id, None)
+            for shm in blocks:
+                shm.close()
+                shm.unlink()
+
+        return [
+            Results(image, path=str(source) if isinstance(source, (str, os.PathLike)) else "image0.jpg",
+                    names=names, boxes=torch.from_numpy(boxes), speed=speed)
+            for source, image, (boxes, speed) in zip(sources, images, payload)
+        ]
+
+    def _spawn(self, index):
+        # Called with the lock held
+        tasks = self._ctx.Queue()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(self.model_name, self.backend, self._shares[index], self.warmup_sizes, tasks, writer, index),
+            daemon=True,
+        )
+        process.start()
+        # Only the worker writes; closing our end lets a dead worker show up as EOF
+        writer.close()
+        worker = {"process": process, "tasks": tasks, "results": reader, "jobs": set()}
+        self._workers[index] = worker
+        for job_id, task in self._backlog:
+            worker["jobs"].add(job_id)
+            tasks.put(task)
+        self._backlog = []
+
+    def _submit(self, descriptors, params):
+        job_id = next(self._ids)
+        future = Future()
+        with self._lock:
+            if not self._workers:
+                raise RuntimeError("Inference pool was shut down")
+            self._pending[job_id] = future
+            alive = [worker for worker in self._workers if worker is not None]
+            if not alive:
+                self._backlog.append((job_id, (job_id, descriptors, params)))
+                return job_id, future
+            worker = min(alive, key=lambda worker: len(worker["jobs"]))
+            worker["jobs"].add(job_id)
+            worker["tasks"].put((job_id, descriptors, params))
+        return job_id, future
+
+    def _collect_results(self, generation):
+        while True:
+            with self._lock:
+                if self._stopping or self._generation != generation:
+                    return
+                workers = [worker for worker in self._workers if worker is not None]
+                timeout = 1.0
+                if self._respawn_at:
+                    timeout = max(0.0, min(min(self._respawn_at.values()) - time.monotonic(), timeout))
+            handles = {}
+            for worker in workers:
+                handles[worker["results"]] = worker
+                handles[worker["process"].sentinel] = worker
+            for handle in wait(list(handles), timeout=timeout):
+                worker = handles[handle]
+                if handle is worker["results"]:
+                    try:
+                        message = worker["results"].recv()
+                    except (EOFError, OSError):
+                        self._worker_died(worker)
+                        continue
+                    self._handle_result(worker, message)
+                elif not worker["results"].poll():
+                    # Exited, and every result it sent has been read
+                    self._worker_died(worker)
+            self._respawn_due()
+
+    def _handle_result(self, worker, message):
+        job_id, payload, names, error = message
+        if job_id == READY:
+            with self._lock:
+                self.names = names
+                self._ready_workers.add(payload)
+                if len(self._ready_workers) >= self.n_workers:
+                    self._ready.set()
+            return
+        with self._lock:
+            worker["jobs"].discard(job_id)
+            future = self._pending.pop(job_id, None)
+        if future is None:
+            return
+        if error:
+            future.set_exception(RuntimeError(f"Inference worker failed: {error}"))
+        else:
+            future.set_result((payload, names))
+
+    def _worker_died(self, worker):
+        worker["process"].join(timeout=1)
+        with self._lock:
+            if self._stopping or worker not in self._workers:
+                return
+            index = self._workers.index(worker)
+            self._workers[index] = None
+            self._ready_workers.discard(index)
+            self._respawn_at[index] = time.monotonic() + self.RESPAWN_DELAY_S
+            futures = [self._pending.pop(job_id, None) for job_id in worker["jobs"]]
+        worker["results"].close()
+        error = RuntimeError(f"Inference worker exited with code {worker['process'].exitcode}")
+        for future in futures:
+            if future is not None:
+                future.set_exception(error)
+
+    def _respawn_due(self):
+        with self._lock:
+            now = time.monotonic()
+            for index, respawn_at in list(self._respawn_at.items()):
+                if respawn_at <= now and not self._stopping:
+                    del self._respawn_at[index]
+                    self._spawn(index)
@@ -0,0 +1,65 @@
+import os
+import json
+from fastapi import HTTPException
+from services.yolo_service import model_names
+
+INFERENCE_PROFILES_FILE = os.getenv("INFERENCE_PROFILES_FILE", "config/inference_profiles.json")
+
+with open(INFERENCE_PROFILES_FILE) as f:
+    _config = json.load(f)
+
+ALLOWLIST = _config["allowlist"]
+PROFILES = _config["profiles"]
+
+
+def profile_image_sizes():
+    """
+    Image sizes used by the configured profiles
+    """
+    return {profile["imgsz"] for profile in PROFILES.values() if "imgsz" in profile}
+
+
+def resolve_inference_params(profile=None, imgsz=None, conf=None, iou=None, classes=None, max_det=None,
+                             tiled=None):
+    """
+    Merge a named profile with explicit overrides and validate them against the allowlist.
+    Returns the keyword arguments to run the model with.
+    """
+    if profile is not None and profile not in PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile '{profile}', expected one of {sorted(PROFILES)}")
+
+    params = dict(PROFILES.get(profile or "default", {}))
+    overrides = {"imgsz": imgsz, "conf": conf, "iou": iou, "classes": classes, "max_det": max_det, "tiled": tiled}
+    params.update({name: value for name, value in overrides.items() if value is not None})
+
+    if "imgsz" in params and params["imgsz"] not in ALLOWLIST["imgsz"]:
+        raise HTTPException(status_code=400, detail=f"imgsz must be one of {ALLOWLIST['imgsz']}")
+    for name in ("conf", "iou"):
+        low, high = ALLOWLIST[name]
+        if name in params and not low <= params[name] <= high:
+            raise HTTPException(status_code=400, detail=f"{name} must be between {low} and {high}")
+    if "max_det" in params and not 1 <= params["max_det"] <= ALLOWLIST["max_det"]:
+        raise HTTPException(status_code=400, detail=f"max_det must be between 1 and {ALLOWLIST['max_det']}")
+    if "classes" in params:
+        params["classes"] = _class_ids(params["classes"])
+    if not params.get("tiled", True):
+        del params["tiled"]
+    return params
+
+
+def _class_ids(classes):
+    """
+    Map class names (or ids) to the model's class ids
+    """
+    names = model_names()
+    ids_by_name = {name: idx for idx, name in names.items()}
+    class_ids = set()
+    for value in classes:
+        value = str(value).strip()
+        if value in ids_by_name:
+            class_ids.add(ids_by_name[value])
+        elif value.isdigit() and int(value) in names:
+            class_ids.add(int(value))
+        else:
+            raise HTTPException(status_code=400, detail=f"Unknown class '{value}'")
+    return sorted(class_ids)
@@ -1,9 +1,9 @@
 from datetime import datetime, timedelta
-from db.dao.detections import get_unique_labels_since_dao
+from services.query_cache import query_cache, LABELS_CACHE_TTL_S, AGGREGATES
+from db.dao.stats import get_hourly_unique_labels_dao
 
-def get_unique_labels(db):
+@query_cache.cached(AGGREGATES, LABELS_CACHE_TTL_S, key=lambda db, days=7: f"labels:{days}")
+def get_unique_labels(db, days=7):
     "Get all distinct labels detected in the last N days (default 7)"
-    days = 7
-    since = datetime.now() - timedelta(days=days)
-    labels = get_unique_labels_since_dao(db, since)
-    return [label[0] for label in labels]
\ No newline at end of file
+    since = datetime.utcnow() - timedelta(days=days)
+    return get_hourly_unique_labels_dao(db, since)
@@ -0,0 +1,70 @@
+import os
+import shutil
+import hashlib
+from contextlib import contextmanager
+from pathlib import Path
+
+# Converted models are exported once and cached here, keyed by the weights' content hash
+MODEL_EXPORT_DIR = os.getenv("MODEL_EXPORT_DIR", "exported_models")
+
+# backend -> (ultralytics export format, suffix of the exported artifact)
+EXPORT_FORMATS = {
+    "onnx": ("onnx", ".onnx"),
+    "openvino": ("openvino", "_openvino_model"),
+}
+BACKENDS = ("torch", *EXPORT_FORMATS)
+
+
+def load_model(model_name, backend="torch", export_dir=MODEL_EXPORT_DIR):
+    """
+    Load a YOLO model running on the given backend (torch, onnx or openvino).
+    Every backend returns the same Results structure.
+    """
+    from ultralytics import YOLO
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown inference backend '{backend}', expected one of {', '.join(BACKENDS)}")
+    if backend == "torch":
+        return YOLO(model_name)
+    return YOLO(export_model(model_name, backend, export_dir), task="detect")
+
+
+def export_model(model_name, backend, export_dir=MODEL_EXPORT_DIR):
+    """
+    Export the torch weights to the backend's format, reusing a previous export of the same weights
+    """
+    from ultralytics import YOLO
+
+    export_format, suffix = EXPORT_FORMATS[backend]
+    weights = YOLO(model_name).ckpt_path
+    with open(weights, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:12]
+    stem = f"{Path(weights).stem}-{digest}"
+    target = os.path.join(export_dir, stem + suffix)
+
+    os.makedirs(export_dir, exist_ok=True)
+    with _export_lock(os.path.join(export_dir, stem + ".lock")):
+        if not os.path.exists(target):
+            # Exports are written next to the weights, so export from a copy inside the export dir
+            staged = os.path.join(export_dir, stem + ".pt")
+            shutil.copyfile(weights, staged)
+            try:
+                # dynamic shapes so batched and per-profile image sizes keep working
+                YOLO(staged).export(format=export_format, dynamic=True)
+            finally:
+                os.remove(staged)
+    return target
+
+
+@contextmanager
+def _export_lock(path):
+    """
+    Inter-process lock so concurrently starting workers export only once
+    """
+    with open(path, "w") as lock_file:
+        try:
+            import fcntl
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        except ImportError:
+            pass
+        yield
@@ -0,0 +1,156 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "uploads/cache")
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_DISK_SIZE = int(os.getenv("PREDICTION_CACHE_DISK_SIZE", "10000"))
+
+logger = logging.getLogger(__name__)
+
+
+def cache_key(image_bytes, model_name, params=None):
+    """
+    Key a prediction by the image content, the model and the inference params
+    """
+    digest = hashlib.sha256(image_bytes)
+    digest.update(model_name.encode("utf-8"))
+    digest.update(json.dumps(params or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()
+
+
+class PredictionResultCache:
+    """
+    Two-tier LRU cache of prediction results: a bounded in-memory tier in front of
+    a bounded on-disk tier (one JSON file per key) that survives restarts.
+    The disk tier's LRU order is kept in memory, indexed once from the file mtimes.
+    """
+
+    def __init__(self, directory, max_entries, max_disk_entries):
+        self.directory = directory
+        self.max_entries = max_entries
+        self.max_disk_entries = max_disk_entries
+        self._entries = OrderedDict()
+        self._disk_entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._index_disk()
+
+    def get(self, key):
+        """
+        Get a cached result, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self._counters["hits"] += 1
+                return entry
+
+        entry = self._read_from_disk(key)
+        with self._lock:
+            if entry is None:
+                self._disk_entries.pop(key, None)
+                self._counters["misses"] += 1
+                return None
+            self._disk_entries[key] = None
+            self._disk_entries.move_to_end(key)
+            self._counters["hits"] += 1
+            self._counters["disk_hits"] += 1
+            self._remember(key, entry)
+        return entry
+
+    def put(self, key, entry):
+        """
+        Store a result in both tiers. A failing disk write is logged, never raised:
+        the prediction it caches is already stored.
+        """
+        with self._lock:
+            self._remember(key, entry)
+        try:
+            self._write_to_disk(key, entry)
+        except Exception:
+            logger.exception("Writing prediction %s to the disk cache failed", key)
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": len(self._entries),
+                "disk_entries": len(self._disk_entries),
+            }
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters["evictions"] += 1
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def _index_disk(self):
+        """
+        Index the files of previous runs, least recently used first
+        """
+        files = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            try:
+                files.append((os.stat(os.path.join(self.directory, name)).st_mtime, name[:-len(".json")]))
+            except FileNotFoundError:
+                continue
+        for _, key in sorted(files):
+            self._disk_entries[key] = None
+        with self._lock:
+            self._evict_disk()
+
+    def _read_from_disk(self, key):
+        path = self._path(key)
+        try:
+            with open(path) as f:
+                entry = json.load(f)
+            os.utime(path)  # keep the LRU order across restarts
+            return entry
+        except (OSError, ValueError):
+            return None
+
+    def _write_to_disk(self, key, entry):
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump(entry, f)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        # replace and index together, so an eviction can't delete a file right after it is rewritten
+        with self._lock:
+            os.replace(tmp_path, path)
+            self._disk_entries[key] = None
+            self._disk_entries.move_to_end(key)
+            self._evict_disk()
+
+    def _evict_disk(self):
+        """
+        Remove the least recently used files past the disk budget; the caller holds the lock
+        """
+        while len(self._disk_entries) > self.max_disk_entries:
+            key, _ = self._disk_entries.popitem(last=False)
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                continue
+            self._counters["evictions"] += 1
+
+
+prediction_cache = PredictionResultCache(PREDICTION_CACHE_DIR, PREDICTION_CACHE_SIZE, PREDICTION_CACHE_DISK_SIZE)
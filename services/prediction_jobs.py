@@ -0,0 +1,102 @@
+import os
+import uuid
+import logging
+import threading
+from db.setup_db import SessionLocal
+from db.dao.predictions import save_prediction_session_dao, update_prediction_status_dao
+from services.prediction_service import run_prediction, prediction_paths, prediction_s3_keys
+from services.query_cache import query_cache, invalidate_prediction
+from services.priority_lanes import LaneQueue, LANES, INTERACTIVE
+
+PREDICTION_JOB_WORKERS = int(os.getenv("PREDICTION_JOB_WORKERS", "4"))
+
+logger = logging.getLogger(__name__)
+
+
+class PredictionJobQueue:
+    """
+    Queue of async predictions drained by a pool of background threads. Jobs wait in an
+    interactive and a bulk lane (see LaneQueue), so bulk submissions can't hold back
+    interactive ones behind them.
+    """
+
+    def __init__(self, workers=4):
+        self.workers = max(1, int(workers))
+        self._queue = LaneQueue()
+        self._condition = threading.Condition()
+        self._threads = []
+        self._counters = {lane: {"submitted": 0, "started": 0} for lane in LANES}
+
+    def submit(self, lane, fn, *args):
+        """
+        Queue `fn(*args)` in a lane
+        """
+        self._ensure_started()
+        with self._condition:
+            self._queue.append((fn, args), lane)
+            self._counters[lane]["submitted"] += 1
+            self._condition.notify()
+
+    def stats(self):
+        with self._condition:
+            return {lane: {"queued": self._queue.depth(lane), **counters} for lane, counters in self._counters.items()}
+
+    def _ensure_started(self):
+        with self._condition:
+            if self._threads:
+                return
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"prediction-job-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue:
+                    self._condition.wait()
+                (fn, args), lane = self._queue.popleft()
+                self._counters[lane]["started"] += 1
+            try:
+                fn(*args)
+            except Exception:
+                logger.exception("Prediction job failed")
+
+
+job_queue = PredictionJobQueue(PREDICTION_JOB_WORKERS)
+
+
+def enqueue_prediction(chat_id, image_name, user_id, db, params=None, lane=INTERACTIVE, deadline=None):
+    """
+    Create a pending prediction session and queue it for the background workers
+    """
+    uid = str(uuid.uuid4())
+    original_path, predicted_path = prediction_paths(chat_id, image_name)
+    original_s3_key, predicted_s3_key = prediction_s3_keys(chat_id, image_name)
+    save_prediction_session_dao(db, uid, original_path, predicted_path, user_id, status="pending",
+                                original_s3_key=original_s3_key, predicted_s3_key=predicted_s3_key,
+                                rendered=False)
+    invalidate_prediction(uid)
+    job_queue.submit(lane, run_prediction_job, uid, chat_id, image_name, user_id, params, lane, deadline)
+    return {"prediction_uid": uid, "status": "pending"}
+
+
+def run_prediction_job(uid, chat_id, image_name, user_id, params=None, lane=INTERACTIVE, deadline=None):
+    """
+    Run a queued prediction on its own DB session and record its outcome
+    (failed, without any S3 or model work, when its deadline passed in the queue)
+    """
+    db = SessionLocal()
+    try:
+        update_prediction_status_dao(db, uid, "running")
+        query_cache.invalidate("prediction", uid)
+        run_prediction(uid, chat_id, image_name, user_id, db, save_session=False, params=params, lane=lane,
+                       deadline=deadline)
+        update_prediction_status_dao(db, uid, "done")
+    except Exception as e:
+        db.rollback()
+        detail = getattr(e, "detail", str(e))
+        update_prediction_status_dao(db, uid, "failed", error=str(detail))
+    finally:
+        query_cache.invalidate("prediction", uid)
+        db.close()
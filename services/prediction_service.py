@@ -1,82 +1,280 @@
+import io
 import os
+import base64
+import json
 import uuid
 import time
 import shutil
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
 from PIL import Image
-from services.yolo_service import model
+from services.yolo_service import run_inference, plot_detections, MODEL_ID
+from services.prediction_cache import prediction_cache, cache_key
+from services.tiling import run_tiled_inference
+from services.s3_service import get_s3_client, download_from_s3
+from services.upload_queue import enqueue_upload
+from services.image_cache import image_cache, UPLOAD_DIR, PREDICTED_DIR
+from services.query_cache import query_cache, invalidate_prediction, COUNT_CACHE_TTL_S, PREDICTION_CACHE_TTL_S, AGGREGATES
+from services.priority_lanes import INTERACTIVE, check_deadline
 from datetime import datetime, timedelta
 from fastapi import HTTPException
-from fastapi.responses import FileResponse
-from db.dao.predictions import (save_prediction_session_dao, 
-                                get_predictions_count_dao,
-                                get_prediction_by_uid_dao,
+from fastapi.responses import Response
+from db.setup_db import SessionLocal
+from db.dao.predictions import (get_prediction_by_uid_dao,
                                 delete_prediction_by_uid_dao,
                                 get_all_predictions_by_label_dao,
-                                get_all_predictions_by_score_dao)
-from db.dao.detections import save_detection_object_dao, get_detection_objects_by_prediction_uid_dao
-import boto3
+                                get_all_predictions_by_score_dao,
+                                get_predictions_by_region_dao,
+                                get_predictions_by_min_area_dao,
+                                mark_prediction_rendered_dao)
+from db.dao.stats import get_hourly_prediction_count_dao
+from db.dao.detections import save_detection_objects_dao, get_detection_objects_by_prediction_uid_dao
 
-UPLOAD_DIR = "uploads/original"
-PREDICTED_DIR = "uploads/predicted"
+# Images are downloaded, decoded, encoded and uploaded in memory; the local copies
+# under uploads/ (a size-bounded cache, see services/image_cache.py) are only written when this is enabled
+KEEP_LOCAL_COPIES = os.getenv("KEEP_LOCAL_COPIES", "true").lower() == "true"
+# eager: render and upload the annotated image before responding
+# background: respond first and render in a low-priority background thread
+# lazy: render on the first GET /prediction/{uid}/image
+RENDER_MODE = os.getenv("RENDER_MODE", "eager")
+RENDER_WORKERS = int(os.getenv("RENDER_WORKERS", "1"))
+# Page size of the label/score listings when no limit is given, and the largest allowed limit
+PREDICTIONS_PAGE_SIZE = int(os.getenv("PREDICTIONS_PAGE_SIZE", "100"))
+PREDICTIONS_MAX_PAGE_SIZE = int(os.getenv("PREDICTIONS_MAX_PAGE_SIZE", "1000"))
 
-os.makedirs(UPLOAD_DIR, exist_ok=True)
-os.makedirs(PREDICTED_DIR, exist_ok=True)
+logger = logging.getLogger(__name__)
+
+
+def _lower_thread_priority():
+    try:
+        os.setpriority(os.PRIO_PROCESS, threading.get_native_id(), 10)
+    except (AttributeError, OSError):
+        pass
+
+
+render_executor = ThreadPoolExecutor(max_workers=RENDER_WORKERS, thread_name_prefix="render",
+                                     initializer=_lower_thread_priority)
 
 def create_prediction(chat_id,image_name, request, db):
-    start_time = time.time()
-    s3 = boto3.client("s3")
-    
-    original_s3_key = f"{chat_id}/original/{image_name}"
+    user_id = getattr(request.state, "user_id", None)
+    params = getattr(request.state, "inference_params", None)
+    lane = getattr(request.state, "priority", INTERACTIVE)
+    deadline = getattr(request.state, "deadline", None)
+    uid = str(uuid.uuid4())
+    return run_prediction(uid, chat_id, image_name, user_id, db, params=params, lane=lane, deadline=deadline)
+
+
+def prediction_paths(chat_id, image_name):
+    """
+    Local paths of the original and predicted images of a prediction
+    """
     original_path = os.path.join(UPLOAD_DIR, chat_id + '-' + image_name ) # keeping original image for caching purpose
     predicted_path = os.path.join(PREDICTED_DIR, chat_id + '-' + image_name) # keeping predicted image for caching purpose
-    uid = str(uuid.uuid4())
+    return original_path, predicted_path
+
+
+def prediction_s3_keys(chat_id, image_name):
+    """
+    S3 keys of the original and predicted images of a prediction
+    """
+    return f"{chat_id}/original/{image_name}", f"{chat_id}/predicted/{image_name}"
+
+
+def run_prediction(uid, chat_id, image_name, user_id, db, save_session=True, params=None, lane=INTERACTIVE,
+                   deadline=None):
+    """
+    Download the image, run YOLO on it, upload the annotated image and store the results.
+    With save_session=False the prediction session row must already exist (async jobs).
+    `params` are the validated inference settings (imgsz, conf, iou, classes, max_det, tiled).
+    Inference is queued in `lane`; past `deadline` (time.monotonic()) DeadlineExceeded is
+    raised instead of downloading or running the model.
+    """
+    check_deadline(deadline)
+    params = params or {}
+    model_params = {name: value for name, value in params.items() if name != "tiled"}
+    start_time = time.time()
+    s3 = get_s3_client()
+    
+    original_s3_key, predicted_s3_key = prediction_s3_keys(chat_id, image_name)
+    original_path, predicted_path = prediction_paths(chat_id, image_name)
     
-    download_from_s3(s3, original_s3_key, original_path)
+    original_bytes = download_from_s3(s3, original_s3_key)
+    if KEEP_LOCAL_COPIES:
+        write_local_copy(original_path, original_bytes, uid)
+
+    # Same image, model and params -> same detections, skip inference entirely
+    key = cache_key(original_bytes, MODEL_ID, params)
+    cached = prediction_cache.get(key)
+    if cached is not None:
+        return _save_cached_prediction(uid, cached, original_path, original_s3_key, user_id, db, save_session,
+                                       start_time)
     
     # Run YOLO prediction
-    results = model(original_path, device="cpu")
-    annotated_frame = results[0].plot()  # NumPy image with boxes
-    annotated_image = Image.fromarray(annotated_frame)
-    annotated_image.save(predicted_path)
+    if params.get("tiled"):
+        results = run_tiled_inference(decode_image(original_bytes), lane=lane, deadline=deadline, **model_params)
+    else:
+        results = run_inference(decode_image(original_bytes), lane=lane, deadline=deadline, **model_params)
 
-    # Upload the predicted image to S3
-    predicted_s3_key = f"{chat_id}/predicted/{image_name}"
-    upload_to_s3(s3, predicted_s3_key, predicted_path)
+    # Render the predicted image, unless it is deferred
+    rendered = RENDER_MODE == "eager"
+    if rendered:
+        predicted_bytes = encode_predicted_image(results[0].plot(), predicted_path, uid)
 
-    # Save prediction session in DB
-    user_id = getattr(request.state, "user_id", None)
-    save_prediction_session_dao(db, uid, original_path, predicted_path, user_id)
+    # Save the prediction session and its detections in DB, in one transaction
+    detections = detections_from_result(results[0])
+    session = session_update = None
+    if save_session:
+        session = prediction_session_row(original_path, predicted_path, user_id, original_s3_key, predicted_s3_key,
+                                         rendered=rendered, upload_status="pending" if rendered else None)
+    elif rendered:
+        session_update = {"rendered": True, "upload_status": "pending"}
+    save_detection_objects_dao(db, uid, detections, session, session_update=session_update)
+    invalidate_prediction(uid)
 
-    detected_labels = []
-    for box in results[0].boxes:
-        label_idx = int(box.cls[0].item())
-        label = model.names[label_idx]
-        score = float(box.conf[0])
-        bbox = box.xyxy[0].tolist()
-        save_detection_object_dao(db, uid, label, score, bbox)
-        detected_labels.append(label)
+    # The upload to S3 runs in the background once the session is stored
+    if rendered:
+        enqueue_upload(uid, predicted_s3_key, predicted_bytes)
+
+    prediction_cache.put(key, {
+        "detections": detections,
+        "predicted_image": predicted_path,
+        "predicted_s3_key": predicted_s3_key,
+    })
+
+    if RENDER_MODE == "background":
+        render_executor.submit(_render_in_background, uid, results[0], predicted_path, predicted_s3_key)
 
     processing_time = round(time.time() - start_time, 2)
 
     return {
         "prediction_uid": uid,
-        "detection_count": len(results[0].boxes),
-        "labels": detected_labels,
+        "detection_count": len(detections),
+        "labels": [detection["label"] for detection in detections],
         "time_took": processing_time,
         "user_id": user_id,
         "predicted_s3_key": predicted_s3_key,
     }
 
 
+def detections_from_result(result):
+    """
+    Convert the boxes of a YOLO result to a list of {"label", "score", "box"}.
+    The box tensors are moved to NumPy once instead of one .item()/.tolist() per box.
+    """
+    if len(result.boxes) == 0:
+        return []
+    data = result.boxes.data.cpu().numpy()
+    boxes = data[:, :4].tolist()
+    scores = data[:, 4].tolist()
+    class_ids = data[:, 5].astype(int).tolist()
+    names = result.names
+    return [
+        {"label": names[class_id], "score": score, "box": box}
+        for box, score, class_id in zip(boxes, scores, class_ids)
+    ]
+
+
+def prediction_session_row(original_path, predicted_path, user_id, original_s3_key, predicted_s3_key,
+                           rendered=True, upload_status=None):
+    """
+    Column values of a new prediction session
+    """
+    return {
+        "original_image": original_path,
+        "predicted_image": predicted_path,
+        "user_id": user_id,
+        "original_s3_key": original_s3_key,
+        "predicted_s3_key": predicted_s3_key,
+        "rendered": rendered,
+        "upload_status": upload_status,
+    }
+
+
+def _save_cached_prediction(uid, cached, original_path, original_s3_key, user_id, db, save_session, start_time):
+    """
+    Store a new prediction session from a cached result, reusing its annotated image
+    """
+    image_cache.link(uid, cached["predicted_image"])
+    session = None
+    if save_session:
+        session = prediction_session_row(original_path, cached["predicted_image"], user_id, original_s3_key,
+                                         cached["predicted_s3_key"], rendered=RENDER_MODE == "eager")
+    save_detection_objects_dao(db, uid, cached["detections"], session)
+    invalidate_prediction(uid)
 
-def get_predictions_count(db):
+    return {
+        "prediction_uid": uid,
+        "detection_count": len(cached["detections"]),
+        "labels": [detection["label"] for detection in cached["detections"]],
+        "time_took": round(time.time() - start_time, 2),
+        "user_id": user_id,
+        "predicted_s3_key": cached["predicted_s3_key"],
+        "cached": True,
+    }
+
+
+def encode_predicted_image(frame, predicted_path, uid=None):
     """
-    Get the total count of prediction sessions
+    Encode an annotated frame and keep its local copy
     """
-    seven_days_ago = datetime.now() - timedelta(days=7)
-    count = get_predictions_count_dao(db,timestamp=seven_days_ago)
+    predicted_bytes = encode_image(frame, predicted_path)
+    if KEEP_LOCAL_COPIES:
+        write_local_copy(predicted_path, predicted_bytes, uid)
+    return predicted_bytes
+
+
+def store_predicted_image(uid, frame, predicted_path, predicted_s3_key, db):
+    """
+    Encode the annotated frame of an existing prediction session, mark it rendered and queue its upload to S3
+    """
+    predicted_bytes = encode_predicted_image(frame, predicted_path, uid)
+    mark_prediction_rendered_dao(db, uid)
+    query_cache.invalidate("prediction", uid)
+    enqueue_upload(uid, predicted_s3_key, predicted_bytes)
+    return predicted_bytes
+
+
+def _render_in_background(uid, result, predicted_path, predicted_s3_key):
+    db = SessionLocal()
+    try:
+        store_predicted_image(uid, result.plot(), predicted_path, predicted_s3_key, db)
+    except Exception:
+        # The image stays unrendered and is rendered on demand when requested
+        logger.exception("Background rendering of prediction %s failed", uid)
+    finally:
+        db.close()
+
+
+def render_prediction_image(prediction, db):
+    """
+    Render the annotated image of a prediction from its stored boxes and original image
+    """
+    if prediction.status in ("pending", "running"):
+        raise HTTPException(status_code=409, detail="Prediction is not done yet")
+
+    original_bytes = read_image(prediction.original_image, prediction.original_s3_key, prediction.uid)
+
+    detections = [
+        {"label": obj.label, "score": obj.score, "box": json.loads(obj.box)}
+        for obj in get_detection_objects_by_prediction_uid_dao(db, prediction.uid)
+    ]
+    frame = plot_detections(decode_image(original_bytes), detections)
+    return store_predicted_image(prediction.uid, frame, prediction.predicted_image, prediction.predicted_s3_key, db)
+
+
+
+@query_cache.cached(AGGREGATES, COUNT_CACHE_TTL_S, key=lambda db, days=7: f"count:{days}")
+def get_predictions_count(db, days=7):
+    """
+    Get the count of prediction sessions in the last N days (from the hourly rollups)
+    """
+    since = datetime.utcnow() - timedelta(days=days)
+    count = get_hourly_prediction_count_dao(db, since)
     return {"prediction_count": count}
 
+@query_cache.cached("prediction", PREDICTION_CACHE_TTL_S, key=lambda uid, db: uid)
 def prediction_by_uid(uid, db):
     """
     Get prediction session by uid with all detected objects
@@ -89,6 +287,9 @@ def prediction_by_uid(uid, db):
 
     return {
         "uid": prediction.uid,
+        "status": prediction.status,
+        "error": prediction.error,
+        "upload_status": prediction.upload_status,
         "timestamp": prediction.timestamp,
         "original_image": prediction.original_image,
         "predicted_image": prediction.predicted_image,
@@ -113,56 +314,88 @@ def delete_prediction_by_uid(uid, db):
         raise HTTPException(status_code=400, detail="Prediction not found")
     
     delete_prediction_by_uid_dao(db, uid)
+    invalidate_prediction(uid)
 
-    # Clean up image files
-    original_image_path = os.path.join(UPLOAD_DIR, uid + ".jpg")
-    predicted_image_path = os.path.join(PREDICTED_DIR, uid + ".jpg")
-
-    if os.path.exists(original_image_path):
-        os.remove(original_image_path)
-    if os.path.exists(predicted_image_path):
-        os.remove(predicted_image_path)
+    # Clean up the local image copies
+    image_cache.remove_uid(uid)
+    for path in (prediction.original_image, prediction.predicted_image):
+        if path:
+            image_cache.remove(path)
 
     return {"detail": "Prediction and images deleted"}
     
 
-def get_all_predictions_by_label(label, db):
+def get_all_predictions_by_label(label, db, limit=None, cursor=None, since=None, until=None):
     """
-    Get prediction sessions containing objects with specified label
+    Get a page of the prediction sessions containing objects with specified label, newest first.
+    Returns the page and the cursor of the next one (None on the last page)
     """
-    predictions = get_all_predictions_by_label_dao(db, label)
+    predictions, next_cursor = _page(get_all_predictions_by_label_dao, db, label, limit, cursor, since, until)
     
     if not predictions:
         raise HTTPException(status_code=404, detail="No predictions found for this label")
     
-    return [
-        {
-            "uid": pred.uid,
-            "timestamp": pred.timestamp,
-            "original_image": pred.original_image,
-            "predicted_image": pred.predicted_image,
-        }
-        for pred in predictions
-    ]
+    return [_prediction_summary(pred) for pred in predictions], next_cursor
 
-def get_all_predictions_by_score(min_score, db):
+def get_all_predictions_by_score(min_score, db, limit=None, cursor=None, since=None, until=None):
     """
-    Get prediction sessions containing objects with score >= min_score
+    Get a page of the prediction sessions containing objects with score >= min_score, newest first.
+    Returns the page and the cursor of the next one (None on the last page)
     """
-    predictions = get_all_predictions_by_score_dao(db, min_score)
+    predictions, next_cursor = _page(get_all_predictions_by_score_dao, db, min_score, limit, cursor, since, until)
     
     if not predictions:
-        return None
+        return None, None
     
-    return [
-        {
-            "uid": pred.uid,
-            "timestamp": pred.timestamp,
-            "original_image": pred.original_image,
-            "predicted_image": pred.predicted_image,
-        }
-        for pred in predictions
-    ]
+    return [_prediction_summary(pred) for pred in predictions], next_cursor
+
+def _page(dao, db, value, limit, cursor, since, until):
+    limit = min(limit or PREDICTIONS_PAGE_SIZE, PREDICTIONS_MAX_PAGE_SIZE)
+    # One extra row tells whether there is a next page
+    predictions = dao(db, value, limit=limit + 1, after=decode_cursor(cursor), since=since, until=until)
+    if len(predictions) <= limit:
+        return predictions, None
+    predictions = predictions[:limit]
+    return predictions, encode_cursor(predictions[-1])
+
+def encode_cursor(pred):
+    """
+    Opaque cursor pointing after a prediction session in the (timestamp, uid) listing order
+    """
+    payload = json.dumps([pred.timestamp.isoformat(), pred.uid]).encode("utf-8")
+    return base64.urlsafe_b64encode(payload).decode("ascii")
+
+def decode_cursor(cursor):
+    if not cursor:
+        return None
+    try:
+        timestamp, uid = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(timestamp), uid
+    except (ValueError, TypeError, UnicodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+def get_predictions_by_region(x1, y1, x2, y2, contained, label, db):
+    """
+    Get prediction sessions with objects overlapping (or contained in) a region of the image
+    """
+    if x2 <= x1 or y2 <= y1:
+        raise HTTPException(status_code=400, detail="Invalid region: x2 and y2 must be greater than x1 and y1")
+    predictions = get_predictions_by_region_dao(db, x1, y1, x2, y2, contained=contained, label=label)
+    return [_prediction_summary(pred) for pred in predictions]
+
+def get_predictions_by_min_area(min_area, db):
+    """
+    Get prediction sessions containing objects with a box area >= min_area
+    """
+    return [_prediction_summary(pred) for pred in get_predictions_by_min_area_dao(db, min_area)]
+
+def _prediction_summary(pred):
+    return {
+        "uid": pred.uid,
+        "timestamp": pred.timestamp,
+        "original_image": pred.original_image,
+        "predicted_image": pred.predicted_image,
+    }
     
 
 def get_prediction_image_by_uid(uid, request, db):
@@ -170,37 +403,65 @@ def get_prediction_image_by_uid(uid, request, db):
     prediction = get_prediction_by_uid_dao(db, uid)
     if not prediction:
         raise HTTPException(status_code=404, detail="Prediction not found")
-    image_path = prediction.predicted_image
+    media_type = accepted_image_type(accept)
+
+    if not prediction.rendered:
+        # Deferred rendering: draw the stored boxes on the original image now
+        return Response(content=render_prediction_image(prediction, db), media_type=media_type)
 
-    if not os.path.exists(image_path):
+    try:
+        predicted_bytes = read_image(prediction.predicted_image, prediction.predicted_s3_key, uid)
+    except HTTPException:
         raise HTTPException(status_code=404, detail="Predicted image file not found")
+    return Response(content=predicted_bytes, media_type=media_type)
 
+def accepted_image_type(accept):
+    """
+    Pick the image media type to respond with from the Accept header
+    """
     if "image/png" in accept:
-        return FileResponse(image_path, media_type="image/png")
+        return "image/png"
     elif "image/jpeg" in accept or "image/jpg" in accept:
-        return FileResponse(image_path, media_type="image/jpeg")
+        return "image/jpeg"
     else:
         # If the client doesn't accept image, respond with 406 Not Acceptable
         raise HTTPException(
             status_code=406, detail="Client does not accept an image format"
         )
 
-def download_from_s3(s3_client, s3_key, path):
+def decode_image(data):
     """
-    Download a file from S3
+    Decode image bytes straight to a BGR NumPy array, the layout YOLO expects
     """
-    bucket = "omri-zaher-yolo"
-    try:
-        s3_client.download_file(bucket, s3_key, path)
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=f"Resource not found in S3: {e}")
+    import cv2
+    image = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        raise HTTPException(status_code=400, detail="Invalid image")
+    return image
 
-def upload_to_s3(s3_client, s3_key, path):
+def encode_image(frame, image_name):
     """
-    Upload a file to S3
+    Encode a NumPy image to bytes, in the format matching the image name's extension
     """
-    bucket = "omri-zaher-yolo"
-    try:
-        s3_client.upload_file(path, bucket, s3_key)
-    except Exception as e:
-        raise HTTPException(status_code=404, detail=f"Error while uploading to S3: {e}")
\ No newline at end of file
+    extension = os.path.splitext(image_name)[1].lower()
+    image_format = Image.registered_extensions().get(extension, "JPEG")
+    buffer = io.BytesIO()
+    Image.fromarray(frame).save(buffer, format=image_format)
+    return buffer.getvalue()
+
+def write_local_copy(path, data, uid=None):
+    """
+    Keep a local copy of an image in the disk cache
+    """
+    image_cache.put(path, data, uid)
+
+def read_image(path, s3_key, uid=None):
+    """
+    Read an image from its local copy, falling back to S3 (and re-caching it) on a miss
+    """
+    data = image_cache.get(path)
+    if data is None:
+        data = download_from_s3(get_s3_client(), s3_key)
+        if KEEP_LOCAL_COPIES:
+            write_local_copy(path, data, uid)
+    return data
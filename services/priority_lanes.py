@@ -0,0 +1,108 @@
+import os
+import time
+from collections import deque
+from fastapi import HTTPException, Request
+
+# interactive: bot requests someone is waiting on; bulk: backfills and batches
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+# While both lanes are waiting, up to LANE_INTERACTIVE_WEIGHT interactive jobs are served
+# for each bulk job, so bulk work keeps moving under a steady interactive load
+LANE_INTERACTIVE_WEIGHT = int(os.getenv("LANE_INTERACTIVE_WEIGHT", "4"))
+
+# Request headers: the lane, and the time budget in milliseconds from the request's arrival
+PRIORITY_HEADER = "X-Priority"
+DEADLINE_HEADER = "X-Deadline-Ms"
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of doing work whose requester has stopped waiting
+    """
+
+    def __init__(self, message="Deadline exceeded"):
+        super().__init__(message)
+
+
+def deadline_passed(deadline):
+    """
+    Whether a time.monotonic() deadline has passed (None never does)
+    """
+    return deadline is not None and time.monotonic() >= deadline
+
+
+def check_deadline(deadline):
+    if deadline_passed(deadline):
+        raise DeadlineExceeded()
+
+
+class LaneQueue:
+    """
+    FIFO per lane with weighted interleaving: the interactive lane goes first, but every
+    `weight` interactive items in a row one bulk item is served if there is one.
+    Not thread-safe: callers hold their own lock.
+    """
+
+    def __init__(self, weight=LANE_INTERACTIVE_WEIGHT):
+        self.weight = max(1, int(weight))
+        self._lanes = {lane: deque() for lane in LANES}
+        self._streak = 0
+
+    def append(self, item, lane):
+        self._lanes[lane].append(item)
+
+    def popleft(self):
+        """
+        Pop the next item and its lane; IndexError when every lane is empty
+        """
+        interactive, bulk = self._lanes[INTERACTIVE], self._lanes[BULK]
+        if interactive and (not bulk or self._streak < self.weight):
+            self._streak += 1
+            return interactive.popleft(), INTERACTIVE
+        if bulk:
+            self._streak = 0
+            return bulk.popleft(), BULK
+        raise IndexError("pop from an empty lane queue")
+
+    def remove(self, item):
+        for items in self._lanes.values():
+            if item in items:
+                items.remove(item)
+                return True
+        return False
+
+    def depth(self, lane):
+        return len(self._lanes[lane])
+
+    def __len__(self):
+        return sum(len(items) for items in self._lanes.values())
+
+
+def request_priority(request: Request, default=INTERACTIVE):
+    """
+    Lane and deadline of a request from its X-Priority and X-Deadline-Ms headers (400 when invalid).
+    The deadline is a time.monotonic() value, None without the header.
+    Both are kept on request.state, so the deadline is counted from the first call.
+    """
+    if hasattr(request.state, "priority"):
+        return request.state.priority, request.state.deadline
+
+    lane = request.headers.get(PRIORITY_HEADER, default).strip().lower()
+    if lane not in LANES:
+        raise HTTPException(status_code=400, detail=f"{PRIORITY_HEADER} must be one of {', '.join(LANES)}")
+
+    deadline = None
+    budget_ms = request.headers.get(DEADLINE_HEADER)
+    if budget_ms is not None:
+        try:
+            budget_ms = float(budget_ms)
+        except ValueError:
+            budget_ms = -1
+        if not budget_ms > 0:
+            raise HTTPException(status_code=400, detail=f"{DEADLINE_HEADER} must be a positive number of milliseconds")
+        deadline = time.monotonic() + budget_ms / 1000
+
+    request.state.priority = lane
+    request.state.deadline = deadline
+    return lane, deadline
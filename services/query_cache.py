@@ -0,0 +1,221 @@
+import os
+import json
+import time
+import hashlib
+import functools
+import threading
+from collections import OrderedDict
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+
+# memory: per-process LRU; redis: shared by every worker process and replica (needs the redis package)
+QUERY_CACHE_BACKEND = os.getenv("QUERY_CACHE_BACKEND", "memory")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "4096"))
+QUERY_CACHE_REDIS_URL = os.getenv("QUERY_CACHE_REDIS_URL", "redis://localhost:6379/0")
+# Per-endpoint TTLs (0 disables caching of the endpoint). Writes invalidate the entries right away,
+# the TTLs only bound how stale an entry can get if an invalidation is missed
+STATS_CACHE_TTL_S = float(os.getenv("STATS_CACHE_TTL_S", "30"))
+LABELS_CACHE_TTL_S = float(os.getenv("LABELS_CACHE_TTL_S", "60"))
+COUNT_CACHE_TTL_S = float(os.getenv("COUNT_CACHE_TTL_S", "30"))
+PREDICTION_CACHE_TTL_S = float(os.getenv("PREDICTION_CACHE_TTL_S", "300"))
+
+# Namespace of the aggregates over every prediction (/stats, /labels, /prediction/count)
+AGGREGATES = "aggregates"
+
+
+class MemoryCacheBackend:
+    """
+    In-process LRU of JSON-able values with a TTL per entry
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._counters = {}
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def set(self, key, value, ttl_s):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + ttl_s, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def incr(self, key):
+        # Counters (namespace generations) are kept apart so the LRU never evicts them
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + 1
+            return self._counters[key]
+
+    def counter(self, key):
+        with self._lock:
+            return self._counters.get(key, 0)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._counters.clear()
+
+    def size(self):
+        with self._lock:
+            return len(self._entries)
+
+
+class RedisCacheBackend:
+    """
+    Cache shared through Redis (or anything speaking its protocol); values are stored as JSON
+    """
+
+    def __init__(self, client):
+        self.client = client
+
+    @classmethod
+    def from_url(cls, url):
+        import redis
+        return cls(redis.Redis.from_url(url))
+
+    def get(self, key):
+        data = self.client.get(key)
+        return None if data is None else json.loads(data)
+
+    def set(self, key, value, ttl_s):
+        self.client.set(key, json.dumps(value), px=max(1, int(ttl_s * 1000)))
+
+    def delete(self, key):
+        self.client.delete(key)
+
+    def incr(self, key):
+        return self.client.incr(key)
+
+    def counter(self, key):
+        return int(self.client.get(key) or 0)
+
+    def clear(self):
+        for key in self.client.scan_iter(match="query:*"):
+            self.client.delete(key)
+
+    def size(self):
+        return self.client.dbsize()
+
+
+class QueryCache:
+    """
+    Cache of the read endpoints' results in front of the database.
+
+    Entries are keyed by namespace and arguments. Invalidating a namespace bumps its generation,
+    which is part of the keys, so every entry of it is dropped at once (e.g. the /stats results
+    of every `days` value); a single entry can also be deleted.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self._lock = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def cached(self, namespace, ttl_s, key):
+        """
+        Decorator caching a service function's JSON-encoded result for ttl_s seconds.
+        `key(*args, **kwargs)` gives the cache key of a call (leaving out the db session).
+        None results aren't cached.
+        """
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if ttl_s <= 0:
+                    return fn(*args, **kwargs)
+                # The key is built before the query runs: a result computed while an invalidation
+                # happens is stored under the previous generation and never read
+                cache_key = self._key(namespace, key(*args, **kwargs))
+                value = self.backend.get(cache_key)
+                if value is not None:
+                    self._count("hits")
+                    return value
+                self._count("misses")
+                value = fn(*args, **kwargs)
+                if value is not None:
+                    value = jsonable_encoder(value)
+                    self.backend.set(cache_key, value, ttl_s)
+                return value
+            return wrapper
+        return decorator
+
+    def invalidate(self, namespace, key=None):
+        """
+        Drop every entry of a namespace, or the entry of one key
+        """
+        if key is None:
+            self.backend.incr(f"query:generation:{namespace}")
+        else:
+            self.backend.delete(self._key(namespace, key))
+        self._count("invalidations")
+
+    def clear(self):
+        """
+        Drop every entry, e.g. after the database was written to behind the services' back
+        """
+        self.backend.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self._counters["hits"] + self._counters["misses"]
+            return {
+                **self._counters,
+                "hit_rate": round(self._counters["hits"] / lookups, 4) if lookups else 0.0,
+                "entries": self.backend.size(),
+            }
+
+    def _key(self, namespace, key):
+        generation = self.backend.counter(f"query:generation:{namespace}")
+        return f"query:{namespace}:{generation}:{key}"
+
+    def _count(self, counter):
+        with self._lock:
+            self._counters[counter] += 1
+
+
+def create_backend():
+    if QUERY_CACHE_BACKEND == "redis":
+        return RedisCacheBackend.from_url(QUERY_CACHE_REDIS_URL)
+    if QUERY_CACHE_BACKEND != "memory":
+        raise ValueError(f"Unknown query cache backend '{QUERY_CACHE_BACKEND}', expected memory or redis")
+    return MemoryCacheBackend(QUERY_CACHE_SIZE)
+
+
+query_cache = QueryCache(create_backend())
+
+
+def invalidate_prediction(uid):
+    """
+    Drop the cached results a change of prediction `uid` makes stale: its details
+    and the aggregates over all predictions
+    """
+    query_cache.invalidate("prediction", uid)
+    query_cache.invalidate(AGGREGATES)
+
+
+def etag_response(request, value):
+    """
+    JSON response carrying an ETag of its body; 304 Not Modified when the client's
+    If-None-Match already has it
+    """
+    response = JSONResponse(content=jsonable_encoder(value))
+    etag = '"' + hashlib.sha1(response.body).hexdigest() + '"'
+    if etag in (tag.strip().removeprefix("W/") for tag in request.headers.get("if-none-match", "").split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+    return response
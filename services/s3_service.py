@@ -0,0 +1,121 @@
+import io
+import os
+import threading
+from fastapi import HTTPException
+
+S3_BUCKET = os.getenv("S3_BUCKET", "omri-zaher-yolo")
+# Connection pool shared by every thread using the client; it should cover the
+# request workers plus the batch/render threads so they don't wait for a connection
+S3_MAX_POOL_CONNECTIONS = int(os.getenv("S3_MAX_POOL_CONNECTIONS", "50"))
+S3_CONNECT_TIMEOUT = float(os.getenv("S3_CONNECT_TIMEOUT", "5"))
+S3_READ_TIMEOUT = float(os.getenv("S3_READ_TIMEOUT", "30"))
+S3_TCP_KEEPALIVE = os.getenv("S3_TCP_KEEPALIVE", "true").lower() == "true"
+# botocore retry policy: standard or adaptive (client-side rate limiting on throttling)
+S3_RETRY_MODE = os.getenv("S3_RETRY_MODE", "standard")
+S3_MAX_ATTEMPTS = int(os.getenv("S3_MAX_ATTEMPTS", "5"))
+# Transfers above the threshold are split into parts moved by up to S3_MAX_CONCURRENCY threads
+S3_MULTIPART_THRESHOLD_MB = int(os.getenv("S3_MULTIPART_THRESHOLD_MB", "8"))
+S3_MULTIPART_CHUNKSIZE_MB = int(os.getenv("S3_MULTIPART_CHUNKSIZE_MB", "8"))
+S3_MAX_CONCURRENCY = int(os.getenv("S3_MAX_CONCURRENCY", "10"))
+# Optional custom endpoint (e.g. MinIO or a local S3 stand-in)
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+
+_client = None
+_transfer_config = None
+_client_lock = threading.Lock()
+
+
+def create_s3_client():
+    """
+    Create an S3 client with the configured connection pool, keep-alive, timeouts and retries
+    (boto3 is imported on first use to keep startup fast)
+    """
+    import boto3
+    from botocore.config import Config
+
+    config = Config(
+        max_pool_connections=S3_MAX_POOL_CONNECTIONS,
+        connect_timeout=S3_CONNECT_TIMEOUT,
+        read_timeout=S3_READ_TIMEOUT,
+        tcp_keepalive=S3_TCP_KEEPALIVE,
+        retries={"mode": S3_RETRY_MODE, "max_attempts": S3_MAX_ATTEMPTS},
+    )
+    # boto3's default session isn't thread-safe, so the client is built from its own session
+    return boto3.session.Session().client("s3", config=config, endpoint_url=S3_ENDPOINT_URL)
+
+
+def get_s3_client():
+    """
+    Get the process-wide S3 client, creating it on first use.
+    botocore clients are thread-safe, so it's shared by every request and worker thread.
+    Also usable as a FastAPI dependency: `s3 = Depends(get_s3_client)`.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = create_s3_client()
+    return _client
+
+
+def reset_s3_client():
+    """
+    Drop the shared client, e.g. after the S3 settings or credentials changed
+    """
+    global _client
+    with _client_lock:
+        _client = None
+
+
+def transfer_config():
+    """
+    Transfer manager settings of uploads and downloads
+    """
+    global _transfer_config
+    if _transfer_config is None:
+        from boto3.s3.transfer import TransferConfig
+        _transfer_config = TransferConfig(
+            multipart_threshold=S3_MULTIPART_THRESHOLD_MB * 1024 * 1024,
+            multipart_chunksize=S3_MULTIPART_CHUNKSIZE_MB * 1024 * 1024,
+            max_concurrency=S3_MAX_CONCURRENCY,
+            use_threads=S3_MAX_CONCURRENCY > 1,
+        )
+    return _transfer_config
+
+
+def download_from_s3(s3_client, s3_key):
+    """
+    Download a file from S3 into memory
+    """
+    buffer = io.BytesIO()
+    try:
+        s3_client.download_fileobj(S3_BUCKET, s3_key, buffer, Config=transfer_config())
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Resource not found in S3: {e}")
+    return buffer.getvalue()
+
+
+def list_s3_keys(s3_client, prefix, limit=None, match=None):
+    """
+    List the object keys under a prefix (only those `match(key)` accepts, if given),
+    stopping after `limit` listed keys
+    """
+    keys = []
+    try:
+        for page in s3_client.get_paginator("list_objects_v2").paginate(Bucket=S3_BUCKET, Prefix=prefix):
+            for obj in page.get("Contents", []):
+                if match is not None and not match(obj["Key"]):
+                    continue
+                keys.append(obj["Key"])
+                if limit is not None and len(keys) >= limit:
+                    return keys
+    except Exception as e:
+        raise HTTPException(status_code=404, detail=f"Error while listing S3: {e}")
+    return keys
+
+
+def upload_to_s3(s3_client, s3_key, data):
+    """
+    Upload in-memory file contents to S3 (errors propagate to the background uploader, which retries)
+    """
+    s3_client.upload_fileobj(io.BytesIO(data), S3_BUCKET, s3_key, Config=transfer_config())
@@ -1,19 +1,20 @@
 from datetime import datetime, timedelta
-from db.dao.predictions import get_predictions_count_dao
-from db.dao.detections import get_average_detection_score_since, get_most_common_labels_since
+from services.query_cache import query_cache, STATS_CACHE_TTL_S, AGGREGATES
+from db.dao.stats import get_hourly_prediction_count_dao, get_hourly_average_score_dao, get_hourly_most_common_labels_dao
 
+@query_cache.cached(AGGREGATES, STATS_CACHE_TTL_S, key=lambda db, days=7: f"stats:{days}")
 def get_stats_data(db, days=7):
-    since = datetime.now() - timedelta(days=days)
+    # Read from the hourly rollups: the cost grows with the hours in the window, not with the detections
+    since = datetime.utcnow() - timedelta(days=days)
     # 1. Total number of predictions made in the last N days
-    total_predictions = get_predictions_count_dao(db, since)
+    total_predictions = get_hourly_prediction_count_dao(db, since)
 
     # 2. Average confidence scores in the last N days
-    avg_score = get_average_detection_score_since(db, since)
+    avg_score = get_hourly_average_score_dao(db, since)
     avg_score = round(avg_score, 4) if avg_score is not None else 0.0
 
     # 3. Most frequently detected object labels in the last N days
-    rows = get_most_common_labels_since(db, since, limit=5)
-  # Debugging line to check the output of the query
+    rows = get_hourly_most_common_labels_dao(db, since, limit=5)
     most_common_labels = {row[0]: row[1] for row in rows}
 
     return {
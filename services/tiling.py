@@ -0,0 +1,81 @@
+import os
+import numpy as np
+from services.yolo_service import scheduler
+from services.priority_lanes import INTERACTIVE
+
+# Large images are sliced into TILE_SIZE x TILE_SIZE tiles overlapping by TILE_OVERLAP pixels.
+# TILE_BATCH_SIZE tiles are queued at once on the batching scheduler.
+TILE_SIZE = int(os.getenv("TILE_SIZE", "640"))
+TILE_OVERLAP = int(os.getenv("TILE_OVERLAP", "128"))
+TILE_BATCH_SIZE = int(os.getenv("TILE_BATCH_SIZE", "8"))
+# IoU threshold of the cross-tile NMS merging duplicates found in overlapping tiles
+TILE_MERGE_IOU = float(os.getenv("TILE_MERGE_IOU", "0.5"))
+
+
+def tile_origins(length, tile_size, overlap):
+    """
+    Start offsets of overlapping tiles covering `length` pixels; the last tile is aligned to the edge
+    """
+    if length <= tile_size:
+        return [0]
+    step = max(1, tile_size - overlap)
+    origins = list(range(0, length - tile_size + 1, step))
+    if origins[-1] != length - tile_size:
+        origins.append(length - tile_size)
+    return origins
+
+
+def slice_image(image, tile_size, overlap):
+    """
+    Slice an image into overlapping tiles. Returns a list of ((x, y), tile).
+    """
+    height, width = image.shape[:2]
+    return [
+        ((x, y), np.ascontiguousarray(image[y:y + tile_size, x:x + tile_size]))
+        for y in tile_origins(height, tile_size, overlap)
+        for x in tile_origins(width, tile_size, overlap)
+    ]
+
+
+def merge_tile_detections(tile_boxes, offsets, iou=TILE_MERGE_IOU, max_det=300):
+    """
+    Shift per-tile boxes (N x 6: x1, y1, x2, y2, conf, cls) to image coordinates
+    and drop the duplicates of overlapping tiles with per-class NMS
+    """
+    import torch
+    import torchvision
+
+    shifted = []
+    for boxes, (x, y) in zip(tile_boxes, offsets):
+        boxes = boxes.clone()
+        boxes[:, [0, 2]] += x
+        boxes[:, [1, 3]] += y
+        shifted.append(boxes)
+    merged = torch.cat(shifted) if shifted else torch.zeros((0, 6))
+    keep = torchvision.ops.batched_nms(merged[:, :4], merged[:, 4], merged[:, 5].long(), iou)
+    return merged[keep[:max_det]]
+
+
+def run_tiled_inference(image, tile_size=TILE_SIZE, overlap=TILE_OVERLAP, batch_size=TILE_BATCH_SIZE,
+                        lane=INTERACTIVE, deadline=None, **params):
+    """
+    Run YOLO on overlapping tiles of an image and merge the boxes back into image coordinates.
+    Returns a one-element list of Results over the whole image, like `run_inference`.
+    """
+    from ultralytics.engine.results import Results
+
+    tiles = slice_image(image, tile_size, overlap)
+    tile_params = {"imgsz": tile_size, **params}
+
+    tile_results = []
+    for start in range(0, len(tiles), batch_size):
+        futures = [scheduler.submit(tile, lane=lane, deadline=deadline, **tile_params) for _, tile in tiles[start:start + batch_size]]
+        tile_results.extend(future.result() for future in futures)
+
+    boxes = merge_tile_detections(
+        [result.boxes.data.cpu() for result in tile_results],
+        [offset for offset, _ in tiles],
+        iou=params.get("iou", TILE_MERGE_IOU),
+        max_det=params.get("max_det", 300),
+    )
+    return [Results(image, path="image0.jpg", names=tile_results[0].names, boxes=boxes)]
@@ -0,0 +1,92 @@
+import os
+import hmac
+import json
+import time
+import base64
+import hashlib
+import logging
+from fastapi import HTTPException
+from db.dao.users import get_user_by_id_dao
+from services.user_service import authenticate_user
+
+# HMAC key of the bearer tokens. Every worker process and replica must share it: tokens signed
+# with the random per-process default are only accepted by the process that issued them
+AUTH_TOKEN_SECRET = os.getenv("AUTH_TOKEN_SECRET", "").encode("utf-8")
+ACCESS_TOKEN_TTL_S = int(os.getenv("ACCESS_TOKEN_TTL_S", "900"))
+REFRESH_TOKEN_TTL_S = int(os.getenv("REFRESH_TOKEN_TTL_S", str(7 * 24 * 3600)))
+
+logger = logging.getLogger(__name__)
+
+if not AUTH_TOKEN_SECRET:
+    logger.warning("AUTH_TOKEN_SECRET is not set: bearer tokens are only valid in the process that issued them")
+    AUTH_TOKEN_SECRET = os.urandom(32)
+
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64decode(data):
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
+
+
+def _sign(payload):
+    return hmac.new(AUTH_TOKEN_SECRET, payload.encode("ascii"), hashlib.sha256).digest()
+
+
+def create_token(user_id, token_type="access", ttl_s=None):
+    """
+    Signed token `<base64 claims>.<base64 HMAC-SHA256>` for a user, expiring after ttl_s seconds
+    """
+    ttl_s = ttl_s if ttl_s is not None else ACCESS_TOKEN_TTL_S if token_type == "access" else REFRESH_TOKEN_TTL_S
+    now = int(time.time())
+    claims = {"sub": user_id, "typ": token_type, "iat": now, "exp": now + ttl_s}
+    payload = _b64encode(json.dumps(claims, separators=(",", ":")).encode("utf-8"))
+    return payload + "." + _b64encode(_sign(payload))
+
+
+def verify_token(token, token_type="access"):
+    """
+    The user id of a valid, unexpired token of the given type, or None. No database access
+    """
+    try:
+        payload, signature = token.split(".")
+        if not hmac.compare_digest(_b64decode(signature), _sign(payload)):
+            return None
+        claims = json.loads(_b64decode(payload))
+    except (ValueError, TypeError, UnicodeError):
+        return None
+    if claims.get("typ") != token_type or claims.get("exp", 0) <= time.time():
+        return None
+    return claims.get("sub")
+
+
+def issue_tokens(user_id):
+    return {
+        "access_token": create_token(user_id, "access"),
+        "token_type": "bearer",
+        "expires_in": ACCESS_TOKEN_TTL_S,
+        "refresh_token": create_token(user_id, "refresh"),
+    }
+
+
+def create_tokens(username, password, db):
+    """
+    Exchange credentials for an access token and a refresh token
+    """
+    if not username or not password:
+        raise HTTPException(status_code=400, detail="Invalid Credentials")
+    user_id = authenticate_user(username, password, db)
+    if not user_id:
+        raise HTTPException(status_code=401, detail="Unauthorized")
+    return issue_tokens(user_id)
+
+
+def refresh_tokens(refresh_token, db):
+    """
+    Exchange a refresh token for a new access token and refresh token, if its user still exists
+    """
+    user_id = verify_token(refresh_token or "", token_type="refresh")
+    if user_id is None or get_user_by_id_dao(db, user_id) is None:
+        raise HTTPException(status_code=401, detail="Invalid refresh token")
+    return issue_tokens(user_id)
@@ -0,0 +1,197 @@
+import os
+import json
+import time
+import uuid
+import heapq
+import random
+import shutil
+import logging
+import threading
+from db.setup_db import SessionLocal
+from db.dao.predictions import update_upload_status_dao
+from services.s3_service import get_s3_client, upload_to_s3
+from services.query_cache import query_cache
+
+UPLOAD_QUEUE_DIR = os.getenv("UPLOAD_QUEUE_DIR", "uploads/upload_queue")
+UPLOAD_WORKERS = int(os.getenv("UPLOAD_WORKERS", "4"))
+# A failed upload is retried after UPLOAD_BACKOFF_S, doubling up to UPLOAD_MAX_BACKOFF_S,
+# and given up after UPLOAD_MAX_ATTEMPTS attempts
+UPLOAD_MAX_ATTEMPTS = int(os.getenv("UPLOAD_MAX_ATTEMPTS", "8"))
+UPLOAD_BACKOFF_S = float(os.getenv("UPLOAD_BACKOFF_S", "1"))
+UPLOAD_MAX_BACKOFF_S = float(os.getenv("UPLOAD_MAX_BACKOFF_S", "300"))
+
+logger = logging.getLogger(__name__)
+
+
+class UploadQueue:
+    """
+    Durable queue of S3 uploads drained by a pool of background uploader threads.
+
+    Every job is written to `directory` (payload + JSON metadata) before `put` returns,
+    so queued uploads survive a restart. Failed uploads are retried with exponential backoff;
+    jobs that run out of attempts are moved to `directory`/failed.
+    `upload(s3_key, data)` does the upload, `on_status(uid, status)` records "uploaded" or "failed".
+    """
+
+    def __init__(self, directory, upload, on_status, workers=4, max_attempts=8, backoff_s=1.0,
+                 max_backoff_s=300.0):
+        self.directory = directory
+        self.upload = upload
+        self.on_status = on_status
+        self.workers = max(1, int(workers))
+        self.max_attempts = max(1, int(max_attempts))
+        self.backoff_s = backoff_s
+        self.max_backoff_s = max_backoff_s
+        self._schedule = []
+        self._in_flight = 0
+        self._condition = threading.Condition()
+        self._threads = []
+        self._counters = {"uploaded": 0, "retries": 0, "failed": 0}
+
+    def start(self):
+        """
+        Start the uploader threads and resume the jobs persisted by a previous run
+        """
+        with self._condition:
+            if self._threads:
+                return
+            os.makedirs(os.path.join(self.directory, "failed"), exist_ok=True)
+            for name in os.listdir(self.directory):
+                if name.endswith(".json"):
+                    with open(os.path.join(self.directory, name)) as f:
+                        job = json.load(f)
+                    heapq.heappush(self._schedule, (job["next_attempt_at"], job["id"]))
+            for index in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f"s3-upload-{index}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            if self._schedule:
+                logger.info("Resuming %d queued uploads", len(self._schedule))
+
+    def put(self, uid, s3_key, data):
+        """
+        Persist an upload of `data` to `s3_key` for prediction `uid` and queue it
+        """
+        self.start()
+        job = {"id": uuid.uuid4().hex, "uid": uid, "s3_key": s3_key, "attempts": 0, "next_attempt_at": time.time()}
+        self._write(self._data_path(job["id"]), data)
+        self._write(self._job_path(job["id"]), json.dumps(job).encode("utf-8"))
+        with self._condition:
+            heapq.heappush(self._schedule, (job["next_attempt_at"], job["id"]))
+            self._condition.notify()
+        return job["id"]
+
+    def wait_idle(self, timeout=None):
+        """
+        Wait until every queued upload has been uploaded or given up; returns False on timeout
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._in_flight or self._schedule:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(0.05 if remaining is None else min(remaining, 0.05))
+        return True
+
+    def stats(self):
+        with self._condition:
+            return {"queued": len(self._schedule), "in_flight": self._in_flight, **self._counters}
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._schedule or self._schedule[0][0] > time.time():
+                    timeout = self._schedule[0][0] - time.time() if self._schedule else None
+                    self._condition.wait(timeout)
+                _, job_id = heapq.heappop(self._schedule)
+                self._in_flight += 1
+            try:
+                self._attempt(job_id)
+            except Exception:
+                logger.exception("Upload job %s crashed", job_id)
+            finally:
+                with self._condition:
+                    self._in_flight -= 1
+                    self._condition.notify_all()
+
+    def _attempt(self, job_id):
+        with open(self._job_path(job_id)) as f:
+            job = json.load(f)
+        with open(self._data_path(job_id), "rb") as f:
+            data = f.read()
+
+        try:
+            self.upload(job["s3_key"], data)
+        except Exception as e:
+            job["attempts"] += 1
+            if job["attempts"] >= self.max_attempts:
+                logger.error("Giving up uploading %s after %d attempts: %s", job["s3_key"], job["attempts"], e)
+                for path in (self._data_path(job_id), self._job_path(job_id)):
+                    shutil.move(path, os.path.join(self.directory, "failed", os.path.basename(path)))
+                self._count("failed")
+                self._record(job["uid"], "failed")
+                return
+            # Exponential backoff with jitter so a recovering S3 isn't hit by every job at once
+            delay = min(self.max_backoff_s, self.backoff_s * 2 ** (job["attempts"] - 1))
+            job["next_attempt_at"] = time.time() + delay * random.uniform(0.5, 1.0)
+            logger.warning("Upload of %s failed (attempt %d), retrying: %s", job["s3_key"], job["attempts"], e)
+            self._write(self._job_path(job_id), json.dumps(job).encode("utf-8"))
+            self._count("retries")
+            with self._condition:
+                heapq.heappush(self._schedule, (job["next_attempt_at"], job_id))
+                self._condition.notify()
+            return
+
+        os.remove(self._data_path(job_id))
+        os.remove(self._job_path(job_id))
+        self._count("uploaded")
+        self._record(job["uid"], "uploaded")
+
+    def _record(self, uid, status):
+        try:
+            self.on_status(uid, status)
+        except Exception:
+            logger.exception("Recording upload status of prediction %s failed", uid)
+
+    def _count(self, counter):
+        with self._condition:
+            self._counters[counter] += 1
+
+    def _job_path(self, job_id):
+        return os.path.join(self.directory, job_id + ".json")
+
+    def _data_path(self, job_id):
+        return os.path.join(self.directory, job_id + ".data")
+
+    @staticmethod
+    def _write(path, data):
+        # Write then rename, so a crash never leaves a half-written job behind
+        with open(path + ".tmp", "wb") as f:
+            f.write(data)
+        os.replace(path + ".tmp", path)
+
+
+def _upload(s3_key, data):
+    upload_to_s3(get_s3_client(), s3_key, data)
+
+
+def _record_upload_status(uid, status):
+    db = SessionLocal()
+    try:
+        update_upload_status_dao(db, uid, status)
+        query_cache.invalidate("prediction", uid)
+    finally:
+        db.close()
+
+
+upload_queue = UploadQueue(UPLOAD_QUEUE_DIR, _upload, _record_upload_status, workers=UPLOAD_WORKERS,
+                           max_attempts=UPLOAD_MAX_ATTEMPTS, backoff_s=UPLOAD_BACKOFF_S,
+                           max_backoff_s=UPLOAD_MAX_BACKOFF_S)
+
+
+def enqueue_upload(uid, s3_key, data):
+    """
+    Hand the upload of a predicted image to the background uploaders
+    """
+    return upload_queue.put(uid, s3_key, data)
@@ -2,6 +2,24 @@ import bcrypt
 from fastapi import HTTPException
 from models.user import User
 from db.dao.users import get_user_by_username_dao, create_user_dao
+from services.credential_cache import credential_cache
+
+def authenticate_user(username, password, db):
+    """
+    Get the id of the user with these credentials, or None.
+    Verified credentials are cached, so bcrypt only runs on a cache miss.
+    """
+    username = username.lower().strip()
+    user_id = credential_cache.get(username, password)
+    if user_id is not None:
+        return user_id
+    user = get_user_by_username_dao(db, username)
+    if not user:
+        return None
+    if bcrypt.checkpw(password.encode("utf-8"), user.password.encode("utf-8")):
+        credential_cache.put(username, password, user.id)
+        return user.id
+    return None
 
 def create_new_user(username, password, db):
     if not username or not password or username.strip() == "" or password.strip() == "":
@@ -19,6 +37,7 @@ def create_new_user(username, password, db):
     
     user = User(username=username, password=hashed_pw)
     create_user_dao(db, user)
+    credential_cache.invalidate_user(username)
     
     return {"detail": "User created successfully"}
         
@@ -1,2 +1,269 @@
-from ultralytics import YOLO
-model = YOLO("yolov8n.pt")
\ No newline at end of file
+import os
+import threading
+import time
+from concurrent.futures import Future
+from services.inference_pool import InferenceProcessPool
+from services.model_backends import load_model
+from services.priority_lanes import (LaneQueue, LANES, INTERACTIVE, LANE_INTERACTIVE_WEIGHT, DeadlineExceeded,
+                                    deadline_passed)
+
+MODEL_NAME = "yolov8n.pt"
+# torch (PyTorch eager), onnx (ONNX Runtime) or openvino; non-torch backends are
+# exported from the torch weights at startup and cached in MODEL_EXPORT_DIR
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch")
+# Identifies the model whose outputs are cached; backends may differ in the last decimals
+MODEL_ID = f"{MODEL_NAME}:{INFERENCE_BACKEND}"
+
+# Micro-batching window: concurrent requests arriving within INFERENCE_MAX_WAIT_MS
+# of each other are run as a single forward pass of up to INFERENCE_MAX_BATCH_SIZE images.
+INFERENCE_MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH_SIZE", "8"))
+INFERENCE_MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", "5"))
+
+# "thread" runs the model in this process; "process" runs it in INFERENCE_WORKERS
+# worker processes, each with its own model copy pinned to a share of the cores.
+INFERENCE_BACKEND_MODE = os.getenv("INFERENCE_BACKEND_MODE", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", "2"))
+# A batch not answered by its worker within this many seconds fails (0 waits forever)
+INFERENCE_RESULT_TIMEOUT_S = float(os.getenv("INFERENCE_RESULT_TIMEOUT_S", "60"))
+
+# Image sizes warmed up with dummy inferences at startup, before /ready reports ready
+WARMUP_IMAGE_SIZES = [int(size) for size in os.getenv("WARMUP_IMAGE_SIZES", "640").split(",") if size.strip()]
+
+# Loaded on first use (or by the startup warmup) so importing the app doesn't pay for the ML stack
+model = None
+_model_lock = threading.Lock()
+model_ready = threading.Event()
+
+
+def get_model():
+    """
+    Get the YOLO model, loading it on first use
+    """
+    global model
+    if model is None:
+        with _model_lock:
+            if model is None:
+                # Disable GPU usage
+                import torch
+                torch.cuda.is_available = lambda: False
+                model = load_model(MODEL_NAME, INFERENCE_BACKEND)
+    return model
+
+
+def model_names():
+    """
+    Class names of the model (id -> name), without loading a model copy in this process
+    when the workers hold it
+    """
+    if pool is not None:
+        if pool.names is None:
+            pool.start()
+            pool.wait_ready()
+        return pool.names
+    return get_model().names
+
+
+class _InferenceJob:
+    def __init__(self, source, params, lane, deadline):
+        self.source = source
+        self.params = params
+        self.lane = lane
+        self.deadline = deadline
+        # Only requests with identical inference params can share a forward pass
+        self.key = repr(sorted(params.items()))
+        self.future = Future()
+        self.queued_at = time.monotonic()
+
+
+class InferenceScheduler:
+    """
+    Collects concurrent inference requests and runs them as one batched forward pass.
+
+    `run_batch(sources, params)` must return one result per source, in order.
+    Up to `concurrency` batches are dispatched at the same time.
+    Jobs wait in an interactive and a bulk lane (see services/priority_lanes.py); jobs whose
+    deadline passed while queued fail with DeadlineExceeded without reaching the model.
+    """
+
+    def __init__(self, run_batch, max_batch_size=8, max_wait_ms=5, concurrency=1,
+                 lane_weight=LANE_INTERACTIVE_WEIGHT):
+        self.run_batch = run_batch
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait_ms = max(0.0, float(max_wait_ms))
+        self.concurrency = max(1, int(concurrency))
+        self._queue = LaneQueue(lane_weight)
+        self._ready = threading.Condition()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._counters = {lane: {"submitted": 0, "completed": 0, "failed": 0, "expired": 0, "wait_ms": 0.0}
+                          for lane in LANES}
+
+    def submit(self, source, lane=INTERACTIVE, deadline=None, **params):
+        """
+        Queue a single image for inference in a lane and return a Future of its result.
+        `deadline` is a time.monotonic() value past which the job is dropped.
+        """
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane '{lane}', expected one of {', '.join(LANES)}")
+        self._ensure_started()
+        job = _InferenceJob(source, params, lane, deadline)
+        with self._ready:
+            self._counters[lane]["submitted"] += 1
+            if deadline_passed(deadline):
+                self._counters[lane]["expired"] += 1
+                job.future.set_exception(DeadlineExceeded())
+                return job.future
+            self._queue.append(job, lane)
+            self._ready.notify()
+        return job.future
+
+    def predict(self, source, lane=INTERACTIVE, deadline=None, **params):
+        """
+        Run inference on a single image, blocking until its batch has been processed
+        """
+        return self.submit(source, lane=lane, deadline=deadline, **params).result()
+
+    def stats(self):
+        with self._ready:
+            stats = {}
+            for lane, counters in self._counters.items():
+                started = counters["completed"] + counters["failed"]
+                stats[lane] = {
+                    "queued": self._queue.depth(lane),
+                    **{name: value for name, value in counters.items() if name != "wait_ms"},
+                    "avg_wait_ms": round(counters["wait_ms"] / started, 2) if started else 0.0,
+                }
+            return stats
+
+    def _ensure_started(self):
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.concurrency):
+                thread = threading.Thread(target=self._loop, name=f"inference-scheduler-{i}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+
+    def _loop(self):
+        while True:
+            self._dispatch(self._collect_batch())
+
+    def _collect_batch(self):
+        batch = []
+        expired = []
+        window_end = None
+        with self._ready:
+            while len(batch) < self.max_batch_size:
+                if self._queue:
+                    job, lane = self._queue.popleft()
+                    if deadline_passed(job.deadline):
+                        self._counters[lane]["expired"] += 1
+                        expired.append(job)
+                        continue
+                    self._counters[lane]["wait_ms"] += (time.monotonic() - job.queued_at) * 1000
+                    batch.append(job)
+                    if window_end is None:
+                        window_end = time.monotonic() + self.max_wait_ms / 1000
+                    continue
+                if window_end is None:
+                    # Nothing to run yet (or only expired jobs): wait for the first job
+                    if expired:
+                        break
+                    self._ready.wait()
+                    continue
+                remaining = window_end - time.monotonic()
+                if remaining <= 0 or not self._ready.wait(remaining):
+                    break
+        for job in expired:
+            job.future.set_exception(DeadlineExceeded())
+        return batch
+
+    def _dispatch(self, batch):
+        groups = {}
+        for job in batch:
+            groups.setdefault(job.key, []).append(job)
+
+        for jobs in groups.values():
+            try:
+                results = self.run_batch([job.source for job in jobs], jobs[0].params)
+                if len(results) != len(jobs):
+                    raise RuntimeError(f"Expected {len(jobs)} inference results, got {len(results)}")
+            except Exception as e:
+                self._count(jobs, "failed")
+                for job in jobs:
+                    job.future.set_exception(e)
+                continue
+            self._count(jobs, "completed")
+            for job, result in zip(jobs, results):
+                job.future.set_result(result)
+
+    def _count(self, jobs, counter):
+        with self._ready:
+            for job in jobs:
+                self._counters[job.lane][counter] += 1
+
+
+def _run_model_batch(sources, params):
+    return get_model()(sources, device="cpu", batch=len(sources), **params)
+
+
+if INFERENCE_BACKEND_MODE == "process":
+    pool = InferenceProcessPool(MODEL_NAME, INFERENCE_WORKERS, backend=INFERENCE_BACKEND,
+                                warmup_sizes=WARMUP_IMAGE_SIZES,
+                                result_timeout_s=INFERENCE_RESULT_TIMEOUT_S or None)
+    scheduler = InferenceScheduler(pool.run_batch, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS,
+                                   concurrency=pool.n_workers)
+else:
+    pool = None
+    scheduler = InferenceScheduler(_run_model_batch, INFERENCE_MAX_BATCH_SIZE, INFERENCE_MAX_WAIT_MS)
+
+
+def run_inference(source, lane=INTERACTIVE, deadline=None, **params):
+    """
+    Run YOLO on a single image through the batching scheduler, in the given lane.
+    Returns a one-element list, mirroring `model(source)`.
+    """
+    return [scheduler.predict(source, lane=lane, deadline=deadline, **params)]
+
+
+def warmup(sizes=None):
+    """
+    Load the model and run dummy inferences at the given sizes so the first real
+    requests don't pay for lazy initialization, then mark the model ready
+    """
+    import numpy as np
+
+    sizes = WARMUP_IMAGE_SIZES if sizes is None else sizes
+    if pool is not None:
+        # Every worker loads and warms up its own model copy before reporting ready;
+        # this process doesn't need one
+        pool.start()
+        pool.wait_ready()
+    else:
+        get_model()
+        for size in sizes:
+            scheduler.predict(np.zeros((size, size, 3), dtype=np.uint8), imgsz=size, verbose=False)
+    model_ready.set()
+
+
+def start_warmup(sizes=None):
+    """
+    Warm the model up in a background thread, so the server can answer /health meanwhile
+    """
+    threading.Thread(target=warmup, args=(sizes,), name="model-warmup", daemon=True).start()
+
+
+def plot_detections(image, detections):
+    """
+    Draw stored detections ({"label", "score", "box"}) on an image the same way Results.plot() does
+    """
+    import torch
+    from ultralytics.engine.results import Results
+
+    names = model_names()
+    class_ids = {name: idx for idx, name in names.items()}
+    rows = [[*detection["box"], detection["score"], class_ids[detection["label"]]] for detection in detections]
+    boxes = torch.tensor(rows, dtype=torch.float32).reshape(-1, 6)
+    return Results(image, path="", names=names, boxes=boxes).plot()
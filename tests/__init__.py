@@ -0,0 +1,12 @@
+import os
+import atexit
+import shutil
+import tempfile
+
+# The services keep a persistent prediction cache and upload queue on disk. Tests get their own, so
+# they don't write into the repo's uploads/ and a previous run's entries can't turn a mocked
+# inference into a cache hit
+_state_dir = tempfile.mkdtemp(prefix="yolo-service-tests-")
+atexit.register(shutil.rmtree, _state_dir, ignore_errors=True)
+os.environ["PREDICTION_CACHE_DIR"] = os.path.join(_state_dir, "cache")
+os.environ["UPLOAD_QUEUE_DIR"] = os.path.join(_state_dir, "upload_queue")
@@ -0,0 +1,141 @@
+import time
+import asyncio
+import unittest
+from unittest.mock import patch, Mock
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import get_db
+from services.admission import AdmissionController, TokenBuckets
+
+
+class TestTokenBuckets(unittest.TestCase):
+    def test_burst_then_refill(self):
+        buckets = TokenBuckets(rate=2, burst=3, max_keys=10)
+
+        self.assertEqual([buckets.take("user") for _ in range(3)], [0, 0, 0])
+        self.assertAlmostEqual(buckets.take("user"), 0.5, places=2)
+        self.assertEqual(buckets.take("other user"), 0)
+        with patch("services.admission.time.monotonic", return_value=time.monotonic() + 1):
+            self.assertEqual(buckets.take("user"), 0)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def make(self, **kwargs):
+        settings = {"max_in_flight": 1, "max_queue": 1, "queue_timeout_s": 1, "rate_per_s": 0, "burst": 0}
+        return AdmissionController(**{**settings, **kwargs})
+
+    def test_waiting_request_gets_the_released_slot(self):
+        controller = self.make()
+
+        async def scenario():
+            await controller.acquire("a")
+            waiting = asyncio.ensure_future(controller.acquire("b"))
+            await asyncio.sleep(0.01)
+            self.assertFalse(waiting.done())
+            controller.release()
+            await waiting
+
+        asyncio.run(scenario())
+        self.assertEqual(controller.stats()["in_flight"], 1)
+        self.assertEqual(controller.stats()["admitted"], 2)
+
+    def test_full_queue_is_rejected_right_away(self):
+        controller = self.make()
+
+        async def scenario():
+            await controller.acquire("a")
+            waiting = asyncio.ensure_future(controller.acquire("b"))
+            await asyncio.sleep(0.01)
+            start = time.perf_counter()
+            with self.assertRaises(HTTPException) as error:
+                await controller.acquire("c")
+            waiting.cancel()
+            return error.exception, time.perf_counter() - start
+
+        error, latency = asyncio.run(scenario())
+        self.assertEqual(error.status_code, 503)
+        self.assertEqual(error.headers["Retry-After"], "1")
+        self.assertLess(latency, 0.1)
+        self.assertEqual(controller.stats()["waiting"], 0)
+
+    def test_wait_times_out(self):
+        controller = self.make(queue_timeout_s=0.05)
+
+        async def scenario():
+            await controller.acquire("a")
+            with self.assertRaises(HTTPException) as error:
+                await controller.acquire("b")
+            return error.exception
+
+        self.assertEqual(asyncio.run(scenario()).status_code, 503)
+        self.assertEqual(controller.stats()["timed_out"], 1)
+        self.assertEqual(controller.stats()["in_flight"], 1)
+
+    def test_rate_limited_user_gets_429(self):
+        controller = self.make(max_in_flight=10, rate_per_s=0.5, burst=1)
+
+        async def scenario():
+            await controller.acquire("a")
+            controller.release()
+            with self.assertRaises(HTTPException) as error:
+                await controller.acquire("a")
+            await controller.acquire("b")
+            return error.exception
+
+        error = asyncio.run(scenario())
+        self.assertEqual(error.status_code, 429)
+        self.assertEqual(error.headers["Retry-After"], "2")
+
+    def test_costs_above_the_burst_leave_the_bucket_in_debt(self):
+        buckets = TokenBuckets(rate=1, burst=10, max_keys=10)
+
+        self.assertEqual(buckets.take("user", cost=25), 0)
+        self.assertAlmostEqual(buckets.take("user"), 16, places=1)
+
+
+class TestPredictAdmission(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        app.dependency_overrides[get_db] = lambda: Mock()
+
+    def tearDown(self):
+        app.dependency_overrides = {}
+
+    @patch("middlewares.auth.verify_credentials", return_value=1)
+    @patch("controllers.prediction_controller.create_prediction", return_value={"prediction_uid": "uid"})
+    def test_predict_over_the_rate_limit_is_rejected_early(self, mock_create_prediction, mock_verify_credentials):
+        controller = AdmissionController(max_in_flight=4, max_queue=0, queue_timeout_s=1, rate_per_s=0.1, burst=1)
+
+        with patch("services.admission.prediction_admission", controller):
+            first = self.client.post("/predict?img_name=bear.jpg&chat_id=chat")
+            second = self.client.post("/predict?img_name=bear.jpg&chat_id=chat")
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(second.status_code, 429)
+        self.assertEqual(second.headers["retry-after"], "10")
+        mock_create_prediction.assert_called_once()
+        self.assertEqual(controller.stats()["in_flight"], 0)
+
+    @patch("middlewares.auth.verify_credentials", return_value=1)
+    @patch("controllers.prediction_controller.create_batch_prediction", return_value={"total": 3})
+    def test_batch_is_charged_per_image_and_holds_a_slot(self, mock_create_batch_prediction,
+                                                         mock_verify_credentials):
+        controller = AdmissionController(max_in_flight=4, max_queue=0, queue_timeout_s=1, rate_per_s=0.1, burst=4)
+        items = [{"chat_id": "chat", "image_name": f"{i}.jpg"} for i in range(3)]
+        in_flight = []
+        mock_create_batch_prediction.side_effect = lambda *args, **kwargs: in_flight.append(
+            controller.stats()["in_flight"]) or {"total": 3}
+
+        with patch("services.admission.prediction_admission", controller):
+            first = self.client.post("/predict/batch", json={"items": items},
+                                     headers={"Authorization": "Basic dXNlcjpwYXNz"})
+            second = self.client.post("/predict/batch", json={"items": items},
+                                      headers={"Authorization": "Basic dXNlcjpwYXNz"})
+
+        self.assertEqual(first.status_code, 200)
+        self.assertEqual(in_flight, [1])
+        self.assertEqual(second.status_code, 429)
+        mock_create_batch_prediction.assert_called_once()
+        self.assertEqual(controller.stats()["in_flight"], 0)
+        self.assertEqual(controller.stats()["lanes"]["bulk"]["admitted"], 2)
@@ -0,0 +1,76 @@
+import unittest
+from unittest.mock import patch, Mock, ANY
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from db.dao.predictions import save_prediction_session_dao, get_prediction_by_uid_dao
+from services.prediction_jobs import run_prediction_job
+from services.prediction_service import prediction_by_uid
+from services.query_cache import query_cache
+
+class TestAsyncPredictEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        app.dependency_overrides[get_db] = lambda: Mock()
+
+    def tearDown(self):
+        # Clean up dependency overrides after each test
+        app.dependency_overrides = {}
+
+    @patch("controllers.prediction_controller.create_prediction")
+    @patch("controllers.prediction_controller.enqueue_prediction")
+    def test_async_predict_returns_202(self, mock_enqueue_prediction, mock_create_prediction):
+        # Arrange
+        mock_enqueue_prediction.return_value = {"prediction_uid": "job-uid", "status": "pending"}
+
+        # Act
+        response = self.client.post("/predict?img_name=bear.jpg&chat_id=chat&async=true")
+
+        # Assert
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {"prediction_uid": "job-uid", "status": "pending"})
+        self.assertEqual(response.headers["location"], "/prediction/job-uid")
+        mock_enqueue_prediction.assert_called_once_with("chat", "bear.jpg", ANY, ANY, {}, lane="interactive",
+                                                        deadline=None)
+        mock_create_prediction.assert_not_called()
+
+
+class TestPredictionJobs(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        query_cache.clear()
+        self.db = get_db().__next__()
+        save_prediction_session_dao(self.db, "job-uid", "original.jpg", "predicted.jpg", None, status="pending")
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_new_job_is_reported_pending(self):
+        prediction = prediction_by_uid("job-uid", self.db)
+        self.assertEqual(prediction["status"], "pending")
+
+    @patch("services.prediction_jobs.run_prediction")
+    def test_job_marked_done(self, mock_run_prediction):
+        # Act
+        run_prediction_job("job-uid", "chat", "bear.jpg", None)
+
+        # Assert
+        self.db.expire_all()
+        self.assertEqual(get_prediction_by_uid_dao(self.db, "job-uid").status, "done")
+        mock_run_prediction.assert_called_once_with("job-uid", "chat", "bear.jpg", None, ANY, save_session=False,
+                                                    params=None, lane="interactive", deadline=None)
+
+    @patch("services.prediction_jobs.run_prediction")
+    def test_job_marked_failed_with_reason(self, mock_run_prediction):
+        # Arrange
+        mock_run_prediction.side_effect = HTTPException(status_code=404, detail="Resource not found in S3")
+
+        # Act
+        run_prediction_job("job-uid", "chat", "bear.jpg", None)
+
+        # Assert
+        self.db.expire_all()
+        prediction = prediction_by_uid("job-uid", self.db)
+        self.assertEqual(prediction["status"], "failed")
+        self.assertEqual(prediction["error"], "Resource not found in S3")
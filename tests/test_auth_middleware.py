@@ -1,8 +1,8 @@
+import io
 import unittest
 from unittest.mock import patch, Mock
 import numpy as np
 from fastapi.testclient import TestClient
-import os
 from app import app
 from PIL import Image
 
@@ -40,24 +40,22 @@ class TestAuthMiddleware(unittest.TestCase):
             self.assertEqual(response.status_code, 401)
 
     def test_predict_creation_sets_user_id(self):
+        image_bytes = io.BytesIO()
+        Image.new("RGB", (1, 1), color="white").save(image_bytes, "JPEG")
+
         # Patch verify_credentials and prediction saving to avoid DB write
         with patch("services.yolo_service.model") as mock_model, \
              patch("middlewares.auth.get_credentials_from_headers", return_value=("user", "pass")), \
              patch("middlewares.auth.verify_credentials", return_value=42), \
-             patch("services.prediction_service.save_prediction_session_dao", return_value={"id": 1, "result": "ok"}), \
-             patch("services.prediction_service.save_detection_object_dao", return_value={"id": 1, "result": "ok"}),\
-             patch("services.prediction_service.download_from_s3", return_value=None), \
-             patch("services.prediction_service.upload_to_s3", return_value=None):
+             patch("services.prediction_service.save_detection_objects_dao", return_value=None),\
+             patch("services.prediction_service.download_from_s3", return_value=image_bytes.getvalue()), \
+             patch("services.prediction_service.enqueue_upload", return_value=None):
 
             mock_result = Mock()
             mock_result.plot.return_value = np.zeros((100, 100, 3), dtype=np.uint8)
             mock_result.boxes = []
             mock_model.return_value = [mock_result]
 
-            dummy_path = "uploads/original/79f3d334-e294-4d9e-8a29-f6fa7c558877-bear.jpg"
-            os.makedirs(os.path.dirname(dummy_path), exist_ok=True)
-            img = Image.new("RGB", (1, 1), color="white")
-            img.save(dummy_path, "JPEG")
             response = self.client.post(
                 "/predict?img_name=bear.jpg&chat_id=79f3d334-e294-4d9e-8a29-f6fa7c558877",
                 headers={"Authorization": "Basic dXNlcjpwYXNz"}
@@ -73,3 +71,14 @@ class TestAuthMiddleware(unittest.TestCase):
              patch("middlewares.auth.verify_credentials", return_value=None):
             response = self.client.get("/labels")
             self.assertEqual(response.status_code, 401)
+
+    def test_malformed_basic_header_is_401(self):
+        response = self.client.get("/labels", headers={"Authorization": "Basic !!not base64!!"})
+        self.assertEqual(response.status_code, 401)
+
+    def test_public_routes_skip_verification(self):
+        with patch("middlewares.auth.verify_credentials") as mock_verify_credentials:
+            response = self.client.get("/ready")
+        self.assertIn(response.status_code, [200, 503])
+        mock_verify_credentials.assert_not_called()
+
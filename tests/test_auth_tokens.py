@@ -0,0 +1,81 @@
+import time
+import unittest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from services.user_service import create_new_user
+from services.token_service import create_token, verify_token
+
+
+class TestTokens(unittest.TestCase):
+    def test_token_round_trip(self):
+        token = create_token(7)
+
+        self.assertEqual(verify_token(token), 7)
+        self.assertIsNone(verify_token(token, token_type="refresh"))
+
+    def test_tampered_token_is_rejected(self):
+        payload, signature = create_token(7).split(".")
+        forged = create_token(8).split(".")[0]
+
+        self.assertIsNone(verify_token(forged + "." + signature))
+        self.assertIsNone(verify_token(payload + ".bad"))
+        self.assertIsNone(verify_token("not a token"))
+
+    def test_expired_token_is_rejected(self):
+        token = create_token(7, ttl_s=60)
+
+        with patch("services.token_service.time.time", return_value=time.time() + 61):
+            self.assertIsNone(verify_token(token))
+
+
+class TestTokenEndpoints(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+        create_new_user("user", "pass", self.db)
+        self.client = TestClient(app)
+
+    def tearDown(self):
+        self.db.close()
+
+    def login(self, password="pass"):
+        return self.client.post("/auth/token", json={"username": "user", "password": password})
+
+    def test_bearer_token_skips_the_users_table_and_bcrypt(self):
+        tokens = self.login().json()
+
+        with patch("middlewares.auth.verify_credentials") as mock_verify_credentials:
+            response = self.client.get("/labels", headers={"Authorization": f"Bearer {tokens['access_token']}"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(tokens["token_type"], "bearer")
+        mock_verify_credentials.assert_not_called()
+
+    def test_wrong_password_gets_no_token(self):
+        self.assertEqual(self.login("wrong").status_code, 401)
+
+    def test_invalid_bearer_token_is_401(self):
+        refresh_token = self.login().json()["refresh_token"]
+
+        for token in ("garbage", refresh_token):
+            response = self.client.get("/labels", headers={"Authorization": f"Bearer {token}"})
+            self.assertEqual(response.status_code, 401)
+            self.assertEqual(response.headers["www-authenticate"], "Bearer")
+
+    def test_refresh(self):
+        tokens = self.login().json()
+
+        response = self.client.post("/auth/refresh", json={"refresh_token": tokens["refresh_token"]})
+        access_token = response.json()["access_token"]
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(verify_token(access_token), verify_token(tokens["access_token"]))
+        self.assertEqual(self.client.post("/auth/refresh", json={"refresh_token": tokens["access_token"]}).status_code,
+                         401)
+
+    def test_refresh_of_a_missing_user_is_401(self):
+        response = self.client.post("/auth/refresh", json={"refresh_token": create_token(999, "refresh")})
+
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,124 @@
+import unittest
+from unittest.mock import patch, Mock, ANY
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from db.dao.predictions import get_prediction_by_uid_dao
+from db.dao.detections import get_detection_objects_by_prediction_uid_dao
+from services.batch_prediction import run_batch_prediction, resolve_batch_items
+from services.s3_service import get_s3_client
+
+class TestPredictBatchEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        app.dependency_overrides[get_db] = lambda: Mock()
+        app.dependency_overrides[get_s3_client] = lambda: Mock()
+
+    def tearDown(self):
+        # Clean up dependency overrides after each test
+        app.dependency_overrides = {}
+
+    @patch("middlewares.auth.verify_credentials", return_value=7)
+    @patch("controllers.prediction_controller.create_batch_prediction")
+    def test_items_and_params_are_passed(self, mock_create_batch_prediction, mock_verify_credentials):
+        # Arrange
+        mock_create_batch_prediction.return_value = {"total": 1, "succeeded": 1, "failed": 0, "results": []}
+
+        # Act
+        response = self.client.post("/predict/batch?profile=fast",
+                                    json={"items": [{"chat_id": "chat", "image_name": "cat.jpg"}]},
+                                    headers={"Authorization": "Basic dXNlcjpwYXNz"})
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        mock_create_batch_prediction.assert_called_once_with(
+            [{"chat_id": "chat", "image_name": "cat.jpg"}], None, 7, ANY,
+            {"imgsz": 320, "conf": 0.5, "max_det": 50}, s3=ANY, lane="bulk", deadline=None)
+
+    def test_requires_auth(self):
+        response = self.client.post("/predict/batch", json={"prefix": "chat/"})
+        self.assertEqual(response.status_code, 401)
+
+
+def fake_list_s3_keys(keys):
+    def list_s3_keys(s3, prefix, limit=None, match=None):
+        listed = [key for key in keys if key.startswith(prefix) and (match is None or match(key))]
+        return listed if limit is None else listed[:limit]
+    return list_s3_keys
+
+
+class TestResolveBatchItems(unittest.TestCase):
+    @patch("services.batch_prediction.list_s3_keys")
+    def test_prefix_lists_original_images(self, mock_list_s3_keys):
+        mock_list_s3_keys.side_effect = fake_list_s3_keys(
+            ["chat/original/a.jpg", "chat/predicted/a.jpg", "chat/original/b.jpg"])
+
+        items = resolve_batch_items(Mock(), None, "chat/")
+
+        self.assertEqual(items, [{"chat_id": "chat", "image_name": "a.jpg"},
+                                 {"chat_id": "chat", "image_name": "b.jpg"}])
+
+    @patch("services.batch_prediction.BATCH_MAX_ITEMS", 4)
+    @patch("services.batch_prediction.list_s3_keys")
+    def test_too_many_originals_under_a_prefix_is_400(self, mock_list_s3_keys):
+        # Predicted images don't use up the limit, so the originals of the last chat aren't cut off
+        keys = [f"{chat}/{kind}/{i}.jpg" for chat in ("a", "b", "c") for kind in ("original", "predicted")
+                for i in range(2)]
+        mock_list_s3_keys.side_effect = fake_list_s3_keys(keys)
+
+        with self.assertRaises(HTTPException) as ctx:
+            resolve_batch_items(Mock(), None, "")
+
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_invalid_requests_are_rejected(self):
+        for items, prefix in ((None, None), ([{"chat_id": "chat", "image_name": "a.jpg"}], "chat/")):
+            with self.assertRaises(HTTPException) as ctx:
+                resolve_batch_items(Mock(), items, prefix)
+            self.assertEqual(ctx.exception.status_code, 400)
+
+
+class TestRunBatchPrediction(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+        with open("tests/assets/cat.jpg", "rb") as f:
+            self.image_bytes = f.read()
+
+    def tearDown(self):
+        self.db.close()
+
+    @patch("services.prediction_service.KEEP_LOCAL_COPIES", False)
+    @patch("services.batch_prediction.BATCH_CHUNK_SIZE", 2)
+    @patch("services.batch_prediction.prediction_cache")
+    @patch("services.batch_prediction.enqueue_upload")
+    @patch("services.batch_prediction.download_from_s3")
+    def test_partial_failures_are_reported_per_item(self, mock_download, mock_upload, mock_cache):
+        # Arrange
+        def fake_download(s3, key):
+            if key == "chat/original/missing.jpg":
+                raise HTTPException(status_code=404, detail="Resource not found in S3")
+            return self.image_bytes
+
+        mock_download.side_effect = fake_download
+        mock_cache.get.return_value = None
+        items = [{"chat_id": "chat", "image_name": name} for name in ("a.jpg", "missing.jpg", "b.jpg")]
+
+        # Act
+        response = run_batch_prediction(Mock(), items, None, self.db, {"max_det": 5})
+
+        # Assert
+        self.assertEqual((response["total"], response["succeeded"], response["failed"]), (3, 2, 1))
+        first, missing, last = response["results"]
+        self.assertEqual(missing, {"chat_id": "chat", "image_name": "missing.jpg", "status": "failed",
+                                   "error": "Resource not found in S3"})
+        for result in (first, last):
+            self.assertEqual(result["status"], "done")
+            self.assertEqual(result["detection_count"], 5)
+            self.assertEqual(len(get_detection_objects_by_prediction_uid_dao(self.db, result["prediction_uid"])), 5)
+            session = get_prediction_by_uid_dao(self.db, result["prediction_uid"])
+            self.assertTrue(session.rendered)
+            self.assertEqual(session.upload_status, "pending")
+            mock_upload.assert_any_call(result["prediction_uid"], "chat/predicted/" + result["image_name"], ANY)
+        self.assertEqual(mock_upload.call_count, 2)
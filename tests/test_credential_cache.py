@@ -0,0 +1,97 @@
+import time
+import unittest
+from unittest.mock import patch
+import bcrypt
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from middlewares.auth import verify_credentials
+from services.credential_cache import CredentialCache, credential_cache
+from services.user_service import create_new_user
+from tests.services.auth import get_basic_auth_header
+
+
+class TestCredentialCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = CredentialCache(max_entries=2, ttl_s=60, secret=b"secret")
+
+    def test_verified_credentials_are_cached(self):
+        self.cache.put("user", "pass", 1)
+
+        self.assertEqual(self.cache.get("user", "pass"), 1)
+        self.assertIsNone(self.cache.get("user", "wrong"))
+        self.assertEqual(self.cache.stats()["hit_rate"], 0.5)
+
+    def test_credentials_are_not_kept_in_plaintext(self):
+        self.cache.put("user", "pass", 1)
+
+        key = next(iter(self.cache._entries))
+        self.assertNotIn(b"pass", key)
+        self.assertNotEqual(key, CredentialCache(2, 60, b"other secret").key("user", "pass"))
+
+    def test_entries_expire(self):
+        self.cache.put("user", "pass", 1)
+
+        with patch("services.credential_cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertIsNone(self.cache.get("user", "pass"))
+
+    def test_cache_is_bounded(self):
+        for index in range(3):
+            self.cache.put(f"user{index}", "pass", index)
+
+        self.assertIsNone(self.cache.get("user0", "pass"))
+        self.assertEqual(self.cache.stats()["entries"], 2)
+        self.assertEqual(self.cache.stats()["evictions"], 1)
+
+    def test_invalidate_user(self):
+        self.cache.put("user", "pass", 1)
+        self.cache.put("other", "pass", 2)
+
+        self.cache.invalidate_user("user")
+
+        self.assertIsNone(self.cache.get("user", "pass"))
+        self.assertEqual(self.cache.get("other", "pass"), 2)
+
+
+class TestCachedVerification(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        credential_cache.clear()
+        self.db = get_db().__next__()
+        create_new_user("User", "pass", self.db)
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_bcrypt_runs_once_per_credential(self):
+        with patch("services.user_service.bcrypt.checkpw", wraps=bcrypt.checkpw) as mock_checkpw:
+            user_id = verify_credentials("user", "pass")
+            self.assertEqual(verify_credentials("USER ", "pass"), user_id)
+            self.assertIsNone(verify_credentials("user", "wrong"))
+            self.assertIsNone(verify_credentials("user", "wrong"))
+
+        self.assertIsNotNone(user_id)
+        # One check of the right password, and every check of the wrong one
+        self.assertEqual(mock_checkpw.call_count, 3)
+
+    def test_creating_a_user_invalidates_it(self):
+        verify_credentials("user", "pass")
+
+        with patch("services.user_service.credential_cache") as mock_cache:
+            create_new_user("another", "pass", self.db)
+
+        mock_cache.invalidate_user.assert_called_once_with("another")
+
+    def test_metrics_report_the_cache(self):
+        client = TestClient(app)
+        headers = get_basic_auth_header("user", "pass")
+
+        before = credential_cache.stats()
+
+        for _ in range(3):
+            self.assertEqual(client.get("/labels", headers=headers).status_code, 200)
+        metrics = client.get("/metrics", headers=headers).json()["credential_cache"]
+
+        self.assertEqual(metrics["misses"] - before["misses"], 1)
+        self.assertEqual(metrics["hits"] - before["hits"], 3)
+        self.assertIn("hit_rate", metrics)
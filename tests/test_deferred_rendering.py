@@ -0,0 +1,84 @@
+import io
+import unittest
+from unittest.mock import patch, Mock, ANY
+import numpy as np
+from PIL import Image
+from db.utils import init_db, get_db
+from db.dao.predictions import save_prediction_session_dao, get_prediction_by_uid_dao
+from db.dao.detections import save_detection_object_dao
+from services.yolo_service import get_model, plot_detections
+from services.prediction_service import run_prediction, get_prediction_image_by_uid, decode_image
+
+class TestPlotDetections(unittest.TestCase):
+    def test_matches_results_plot(self):
+        # Arrange
+        with open("tests/assets/cat.jpg", "rb") as f:
+            image = decode_image(f.read())
+        result = get_model()(image, device="cpu", verbose=False, max_det=5)[0]
+        detections = [
+            {"label": get_model().names[int(cls)], "score": float(conf), "box": box.tolist()}
+            for box, conf, cls in zip(result.boxes.xyxy, result.boxes.conf, result.boxes.cls)
+        ]
+
+        # Act
+        frame = plot_detections(image, detections)
+
+        # Assert
+        np.testing.assert_array_equal(frame, result.plot())
+
+
+class TestDeferredRendering(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+
+    def tearDown(self):
+        self.db.close()
+
+    @patch("services.prediction_service.RENDER_MODE", "lazy")
+    @patch("services.prediction_service.prediction_cache")
+    @patch("services.prediction_service.enqueue_upload")
+    @patch("services.prediction_service.download_from_s3")
+    @patch("services.prediction_service.save_detection_objects_dao")
+    def test_lazy_mode_skips_rendering(self, mock_save_detections, mock_download, mock_upload, mock_cache):
+        # Arrange
+        with open("tests/assets/cat.jpg", "rb") as f:
+            mock_download.return_value = f.read()
+        mock_cache.get.return_value = None
+
+        # Act
+        run_prediction("uid", "chat", "cat.jpg", None, Mock())
+
+        # Assert
+        mock_upload.assert_not_called()
+        mock_save_detections.assert_called_once_with(ANY, "uid", ANY, {
+            "original_image": ANY, "predicted_image": ANY, "user_id": None,
+            "original_s3_key": "chat/original/cat.jpg", "predicted_s3_key": "chat/predicted/cat.jpg",
+            "rendered": False, "upload_status": None,
+        }, session_update=None)
+
+    @patch("services.prediction_service.KEEP_LOCAL_COPIES", False)
+    @patch("services.prediction_service.enqueue_upload")
+    @patch("services.prediction_service.download_from_s3")
+    def test_image_rendered_on_first_request(self, mock_download, mock_upload):
+        # Arrange - the original isn't cached locally and is fetched from S3
+        with open("tests/assets/cat.jpg", "rb") as f:
+            mock_download.return_value = f.read()
+        save_prediction_session_dao(self.db, "uid", "tests/assets/cat.jpg", "uploads/predicted/chat-cat.jpg", None,
+                                    original_s3_key="chat/original/cat.jpg",
+                                    predicted_s3_key="chat/predicted/cat.jpg", rendered=False)
+        save_detection_object_dao(self.db, "uid", get_model().names[0], 0.9, [10.0, 10.0, 50.0, 50.0])
+        request = Mock()
+        request.headers = {"accept": "image/jpeg"}
+
+        # Act
+        response = get_prediction_image_by_uid("uid", request, self.db)
+
+        # Assert
+        self.assertEqual(response.media_type, "image/jpeg")
+        self.assertEqual(Image.open(io.BytesIO(response.body)).size, Image.open("tests/assets/cat.jpg").size)
+        mock_download.assert_called_once_with(ANY, "chat/original/cat.jpg")
+        mock_upload.assert_called_once_with("uid", "chat/predicted/cat.jpg", response.body)
+        self.db.expire_all()
+        self.assertTrue(get_prediction_by_uid_dao(self.db, "uid").rendered)
+        self.assertEqual(get_prediction_by_uid_dao(self.db, "uid").upload_status, "pending")
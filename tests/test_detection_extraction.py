@@ -0,0 +1,28 @@
+import unittest
+from services.yolo_service import get_model
+from services.prediction_service import detections_from_result, decode_image
+
+class TestDetectionsFromResult(unittest.TestCase):
+    def test_matches_per_box_conversion(self):
+        # Arrange
+        with open("tests/assets/cat.jpg", "rb") as f:
+            image = decode_image(f.read())
+        result = get_model()(image, device="cpu", verbose=False, max_det=20)[0]
+        expected = [
+            {"label": result.names[int(box.cls[0].item())], "score": float(box.conf[0]), "box": box.xyxy[0].tolist()}
+            for box in result.boxes
+        ]
+
+        # Act
+        detections = detections_from_result(result)
+
+        # Assert
+        self.assertEqual(len(detections), 20)
+        self.assertEqual(detections, expected)
+
+    def test_no_boxes(self):
+        with open("tests/assets/cat.jpg", "rb") as f:
+            image = decode_image(f.read())
+        result = get_model()(image, device="cpu", verbose=False, conf=0.999999)[0]
+
+        self.assertEqual(detections_from_result(result), [])
@@ -1,7 +1,10 @@
 import unittest
+from unittest.mock import patch
 from db.utils import init_db, get_db
 from models.detection_object import DetectionObject
-from db.dao.detections import save_detection_object_dao
+from db.dao.detections import (save_detection_object_dao, save_detection_objects_dao,
+                               get_detection_objects_by_prediction_uid_dao)
+from db.dao.predictions import get_prediction_by_uid_dao, save_prediction_session_dao
 
 class TestDetectionObjectDAO(unittest.TestCase):
     def setUp(self):
@@ -24,4 +27,62 @@ class TestDetectionObjectDAO(unittest.TestCase):
         self.assertEqual(obj.score, score)
         self.assertEqual(obj.box, str(box))
 
-    
\ No newline at end of file
+    
+
+class TestSaveDetectionObjectsDAO(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+
+    def tearDown(self):
+        self.db.close()
+
+    def test_session_and_detections_are_saved_with_one_commit(self):
+        # Arrange
+        detections = [{"label": "cat", "score": 0.9, "box": [1.0, 2.0, 3.0, 4.0]},
+                      {"label": "dog", "score": 0.8, "box": [5.0, 6.0, 7.0, 8.0]}]
+        session = {"original_image": "original.jpg", "predicted_image": "predicted.jpg", "user_id": None}
+
+        # Act
+        with patch.object(self.db, "commit", wraps=self.db.commit) as mock_commit:
+            save_detection_objects_dao(self.db, "bulk-uid", detections, session)
+
+        # Assert
+        mock_commit.assert_called_once()
+        prediction = get_prediction_by_uid_dao(self.db, "bulk-uid")
+        self.assertEqual(prediction.original_image, "original.jpg")
+        self.assertEqual(prediction.status, "done")
+        objects = get_detection_objects_by_prediction_uid_dao(self.db, "bulk-uid")
+        self.assertEqual([(obj.label, obj.score, obj.box) for obj in objects],
+                         [("cat", 0.9, "[1.0, 2.0, 3.0, 4.0]"), ("dog", 0.8, "[5.0, 6.0, 7.0, 8.0]")])
+
+    def test_existing_session_is_updated_in_the_same_commit(self):
+        # Arrange - an async job's session row already exists
+        save_prediction_session_dao(self.db, "bulk-uid", "original.jpg", "predicted.jpg", None, status="running",
+                                    rendered=False)
+        detections = [{"label": "cat", "score": 0.9, "box": [1.0, 2.0, 3.0, 4.0]}]
+
+        # Act
+        with patch.object(self.db, "commit", wraps=self.db.commit) as mock_commit:
+            save_detection_objects_dao(self.db, "bulk-uid", detections,
+                                       session_update={"rendered": True, "upload_status": "pending"})
+
+        # Assert
+        mock_commit.assert_called_once()
+        self.db.expire_all()
+        prediction = get_prediction_by_uid_dao(self.db, "bulk-uid")
+        self.assertTrue(prediction.rendered)
+        self.assertEqual(prediction.upload_status, "pending")
+        self.assertEqual(len(get_detection_objects_by_prediction_uid_dao(self.db, "bulk-uid")), 1)
+
+    def test_rolls_back_together(self):
+        # Arrange - a detection without a label violates NOT NULL
+        detections = [{"label": None, "score": 0.9, "box": [1.0, 2.0, 3.0, 4.0]}]
+
+        # Act
+        with self.assertRaises(Exception):
+            save_detection_objects_dao(self.db, "bulk-uid", detections, {"original_image": "original.jpg"})
+        self.db.rollback()
+
+        # Assert
+        self.assertIsNone(get_prediction_by_uid_dao(self.db, "bulk-uid"))
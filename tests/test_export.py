@@ -0,0 +1,84 @@
+import io
+import csv
+import json
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from db.dao.predictions import save_prediction_batch_dao
+from db.dao.detections import detection_row
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+AUTH = {"Authorization": "Basic dXNlcjpwYXNz"}
+START = datetime(2026, 1, 1)
+
+
+class TestExport(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+        self.client = TestClient(app)
+        sessions = [{"uid": uid, "timestamp": START + timedelta(hours=hours), "user_id": 1,
+                     "original_image": f"{uid}.jpg", "predicted_image": f"{uid}-predicted.jpg"}
+                    for uid, hours in [("a", 0), ("b", 1), ("empty", 2)]]
+        detections = [detection_row("a", "person", 0.9, [0, 0, 10, 10]),
+                      detection_row("a", "dog", 0.5, [10, 10, 30, 20]),
+                      detection_row("b", "person", 0.7, [5, 5, 6, 6])]
+        save_prediction_batch_dao(self.db, sessions, detections)
+
+    def tearDown(self):
+        self.db.close()
+
+    def export(self, query):
+        with patch("middlewares.auth.verify_credentials", return_value=1), \
+                patch("services.export_service.EXPORT_CHUNK_SIZE", 2):
+            return self.client.get(f"/predictions/export?{query}", headers=AUTH)
+
+    def test_ndjson_has_one_row_per_detection(self):
+        response = self.export("format=ndjson")
+
+        rows = [json.loads(line) for line in response.text.splitlines()]
+        self.assertEqual(response.headers["content-type"], "application/x-ndjson")
+        self.assertEqual([(row["uid"], row["label"]) for row in rows],
+                         [("a", "person"), ("a", "dog"), ("b", "person"), ("empty", None)])
+        self.assertEqual(rows[1]["area"], 200.0)
+        self.assertEqual(rows[0]["timestamp"], "2026-01-01T00:00:00")
+
+    def test_csv_with_label_and_time_range(self):
+        since = (START + timedelta(minutes=30)).isoformat()
+
+        response = self.export(f"format=csv&label=person&since={since}")
+
+        rows = list(csv.DictReader(io.StringIO(response.text)))
+        self.assertEqual([(row["uid"], row["label"], row["score"]) for row in rows], [("b", "person", "0.7")])
+        self.assertIn('filename="predictions.csv"', response.headers["content-disposition"])
+
+    def test_unknown_format_is_400(self):
+        self.assertEqual(self.export("format=xml").status_code, 400)
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_arrow_stream(self):
+        response = self.export("format=arrow")
+
+        table = pyarrow.ipc.open_stream(response.content).read_all()
+        self.assertEqual(table.num_rows, 4)
+        self.assertEqual(table.column("label").to_pylist(), ["person", "dog", "person", None])
+
+    @unittest.skipIf(pyarrow is None, "pyarrow is not installed")
+    def test_parquet(self):
+        import pyarrow.parquet as pq
+
+        response = self.export("format=parquet&label=person")
+
+        table = pq.read_table(io.BytesIO(response.content))
+        self.assertEqual(table.column("uid").to_pylist(), ["a", "b"])
+
+    @patch.dict("sys.modules", {"pyarrow": None})
+    def test_arrow_without_pyarrow_is_501(self):
+        self.assertEqual(self.export("format=arrow").status_code, 501)
@@ -1,6 +1,11 @@
+import sys
+import runpy
+import subprocess
 import unittest
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from app import app
+from services.yolo_service import model_ready, warmup
 
 class TestHealthEndpoint(unittest.TestCase):
     def setUp(self):
@@ -13,3 +18,38 @@ class TestHealthEndpoint(unittest.TestCase):
         self.assertIn("status", data)
         self.assertEqual(data["status"], "ok")
 
+
+class TestReadyEndpoint(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        self.addCleanup(model_ready.clear)
+
+    def test_not_ready_before_warmup(self):
+        model_ready.clear()
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()["status"], "warming_up")
+
+    def test_ready_after_warmup(self):
+        # Act
+        warmup(sizes=[64])
+
+        # Assert
+        response = self.client.get("/ready")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["status"], "ready")
+
+    def test_importing_app_does_not_load_the_ml_stack(self):
+        code = "import sys, app; print('loaded:', [m for m in ('torch', 'ultralytics', 'boto3') if m in sys.modules])"
+        result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+        self.assertIn("loaded: []", result.stdout)
+
+    @patch("db.utils.init_db")
+    def test_database_is_initialized_in_server_processes_only(self, mock_init_db):
+        # uvicorn --reload/--workers processes import `app`; spawned children re-run app.py as __mp_main__
+        runpy.run_path(sys.modules["app"].__file__, run_name="app")
+        mock_init_db.assert_called_once()
+
+        mock_init_db.reset_mock()
+        runpy.run_path(sys.modules["app"].__file__, run_name="__mp_main__")
+        mock_init_db.assert_not_called()
@@ -0,0 +1,147 @@
+import os
+import time
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch, ANY
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from db.dao.predictions import save_prediction_session_dao
+from services.image_cache import ImageDiskCache
+from services.prediction_service import delete_prediction_by_uid
+
+class TestImageDiskCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.original_dir = os.path.join(self.tmp.name, "original")
+        self.predicted_dir = os.path.join(self.tmp.name, "predicted")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_cache(self, max_bytes=1000, ttl_s=0):
+        return ImageDiskCache([self.original_dir, self.predicted_dir], max_bytes, ttl_s=ttl_s)
+
+    def path(self, name):
+        return os.path.join(self.original_dir, name)
+
+    def test_least_recently_used_images_are_evicted_past_the_budget(self):
+        # Arrange
+        cache = self.make_cache(max_bytes=25)
+        cache.put(self.path("a.jpg"), b"a" * 10)
+        cache.put(self.path("b.jpg"), b"b" * 10)
+        cache.get(self.path("a.jpg"))
+
+        # Act
+        cache.put(self.path("c.jpg"), b"c" * 10)
+
+        # Assert
+        self.assertIsNone(cache.get(self.path("b.jpg")))
+        self.assertFalse(os.path.exists(self.path("b.jpg")))
+        self.assertEqual(cache.get(self.path("a.jpg")), b"a" * 10)
+        self.assertEqual(cache.stats()["bytes"], 20)
+        self.assertEqual(cache.stats()["evictions"], 1)
+
+    def test_idle_images_expire(self):
+        cache = self.make_cache(ttl_s=60)
+        cache.put(self.path("a.jpg"), b"a")
+
+        with patch("services.image_cache.time.time", return_value=time.time() + 120):
+            self.assertIsNone(cache.get(self.path("a.jpg")))
+
+        self.assertFalse(os.path.exists(self.path("a.jpg")))
+        self.assertEqual(cache.stats()["expirations"], 1)
+
+    def test_remove_images_of_a_prediction(self):
+        cache = self.make_cache()
+        cache.put(self.path("a.jpg"), b"a", uid="uid")
+        cache.put(os.path.join(self.predicted_dir, "a.jpg"), b"a", uid="uid")
+        cache.put(self.path("b.jpg"), b"b", uid="other")
+
+        cache.remove_uid("uid")
+
+        self.assertEqual(cache.paths_of("uid"), [])
+        self.assertEqual(cache.stats()["files"], 1)
+        self.assertEqual(cache.get(self.path("b.jpg")), b"b")
+
+    def test_concurrent_writes_of_the_same_image(self):
+        cache = self.make_cache()
+        errors = []
+
+        def write(i):
+            try:
+                for _ in range(100):
+                    cache.put(self.path("a.jpg"), bytes([i]) * 10, uid=f"uid{i}")
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(os.listdir(self.original_dir), ["a.jpg"])
+        self.assertEqual(cache.stats()["bytes"], 10)
+
+    def test_files_of_previous_runs_are_indexed_oldest_first(self):
+        # Arrange
+        os.makedirs(self.original_dir)
+        for i, name in enumerate(["old.jpg", "new.jpg"]):
+            with open(self.path(name), "wb") as f:
+                f.write(b"x" * 10)
+            os.utime(self.path(name), (time.time() - 100 + i, time.time() - 100 + i))
+
+        # Act
+        cache = self.make_cache(max_bytes=15)
+
+        # Assert
+        self.assertIsNone(cache.get(self.path("old.jpg")))
+        self.assertEqual(cache.get(self.path("new.jpg")), b"x" * 10)
+
+
+class TestImageFallback(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+        self.client = TestClient(app)
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = ImageDiskCache([self.tmp.name], 1000)
+        self.path = os.path.join("uploads", "original", "chat-cat.jpg")
+        save_prediction_session_dao(self.db, "uid", self.path, "uploads/predicted/chat-cat.jpg", None,
+                                    original_s3_key="chat/original/cat.jpg",
+                                    predicted_s3_key="chat/predicted/cat.jpg")
+
+    def tearDown(self):
+        self.db.close()
+        self.tmp.cleanup()
+
+    @patch("middlewares.auth.verify_credentials", return_value=1)
+    @patch("services.prediction_service.download_from_s3", return_value=b"cat bytes")
+    def test_image_endpoint_falls_back_to_s3(self, mock_download, mock_verify_credentials):
+        with patch("services.prediction_service.image_cache", self.cache):
+            response = self.client.get("/image/original/chat-cat.jpg",
+                                       headers={"Authorization": "Basic dXNlcjpwYXNz"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"cat bytes")
+        self.assertEqual(response.headers["content-type"], "image/jpeg")
+        mock_download.assert_called_once_with(ANY, "chat/original/cat.jpg")
+        self.assertEqual(self.cache.paths_of("uid"), [os.path.normpath(self.path)])
+
+    @patch("middlewares.auth.verify_credentials", return_value=1)
+    def test_unknown_image_is_404(self, mock_verify_credentials):
+        response = self.client.get("/image/original/unknown.jpg", headers={"Authorization": "Basic dXNlcjpwYXNz"})
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_delete_removes_the_local_copies(self):
+        with patch("services.prediction_service.image_cache", self.cache):
+            self.cache.put(os.path.join(self.tmp.name, "chat-cat.jpg"), b"cat bytes", uid="uid")
+
+            delete_prediction_by_uid("uid", self.db)
+
+        self.assertEqual(self.cache.stats()["files"], 0)
+        self.assertEqual(os.listdir(self.tmp.name), [])
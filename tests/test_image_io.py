@@ -0,0 +1,65 @@
+import io
+import unittest
+from unittest.mock import Mock
+import numpy as np
+from fastapi import HTTPException
+from PIL import Image
+from services.prediction_service import decode_image, encode_image
+from services.s3_service import download_from_s3, upload_to_s3
+
+class TestInMemoryImageIO(unittest.TestCase):
+    def test_download_from_s3_returns_bytes(self):
+        # Arrange
+        s3 = Mock()
+        s3.download_fileobj.side_effect = lambda bucket, key, buffer, **kwargs: buffer.write(b"image bytes")
+
+        # Act
+        data = download_from_s3(s3, "chat/original/cat.jpg")
+
+        # Assert
+        self.assertEqual(data, b"image bytes")
+        s3.download_file.assert_not_called()
+
+    def test_download_from_s3_missing_object_returns_404(self):
+        s3 = Mock()
+        s3.download_fileobj.side_effect = Exception("NoSuchKey")
+
+        with self.assertRaises(HTTPException) as ctx:
+            download_from_s3(s3, "chat/original/missing.jpg")
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_upload_to_s3_streams_bytes(self):
+        # Arrange
+        s3 = Mock()
+        uploaded = {}
+        s3.upload_fileobj.side_effect = lambda buffer, bucket, key, **kwargs: uploaded.update({key: buffer.read()})
+
+        # Act
+        upload_to_s3(s3, "chat/predicted/cat.jpg", b"annotated bytes")
+
+        # Assert
+        self.assertEqual(uploaded, {"chat/predicted/cat.jpg": b"annotated bytes"})
+        s3.upload_file.assert_not_called()
+
+    def test_decode_image_returns_bgr_array(self):
+        # Arrange
+        buffer = io.BytesIO()
+        Image.new("RGB", (4, 3), color=(255, 0, 0)).save(buffer, "PNG")
+
+        # Act
+        image = decode_image(buffer.getvalue())
+
+        # Assert
+        self.assertEqual(image.shape, (3, 4, 3))
+        self.assertEqual(tuple(image[0, 0]), (0, 0, 255))
+
+    def test_decode_invalid_image_returns_400(self):
+        with self.assertRaises(HTTPException) as ctx:
+            decode_image(b"not an image")
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_encode_image_uses_extension_format(self):
+        frame = np.zeros((5, 5, 3), dtype=np.uint8)
+
+        self.assertEqual(Image.open(io.BytesIO(encode_image(frame, "cat.png"))).format, "PNG")
+        self.assertEqual(Image.open(io.BytesIO(encode_image(frame, "cat.jpg"))).format, "JPEG")
@@ -0,0 +1,87 @@
+import os
+import signal
+import time
+import unittest
+import numpy as np
+from services.inference_pool import core_shares, share_image, attach_image, InferenceProcessPool
+from services.yolo_service import get_model, MODEL_NAME
+
+class TestInferencePool(unittest.TestCase):
+    def test_core_shares_split_cores_evenly(self):
+        shares = core_shares(2, cores=[0, 1, 2, 3])
+        self.assertEqual(shares, [[0, 1], [2, 3]])
+
+    def test_core_shares_more_workers_than_cores(self):
+        shares = core_shares(3, cores=[0, 1])
+        self.assertEqual(len(shares), 3)
+        self.assertTrue(all(len(share) == 1 for share in shares))
+
+    def test_shared_image_round_trip(self):
+        # Arrange
+        image = np.random.randint(0, 255, (32, 48, 3), dtype=np.uint8)
+
+        # Act
+        owner, descriptor = share_image(image)
+        try:
+            view_shm, view = attach_image(descriptor)
+            result = view.copy()
+            del view
+            view_shm.close()
+        finally:
+            owner.close()
+            owner.unlink()
+
+        # Assert
+        np.testing.assert_array_equal(result, image)
+
+    def test_pool_matches_in_process_model(self):
+        # Arrange
+        pool = InferenceProcessPool(MODEL_NAME, n_workers=1)
+        source = "tests/assets/cat.jpg"
+        self.addCleanup(pool.shutdown)
+
+        # Act
+        pooled = pool.run_batch([source], {"conf": 0.001})
+        local = get_model()(source, device="cpu", conf=0.001, verbose=False)
+
+        # Assert
+        self.assertEqual(len(pooled), 1)
+        self.assertEqual(pooled[0].orig_shape, local[0].orig_shape)
+        np.testing.assert_allclose(pooled[0].boxes.data.numpy(), local[0].boxes.data.numpy(), atol=1e-2)
+
+    def test_dead_worker_fails_its_batch_and_is_respawned(self):
+        # Arrange
+        pool = InferenceProcessPool(MODEL_NAME, n_workers=1, result_timeout_s=60)
+        self.addCleanup(pool.shutdown)
+        pool.start()
+        self.assertTrue(pool.wait_ready(timeout=120))
+        worker = pool._workers[0]["process"]
+        image = np.zeros((64, 64, 3), dtype=np.uint8)
+
+        # Act - the only worker dies while a batch waits on it
+        os.kill(worker.pid, signal.SIGSTOP)
+        _, future = pool._submit([], {})
+        worker.kill()
+
+        # Assert - the batch fails, and the next one waits for the respawned worker
+        with self.assertRaises(RuntimeError):
+            future.result(timeout=10)
+        self.assertIsNone(pool._workers[0])
+        self.assertEqual(len(pool.run_batch([image], {})), 1)
+        self.assertIsNot(pool._workers[0]["process"], worker)
+
+    def test_unanswered_batch_times_out(self):
+        pool = InferenceProcessPool(MODEL_NAME, n_workers=1, result_timeout_s=0.5)
+        self.addCleanup(pool.shutdown)
+        pool.start()
+        self.assertTrue(pool.wait_ready(timeout=120))
+        worker = pool._workers[0]["process"]
+        os.kill(worker.pid, signal.SIGSTOP)
+        self.addCleanup(worker.kill)
+
+        start = time.monotonic()
+        with self.assertRaises(TimeoutError):
+            pool.run_batch([np.zeros((64, 64, 3), dtype=np.uint8)], {})
+
+        self.assertLess(time.monotonic() - start, 5)
+        self.assertEqual(pool._pending, {})
@@ -0,0 +1,94 @@
+import unittest
+from unittest.mock import patch, Mock, ANY
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import get_db
+from services.inference_profiles import resolve_inference_params, profile_image_sizes
+from services.yolo_service import get_model
+
+class TestResolveInferenceParams(unittest.TestCase):
+    def assert_bad_request(self, **kwargs):
+        with self.assertRaises(HTTPException) as ctx:
+            resolve_inference_params(**kwargs)
+        self.assertEqual(ctx.exception.status_code, 400)
+
+    def test_no_profile_uses_model_defaults(self):
+        self.assertEqual(resolve_inference_params(), {})
+
+    def test_named_profile(self):
+        self.assertEqual(resolve_inference_params("fast"), {"imgsz": 320, "conf": 0.5, "max_det": 50})
+
+    def test_explicit_params_override_profile(self):
+        params = resolve_inference_params("fast", conf=0.3, iou=0.5)
+        self.assertEqual(params, {"imgsz": 320, "conf": 0.3, "iou": 0.5, "max_det": 50})
+
+    def test_classes_are_mapped_to_ids(self):
+        names = get_model().names
+        params = resolve_inference_params(classes=[names[2], "0"])
+        self.assertEqual(params["classes"], [0, 2])
+
+    def test_values_outside_allowlist_are_rejected(self):
+        self.assert_bad_request(profile="turbo")
+        self.assert_bad_request(imgsz=333)
+        self.assert_bad_request(conf=1.5)
+        self.assert_bad_request(iou=0.0)
+        self.assert_bad_request(max_det=100000)
+        self.assert_bad_request(classes=["unicorn"])
+
+    def test_profile_image_sizes(self):
+        self.assertEqual(profile_image_sizes(), {320, 640, 1280})
+
+
+class TestPredictWithProfile(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+        app.dependency_overrides[get_db] = lambda: Mock()
+
+    def tearDown(self):
+        # Clean up dependency overrides after each test
+        app.dependency_overrides = {}
+
+    @patch("controllers.prediction_controller.create_prediction")
+    def test_params_are_passed_to_the_prediction(self, mock_create_prediction):
+        # Arrange
+        captured = {}
+
+        def fake_create_prediction(chat_id, img_name, request, db):
+            captured.update(request.state.inference_params)
+            return {"prediction_uid": "uid"}
+
+        mock_create_prediction.side_effect = fake_create_prediction
+
+        # Act
+        response = self.client.post("/predict?img_name=bear.jpg&chat_id=chat&profile=fast&max_det=10")
+
+        # Assert
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(captured, {"imgsz": 320, "conf": 0.5, "max_det": 10})
+        mock_create_prediction.assert_called_once_with("chat", "bear.jpg", ANY, ANY)
+
+    @patch("controllers.prediction_controller.create_prediction")
+    def test_invalid_params_return_400(self, mock_create_prediction):
+        response = self.client.post("/predict?img_name=bear.jpg&chat_id=chat&imgsz=333")
+
+        self.assertEqual(response.status_code, 400)
+        mock_create_prediction.assert_not_called()
+
+    @patch("services.prediction_service.prediction_cache")
+    @patch("services.prediction_service.run_inference")
+    @patch("services.prediction_service.download_from_s3")
+    def test_params_reach_the_model(self, mock_download, mock_run_inference, mock_cache):
+        # Arrange
+        from services.prediction_service import run_prediction
+        with open("tests/assets/cat.jpg", "rb") as f:
+            mock_download.return_value = f.read()
+        mock_cache.get.return_value = None
+        mock_run_inference.side_effect = RuntimeError("stop after inference")
+
+        # Act
+        with self.assertRaises(RuntimeError):
+            run_prediction("uid", "chat", "cat.jpg", None, Mock(), params={"imgsz": 320, "classes": [0]})
+
+        # Assert
+        mock_run_inference.assert_called_once_with(ANY, lane="interactive", deadline=None, imgsz=320, classes=[0])
@@ -0,0 +1,89 @@
+import unittest
+import threading
+import time
+from services.yolo_service import InferenceScheduler
+
+class TestInferenceScheduler(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+
+        def fake_run_batch(sources, params):
+            self.batches.append((list(sources), params))
+            time.sleep(0.01)  # simulate a forward pass
+            return [f"result-{source}" for source in sources]
+
+        self.fake_run_batch = fake_run_batch
+
+    def _predict_concurrently(self, scheduler, sources, params_for=lambda i: {}):
+        results = {}
+        barrier = threading.Barrier(len(sources))
+
+        def worker(i, source):
+            barrier.wait()
+            results[source] = scheduler.predict(source, **params_for(i))
+
+        threads = [threading.Thread(target=worker, args=(i, s)) for i, s in enumerate(sources)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(timeout=5)
+        return results
+
+    def test_concurrent_requests_are_batched(self):
+        # Arrange
+        scheduler = InferenceScheduler(self.fake_run_batch, max_batch_size=8, max_wait_ms=50)
+        sources = [f"img{i}.jpg" for i in range(8)]
+
+        # Act
+        results = self._predict_concurrently(scheduler, sources)
+
+        # Assert - every caller gets back its own result
+        self.assertEqual(results, {s: f"result-{s}" for s in sources})
+        self.assertLess(len(self.batches), len(sources))
+        self.assertEqual(sum(len(b[0]) for b in self.batches), len(sources))
+
+    def test_batch_size_is_bounded(self):
+        # Arrange
+        scheduler = InferenceScheduler(self.fake_run_batch, max_batch_size=3, max_wait_ms=50)
+        sources = [f"img{i}.jpg" for i in range(7)]
+
+        # Act
+        self._predict_concurrently(scheduler, sources)
+
+        # Assert
+        self.assertTrue(all(len(b[0]) <= 3 for b in self.batches))
+        self.assertEqual(sum(len(b[0]) for b in self.batches), len(sources))
+
+    def test_requests_with_different_params_are_not_mixed(self):
+        # Arrange
+        scheduler = InferenceScheduler(self.fake_run_batch, max_batch_size=8, max_wait_ms=50)
+        sources = [f"img{i}.jpg" for i in range(6)]
+
+        # Act
+        self._predict_concurrently(scheduler, sources, params_for=lambda i: {"conf": 0.25 if i % 2 else 0.5})
+
+        # Assert
+        for batch_sources, params in self.batches:
+            expected_conf = params["conf"]
+            for source in batch_sources:
+                i = int(source[3:-4])
+                self.assertEqual(0.25 if i % 2 else 0.5, expected_conf)
+
+    def test_errors_are_propagated_to_callers(self):
+        # Arrange
+        def failing_run_batch(sources, params):
+            raise ValueError("model exploded")
+
+        scheduler = InferenceScheduler(failing_run_batch, max_batch_size=4, max_wait_ms=1)
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            scheduler.predict("img.jpg")
+
+    def test_mismatched_result_count_fails_instead_of_hanging(self):
+        # Arrange
+        scheduler = InferenceScheduler(lambda sources, params: [], max_batch_size=4, max_wait_ms=1)
+
+        # Act & Assert
+        with self.assertRaises(RuntimeError):
+            scheduler.submit("img.jpg").result(timeout=5)
@@ -27,7 +27,7 @@ class TestLabelsEndpoint(unittest.TestCase):
         self.assertEqual(response.status_code, 200)
         data = response.json()
         self.assertEqual(data["labels"], [])
-        mock_get_unique_labels.assert_called_once_with(ANY)
+        mock_get_unique_labels.assert_called_once_with(ANY, 7)
     
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.labels_controller.get_unique_labels")
@@ -47,7 +47,7 @@ class TestLabelsEndpoint(unittest.TestCase):
         data = response.json()
         labels = data.get("labels", [])
         self.assertGreaterEqual(len(set(labels)), 2)
-        mock_get_unique_labels.assert_called_once_with(ANY)
+        mock_get_unique_labels.assert_called_once_with(ANY, 7)
         
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.labels_controller.get_unique_labels")
@@ -0,0 +1,62 @@
+import os
+import unittest
+import tempfile
+import importlib.util
+import numpy as np
+from services.model_backends import load_model, export_model
+from services.yolo_service import MODEL_NAME
+
+IMAGES = ["tests/assets/cat.jpg", "tests/assets/bear.jpg"]
+
+class TestModelBackends(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.export_dir = tempfile.TemporaryDirectory()
+        cls.torch_model = load_model(MODEL_NAME, "torch")
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.export_dir.cleanup()
+
+    def assert_parity(self, backend):
+        # Arrange
+        model = load_model(MODEL_NAME, backend, export_dir=self.export_dir.name)
+
+        # Act
+        expected = self.torch_model(IMAGES, device="cpu", batch=len(IMAGES), verbose=False)
+        actual = model(IMAGES, device="cpu", batch=len(IMAGES), verbose=False)
+
+        # Assert - same detection structure, same boxes up to float precision
+        self.assertEqual(model.names, self.torch_model.names)
+        self.assertEqual(len(actual), len(expected))
+        for a, e in zip(actual, expected):
+            self.assertEqual(a.orig_shape, e.orig_shape)
+            self.assertEqual(a.boxes.data.shape, e.boxes.data.shape)
+            np.testing.assert_allclose(a.boxes.xyxy.numpy(), e.boxes.xyxy.numpy(), atol=1.0)
+            np.testing.assert_allclose(a.boxes.conf.numpy(), e.boxes.conf.numpy(), atol=1e-2)
+            np.testing.assert_array_equal(a.boxes.cls.numpy(), e.boxes.cls.numpy())
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            load_model(MODEL_NAME, "tensorrt")
+
+    @unittest.skipUnless(importlib.util.find_spec("onnxruntime"), "onnxruntime is not installed")
+    def test_onnx_parity_with_torch(self):
+        self.assert_parity("onnx")
+
+    @unittest.skipUnless(importlib.util.find_spec("openvino"), "openvino is not installed")
+    def test_openvino_parity_with_torch(self):
+        self.assert_parity("openvino")
+
+    @unittest.skipUnless(importlib.util.find_spec("onnxruntime"), "onnxruntime is not installed")
+    def test_export_is_cached(self):
+        # Arrange
+        first = export_model(MODEL_NAME, "onnx", export_dir=self.export_dir.name)
+        exported_at = os.path.getmtime(first)
+
+        # Act
+        second = export_model(MODEL_NAME, "onnx", export_dir=self.export_dir.name)
+
+        # Assert
+        self.assertEqual(first, second)
+        self.assertEqual(os.path.getmtime(second), exported_at)
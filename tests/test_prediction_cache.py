@@ -0,0 +1,124 @@
+import os
+import unittest
+import tempfile
+import threading
+from unittest.mock import patch, Mock, ANY
+from services.prediction_cache import PredictionResultCache, cache_key
+from services.prediction_service import run_prediction
+
+ENTRY = {
+    "detections": [{"label": "cat", "score": 0.9, "box": [1.0, 2.0, 3.0, 4.0]}],
+    "predicted_image": "uploads/predicted/chat-cat.jpg",
+    "predicted_s3_key": "chat/predicted/cat.jpg",
+}
+
+class TestPredictionResultCache(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = PredictionResultCache(self.tmp.name, max_entries=2, max_disk_entries=2)
+
+    def test_cache_key_depends_on_content_model_and_params(self):
+        key = cache_key(b"image", "yolov8n.pt")
+        self.assertEqual(key, cache_key(b"image", "yolov8n.pt", {}))
+        self.assertNotEqual(key, cache_key(b"other image", "yolov8n.pt"))
+        self.assertNotEqual(key, cache_key(b"image", "yolov8s.pt"))
+        self.assertNotEqual(key, cache_key(b"image", "yolov8n.pt", {"conf": 0.5}))
+
+    def test_miss_then_hit(self):
+        self.assertIsNone(self.cache.get("key"))
+        self.cache.put("key", ENTRY)
+        self.assertEqual(self.cache.get("key"), ENTRY)
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_memory_tier_evicts_least_recently_used(self):
+        self.cache.put("a", ENTRY)
+        self.cache.put("b", ENTRY)
+        self.cache.get("a")
+        self.cache.put("c", ENTRY)
+
+        self.assertEqual(list(self.cache._entries), ["a", "c"])
+        self.assertGreaterEqual(self.cache.stats()["evictions"], 1)
+
+    def test_disk_tier_survives_restart(self):
+        self.cache.put("key", ENTRY)
+
+        restarted = PredictionResultCache(self.tmp.name, max_entries=2, max_disk_entries=2)
+
+        self.assertEqual(restarted.get("key"), ENTRY)
+        self.assertEqual(restarted.stats()["disk_hits"], 1)
+
+    def test_disk_tier_is_bounded(self):
+        for i, key in enumerate(["a", "b", "c"]):
+            self.cache.put(key, ENTRY)
+            os.utime(os.path.join(self.tmp.name, key + ".json"), (i, i))
+        self.cache._evict_disk()
+
+        self.assertEqual(sorted(os.listdir(self.tmp.name)), ["b.json", "c.json"])
+
+    def test_files_of_previous_runs_are_indexed_oldest_first(self):
+        for i, key in enumerate(["old", "new"]):
+            self.cache.put(key, ENTRY)
+            os.utime(os.path.join(self.tmp.name, key + ".json"), (i, i))
+
+        restarted = PredictionResultCache(self.tmp.name, max_entries=2, max_disk_entries=1)
+
+        self.assertEqual(os.listdir(self.tmp.name), ["new.json"])
+        self.assertEqual(restarted.stats()["disk_entries"], 1)
+
+    def test_concurrent_puts_stay_within_the_disk_budget(self):
+        cache = PredictionResultCache(self.tmp.name, max_entries=2, max_disk_entries=5)
+        errors = []
+
+        def write(i):
+            try:
+                for j in range(50):
+                    cache.put(f"key{(i + j) % 20}", ENTRY)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=write, args=(i,)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(len(os.listdir(self.tmp.name)), 5)
+        self.assertEqual(cache.stats()["disk_entries"], 5)
+
+    def test_failing_disk_write_is_logged_not_raised(self):
+        with patch("services.prediction_cache.json.dump", side_effect=OSError("disk full")):
+            with self.assertLogs("services.prediction_cache", level="ERROR"):
+                self.cache.put("key", ENTRY)
+
+        self.assertEqual(os.listdir(self.tmp.name), [])
+        self.assertEqual(self.cache.get("key"), ENTRY)
+
+
+class TestCachedPrediction(unittest.TestCase):
+    @patch("services.prediction_service.prediction_cache")
+    @patch("services.prediction_service.run_inference")
+    @patch("services.prediction_service.enqueue_upload")
+    @patch("services.prediction_service.download_from_s3")
+    @patch("services.prediction_service.save_detection_objects_dao")
+    def test_cache_hit_skips_inference(self, mock_save_detections, mock_download, mock_upload,
+                                       mock_run_inference, mock_cache):
+        # Arrange
+        mock_download.return_value = b"cat bytes"
+        mock_cache.get.return_value = ENTRY
+
+        # Act
+        result = run_prediction("uid", "chat", "cat.jpg", 7, Mock())
+
+        # Assert
+        mock_run_inference.assert_not_called()
+        mock_upload.assert_not_called()
+        mock_save_detections.assert_called_once_with(ANY, "uid", ENTRY["detections"], ANY)
+        self.assertTrue(result["cached"])
+        self.assertEqual(result["labels"], ["cat"])
+        self.assertEqual(result["predicted_s3_key"], "chat/predicted/cat.jpg")
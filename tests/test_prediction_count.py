@@ -33,7 +33,7 @@ class TestPredictionCount(unittest.TestCase):
         data = response.json()
         self.assertIn("prediction_count", data)
         self.assertIsInstance(data["prediction_count"], int)
-        mock_get_predictions_count.assert_called_once_with(ANY)
+        mock_get_predictions_count.assert_called_once_with(ANY, 7)
     
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.prediction_controller.get_predictions_count")
@@ -53,7 +53,7 @@ class TestPredictionCount(unittest.TestCase):
         
         # Assert
         self.assertEqual(data['prediction_count'], 0)
-        mock_get_predictions_count.assert_called_once_with(ANY)
+        mock_get_predictions_count.assert_called_once_with(ANY, 7)
     
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.prediction_controller.get_predictions_count")
@@ -73,7 +73,7 @@ class TestPredictionCount(unittest.TestCase):
         
         # Assert
         self.assertEqual(data['prediction_count'], 1)
-        mock_get_predictions_count.assert_called_once_with(ANY)
+        mock_get_predictions_count.assert_called_once_with(ANY, 7)
     
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.prediction_controller.get_predictions_count")
@@ -93,7 +93,7 @@ class TestPredictionCount(unittest.TestCase):
         
         # Assert
         self.assertEqual(data['prediction_count'], 3)
-        mock_get_predictions_count.assert_called_once_with(ANY)
+        mock_get_predictions_count.assert_called_once_with(ANY, 7)
     
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.prediction_controller.get_predictions_count")
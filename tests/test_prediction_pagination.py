@@ -0,0 +1,79 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from db.dao.predictions import save_prediction_batch_dao, get_all_predictions_by_label_dao
+from db.dao.detections import detection_row
+
+AUTH = {"Authorization": "Basic dXNlcjpwYXNz"}
+START = datetime(2026, 1, 1)
+
+
+class TestPredictionPagination(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+        self.client = TestClient(app)
+        # Five sessions an hour apart with two "person" detections each; "p4" and "p4b" share a timestamp
+        sessions, detections = [], []
+        for uid, hours in [("p0", 0), ("p1", 1), ("p2", 2), ("p3", 3), ("p4", 4), ("p4b", 4)]:
+            sessions.append({"uid": uid, "timestamp": START + timedelta(hours=hours),
+                             "original_image": "original.jpg", "predicted_image": "predicted.jpg"})
+            detections += [detection_row(uid, "person", 0.9, [0, 0, 10, 10]),
+                           detection_row(uid, "person", 0.4, [0, 0, 20, 20])]
+        save_prediction_batch_dao(self.db, sessions, detections)
+
+    def tearDown(self):
+        self.db.close()
+
+    def get(self, url):
+        with patch("middlewares.auth.verify_credentials", return_value=1):
+            return self.client.get(url, headers=AUTH)
+
+    def walk(self, url):
+        uids, cursor = [], None
+        while True:
+            response = self.get(url + (f"&cursor={cursor}" if cursor else ""))
+            self.assertEqual(response.status_code, 200)
+            uids.append([prediction["uid"] for prediction in response.json()])
+            cursor = response.headers.get("X-Next-Cursor")
+            if cursor is None:
+                return uids
+
+    def test_sessions_are_listed_once_newest_first(self):
+        predictions = get_all_predictions_by_label_dao(self.db, "person")
+
+        self.assertEqual([prediction.uid for prediction in predictions], ["p4b", "p4", "p3", "p2", "p1", "p0"])
+
+    def test_label_pages_follow_the_cursor(self):
+        pages = self.walk("/predictions/label/person?limit=4")
+
+        self.assertEqual(pages, [["p4b", "p4", "p3", "p2"], ["p1", "p0"]])
+
+    def test_pages_split_sessions_with_the_same_timestamp(self):
+        pages = self.walk("/predictions/score/0.8?limit=1")
+
+        self.assertEqual(pages, [["p4b"], ["p4"], ["p3"], ["p2"], ["p1"], ["p0"]])
+
+    def test_time_range(self):
+        since = (START + timedelta(hours=1)).isoformat()
+        until = (START + timedelta(hours=3)).isoformat()
+
+        response = self.get(f"/predictions/label/person?since={since}&until={until}")
+
+        self.assertEqual([prediction["uid"] for prediction in response.json()], ["p2", "p1"])
+        self.assertNotIn("X-Next-Cursor", response.headers)
+
+    def test_limit_is_capped(self):
+        with patch("services.prediction_service.PREDICTIONS_MAX_PAGE_SIZE", 2):
+            response = self.get("/predictions/label/person?limit=100")
+
+        self.assertEqual(len(response.json()), 2)
+        self.assertIn("X-Next-Cursor", response.headers)
+
+    def test_invalid_cursor_is_400(self):
+        response = self.get("/predictions/label/person?cursor=not-a-cursor")
+
+        self.assertEqual(response.status_code, 400)
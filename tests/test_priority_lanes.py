@@ -0,0 +1,184 @@
+import time
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch, Mock, ANY
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+from app import app
+from services.admission import AdmissionController
+from services.priority_lanes import LaneQueue, DeadlineExceeded, INTERACTIVE, BULK
+from services.prediction_service import run_prediction
+from services.yolo_service import InferenceScheduler
+from services.prediction_jobs import PredictionJobQueue
+
+
+class TestLaneQueue(unittest.TestCase):
+    def test_interactive_first_with_bulk_interleaved(self):
+        queue = LaneQueue(weight=2)
+        for i in range(4):
+            queue.append(f"i{i}", INTERACTIVE)
+            queue.append(f"b{i}", BULK)
+
+        order = [queue.popleft()[0] for _ in range(len(queue))]
+
+        self.assertEqual(order, ["i0", "i1", "b0", "i2", "i3", "b1", "b2", "b3"])
+
+
+class TestLaneScheduler(unittest.TestCase):
+    def setUp(self):
+        self.batches = []
+        self.gate = threading.Event()
+
+        def run_batch(sources, params):
+            self.gate.wait(timeout=5)
+            self.batches.append(list(sources))
+            return [f"result-{source}" for source in sources]
+
+        self.scheduler = InferenceScheduler(run_batch, max_batch_size=1, max_wait_ms=0, lane_weight=10)
+
+    def test_queued_interactive_jobs_overtake_bulk_jobs(self):
+        # Arrange - the first job holds the model while the others queue up
+        first = self.scheduler.submit("busy", lane=BULK)
+        time.sleep(0.05)
+        bulk = [self.scheduler.submit(f"bulk{i}", lane=BULK) for i in range(2)]
+        interactive = self.scheduler.submit("interactive")
+
+        # Act
+        self.gate.set()
+
+        # Assert
+        self.assertEqual(interactive.result(timeout=5), "result-interactive")
+        self.assertEqual([future.result(timeout=5) for future in [first, *bulk]],
+                         ["result-busy", "result-bulk0", "result-bulk1"])
+        self.assertEqual(self.batches, [["busy"], ["interactive"], ["bulk0"], ["bulk1"]])
+        self.assertEqual(self.scheduler.stats()[BULK]["completed"], 3)
+
+    def test_expired_jobs_never_reach_the_model(self):
+        first = self.scheduler.submit("busy")
+        time.sleep(0.05)
+        expiring = self.scheduler.submit("late", lane=BULK, deadline=time.monotonic() + 0.05)
+        time.sleep(0.1)
+
+        self.gate.set()
+
+        with self.assertRaises(DeadlineExceeded):
+            expiring.result(timeout=5)
+        first.result(timeout=5)
+        self.assertEqual(self.batches, [["busy"]])
+        self.assertEqual(self.scheduler.stats()[BULK]["expired"], 1)
+
+    def test_unknown_lane_is_rejected(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.submit("img.jpg", lane="urgent")
+
+
+class TestLaneJobQueue(unittest.TestCase):
+    def test_interactive_jobs_overtake_queued_bulk_jobs(self):
+        # Arrange - the only worker is busy while jobs pile up
+        queue = PredictionJobQueue(workers=1)
+        gate = threading.Event()
+        done = threading.Event()
+        ran = []
+        queue.submit(BULK, gate.wait, 5)
+        for name in ["bulk0", "bulk1"]:
+            queue.submit(BULK, ran.append, name)
+        queue.submit(INTERACTIVE, ran.append, "interactive")
+        queue.submit(BULK, done.set)
+
+        # Act
+        gate.set()
+
+        # Assert
+        self.assertTrue(done.wait(timeout=5))
+        self.assertEqual(ran, ["interactive", "bulk0", "bulk1"])
+        self.assertEqual(queue.stats()[BULK], {"queued": 0, "submitted": 4, "started": 4})
+
+
+class TestLaneAdmission(unittest.TestCase):
+    def make(self):
+        return AdmissionController(max_in_flight=1, max_queue=4, queue_timeout_s=1, rate_per_s=0, burst=0)
+
+    def test_released_slot_goes_to_the_interactive_lane(self):
+        controller = self.make()
+        admitted = []
+
+        async def wait(key, lane):
+            await controller.acquire(key, lane)
+            admitted.append(key)
+
+        async def scenario():
+            await controller.acquire("running")
+            bulk = asyncio.ensure_future(wait("bulk", BULK))
+            await asyncio.sleep(0.01)
+            interactive = asyncio.ensure_future(wait("interactive", INTERACTIVE))
+            await asyncio.sleep(0.01)
+            controller.release()
+            await interactive
+            controller.release()
+            await bulk
+
+        asyncio.run(scenario())
+        self.assertEqual(admitted, ["interactive", "bulk"])
+        self.assertEqual(controller.stats()["lanes"][BULK]["queued"], 1)
+
+    def test_waiting_past_the_deadline_is_504(self):
+        controller = self.make()
+
+        async def scenario():
+            await controller.acquire("running")
+            start = time.perf_counter()
+            with self.assertRaises(HTTPException) as error:
+                await controller.acquire("late", BULK, deadline=time.monotonic() + 0.05)
+            return error.exception, time.perf_counter() - start
+
+        error, waited = asyncio.run(scenario())
+        self.assertEqual(error.status_code, 504)
+        self.assertLess(waited, 0.5)
+        self.assertEqual(controller.stats()["waiting"], 0)
+        self.assertEqual(controller.stats()["lanes"][BULK]["expired"], 1)
+
+
+class TestDeadlines(unittest.TestCase):
+    def setUp(self):
+        self.client = TestClient(app)
+
+    @patch("services.prediction_service.run_inference")
+    @patch("services.prediction_service.download_from_s3")
+    def test_expired_prediction_skips_s3_and_the_model(self, mock_download, mock_run_inference):
+        with self.assertRaises(DeadlineExceeded):
+            run_prediction("uid", "chat", "cat.jpg", None, Mock(), deadline=time.monotonic() - 1)
+
+        mock_download.assert_not_called()
+        mock_run_inference.assert_not_called()
+
+    @patch("controllers.prediction_controller.create_prediction", side_effect=DeadlineExceeded())
+    def test_deadline_exceeded_is_504(self, mock_create_prediction):
+        response = self.client.post("/predict?chat_id=chat&img_name=cat.jpg", headers={"X-Deadline-Ms": "100"})
+
+        self.assertEqual(response.status_code, 504)
+
+    @patch("controllers.prediction_controller.enqueue_prediction")
+    def test_priority_and_deadline_headers_are_passed(self, mock_enqueue_prediction):
+        mock_enqueue_prediction.return_value = {"prediction_uid": "job-uid", "status": "pending"}
+
+        response = self.client.post("/predict?chat_id=chat&img_name=cat.jpg&async=true",
+                                    headers={"X-Priority": "bulk", "X-Deadline-Ms": "2000"})
+
+        self.assertEqual(response.status_code, 202)
+        mock_enqueue_prediction.assert_called_once_with("chat", "cat.jpg", ANY, ANY, {}, lane=BULK, deadline=ANY)
+        deadline = mock_enqueue_prediction.call_args.kwargs["deadline"]
+        self.assertAlmostEqual(deadline - time.monotonic(), 2, delta=0.5)
+
+    def test_invalid_headers_are_400(self):
+        for headers in [{"X-Priority": "urgent"}, {"X-Deadline-Ms": "soon"}, {"X-Deadline-Ms": "-5"}]:
+            response = self.client.post("/predict?chat_id=chat&img_name=cat.jpg", headers=headers)
+            self.assertEqual(response.status_code, 400, headers)
+
+    def test_metrics_report_the_lanes(self):
+        with patch("middlewares.auth.verify_credentials", return_value=1):
+            response = self.client.get("/metrics", headers={"Authorization": "Basic dXNlcjpwYXNz"})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(set(response.json()["inference_lanes"]), {INTERACTIVE, BULK})
+        self.assertIn("lanes", response.json()["admission"])
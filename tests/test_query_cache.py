@@ -0,0 +1,135 @@
+import time
+import unittest
+from unittest.mock import Mock, patch
+import fakeredis
+from fastapi.testclient import TestClient
+from app import app
+from db.utils import init_db, get_db
+from db.dao.predictions import save_prediction_session_dao
+from db.dao.detections import save_detection_object_dao
+from services.query_cache import QueryCache, MemoryCacheBackend, RedisCacheBackend, query_cache
+from services.prediction_service import delete_prediction_by_uid
+from services.stats_service import get_stats_data
+
+AUTH = {"Authorization": "Basic dXNlcjpwYXNz"}
+
+
+class QueryCacheBehaviour:
+    def make_backend(self):
+        raise NotImplementedError
+
+    def setUp(self):
+        self.cache = QueryCache(self.make_backend())
+        self.query = Mock(side_effect=lambda db, days=7: {"days": days, "calls": self.query.call_count})
+        self.cached_query = self.cache.cached("aggregates", 60, key=lambda db, days=7: f"stats:{days}")(self.query)
+
+    def test_results_are_cached_per_key(self):
+        self.assertEqual(self.cached_query("db", 7), {"days": 7, "calls": 1})
+        self.assertEqual(self.cached_query("other db", 7), {"days": 7, "calls": 1})
+        self.assertEqual(self.cached_query("db", 30), {"days": 30, "calls": 2})
+        self.assertEqual(self.cache.stats()["hits"], 1)
+
+    def test_invalidating_a_namespace_drops_every_key(self):
+        self.cached_query("db", 7)
+        self.cached_query("db", 30)
+
+        self.cache.invalidate("aggregates")
+
+        self.assertEqual(self.cached_query("db", 7)["calls"], 3)
+        self.assertEqual(self.cached_query("db", 30)["calls"], 4)
+
+    def test_invalidating_one_key(self):
+        self.cached_query("db", 7)
+        self.cached_query("db", 30)
+
+        self.cache.invalidate("aggregates", "stats:7")
+
+        self.assertEqual(self.cached_query("db", 7)["calls"], 3)
+        self.assertEqual(self.cached_query("db", 30)["calls"], 2)
+
+    def test_none_is_not_cached(self):
+        query = Mock(return_value=None)
+        cached_query = self.cache.cached("prediction", 60, key=lambda uid: uid)(query)
+
+        cached_query("uid")
+        cached_query("uid")
+
+        self.assertEqual(query.call_count, 2)
+
+
+class TestMemoryQueryCache(QueryCacheBehaviour, unittest.TestCase):
+    def make_backend(self):
+        return MemoryCacheBackend(max_entries=2)
+
+    def test_least_recently_used_entries_are_evicted(self):
+        for days in (1, 2, 3):
+            self.cached_query("db", days)
+
+        self.assertEqual(self.cached_query("db", 1)["calls"], 4)
+        self.assertEqual(self.cache.stats()["entries"], 2)
+
+    def test_entries_expire(self):
+        self.cached_query("db", 7)
+
+        with patch("services.query_cache.time.monotonic", return_value=time.monotonic() + 61):
+            self.assertEqual(self.cached_query("db", 7)["calls"], 2)
+
+
+class TestRedisQueryCache(QueryCacheBehaviour, unittest.TestCase):
+    def make_backend(self):
+        self.server = fakeredis.FakeServer()
+        return RedisCacheBackend(fakeredis.FakeRedis(server=self.server))
+
+    def test_entries_are_shared_between_processes(self):
+        self.cached_query("db", 7)
+        other = QueryCache(RedisCacheBackend(fakeredis.FakeRedis(server=self.server)))
+        other_query = other.cached("aggregates", 60, key=lambda db, days=7: f"stats:{days}")(self.query)
+
+        self.assertEqual(other_query("db", 7)["calls"], 1)
+        other.invalidate("aggregates")
+        self.assertEqual(self.cached_query("db", 7)["calls"], 2)
+
+
+class TestCachedEndpoints(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        query_cache.clear()
+        self.db = get_db().__next__()
+        self.client = TestClient(app)
+        save_prediction_session_dao(self.db, "uid", "original.jpg", "predicted.jpg", None)
+        save_detection_object_dao(self.db, "uid", "cat", 0.9, [0, 0, 1, 1])
+
+    def tearDown(self):
+        self.db.close()
+
+    def get(self, url, **headers):
+        with patch("middlewares.auth.verify_credentials", return_value=1):
+            return self.client.get(url, headers={**AUTH, **headers})
+
+    def test_prediction_is_read_once(self):
+        with patch("services.prediction_service.get_detection_objects_by_prediction_uid_dao",
+                   return_value=[]) as mock_objects:
+            first = self.get("/prediction/uid")
+            second = self.get("/prediction/uid")
+
+        self.assertEqual(first.json(), second.json())
+        mock_objects.assert_called_once()
+
+    def test_unchanged_response_is_304(self):
+        first = self.get("/stats")
+
+        second = self.get("/stats", **{"If-None-Match": first.headers["etag"]})
+
+        self.assertEqual(second.status_code, 304)
+        self.assertEqual(second.headers["etag"], first.headers["etag"])
+        self.assertEqual(second.content, b"")
+        self.assertEqual(self.get("/stats", **{"If-None-Match": '"stale"'}).status_code, 200)
+
+    def test_delete_invalidates_the_prediction_and_the_aggregates(self):
+        self.assertEqual(self.get("/prediction/uid").status_code, 200)
+        self.assertEqual(get_stats_data(self.db)["total_predictions"], 1)
+
+        delete_prediction_by_uid("uid", self.db)
+
+        self.assertEqual(self.get("/prediction/uid").status_code, 404)
+        self.assertEqual(get_stats_data(self.db)["total_predictions"], 0)
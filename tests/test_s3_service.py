@@ -0,0 +1,87 @@
+import os
+import unittest
+from unittest.mock import patch
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import HTTPException
+from moto import mock_aws
+from services import s3_service
+from services.s3_service import (S3_BUCKET, create_s3_client, get_s3_client, reset_s3_client,
+                                 download_from_s3, upload_to_s3, list_s3_keys)
+
+FAKE_AWS_ENV = {
+    "AWS_ACCESS_KEY_ID": "testing",
+    "AWS_SECRET_ACCESS_KEY": "testing",
+    "AWS_DEFAULT_REGION": "us-east-1",
+}
+
+
+class TestS3Service(unittest.TestCase):
+    def setUp(self):
+        # Runs against moto's in-memory S3 stand-in
+        self.env = patch.dict(os.environ, FAKE_AWS_ENV)
+        self.env.start()
+        self.mock_aws = mock_aws()
+        self.mock_aws.start()
+        reset_s3_client()
+        self.s3 = get_s3_client()
+        self.s3.create_bucket(Bucket=S3_BUCKET)
+
+    def tearDown(self):
+        reset_s3_client()
+        self.mock_aws.stop()
+        self.env.stop()
+
+    def test_listing_limit_counts_only_matching_keys(self):
+        for key in ["a/original/1.jpg", "a/predicted/1.jpg", "b/predicted/1.jpg", "b/original/1.jpg"]:
+            self.s3.put_object(Bucket=S3_BUCKET, Key=key, Body=b"x")
+
+        keys = list_s3_keys(self.s3, "", limit=2, match=lambda key: "/original/" in key)
+
+        self.assertEqual(keys, ["a/original/1.jpg", "b/original/1.jpg"])
+
+    def test_client_is_shared_and_configured(self):
+        self.assertIs(get_s3_client(), self.s3)
+        self.assertEqual(self.s3.meta.config.max_pool_connections, s3_service.S3_MAX_POOL_CONNECTIONS)
+        self.assertEqual(self.s3.meta.config.retries["mode"], s3_service.S3_RETRY_MODE)
+        self.assertTrue(self.s3.meta.config.tcp_keepalive)
+
+    def test_client_is_created_once_across_threads(self):
+        reset_s3_client()
+        with patch("services.s3_service.create_s3_client", wraps=create_s3_client) as mock_create:
+            with ThreadPoolExecutor(max_workers=8) as executor:
+                clients = list(executor.map(lambda _: get_s3_client(), range(32)))
+
+        self.assertEqual(mock_create.call_count, 1)
+        self.assertTrue(all(client is clients[0] for client in clients))
+
+    def test_upload_download_round_trip(self):
+        upload_to_s3(self.s3, "chat/original/cat.jpg", b"image bytes")
+
+        self.assertEqual(download_from_s3(self.s3, "chat/original/cat.jpg"), b"image bytes")
+
+    @patch("services.s3_service.S3_MULTIPART_THRESHOLD_MB", 5)
+    @patch("services.s3_service.S3_MULTIPART_CHUNKSIZE_MB", 5)
+    @patch("services.s3_service._transfer_config", None)
+    def test_large_files_use_multipart_transfers(self):
+        data = os.urandom(12 * 1024 * 1024)
+
+        upload_to_s3(self.s3, "chat/original/big.jpg", data)
+
+        # multipart uploads get an ETag of the form <md5>-<parts>
+        etag = self.s3.head_object(Bucket=S3_BUCKET, Key="chat/original/big.jpg")["ETag"]
+        self.assertTrue(etag.strip('"').endswith("-3"))
+        self.assertEqual(download_from_s3(self.s3, "chat/original/big.jpg"), data)
+
+    def test_missing_object_is_404(self):
+        with self.assertRaises(HTTPException) as ctx:
+            download_from_s3(self.s3, "chat/original/missing.jpg")
+        self.assertEqual(ctx.exception.status_code, 404)
+
+    def test_list_keys(self):
+        for name in ("a.jpg", "b.jpg", "c.jpg"):
+            upload_to_s3(self.s3, f"chat/original/{name}", b"x")
+        upload_to_s3(self.s3, "other/original/d.jpg", b"x")
+
+        self.assertEqual(list_s3_keys(self.s3, "chat/"), ["chat/original/a.jpg", "chat/original/b.jpg",
+                                                          "chat/original/c.jpg"])
+        self.assertEqual(len(list_s3_keys(self.s3, "chat/", limit=2)), 2)
@@ -34,7 +34,7 @@ class TestStatsEndpoint(unittest.TestCase):
         self.assertEqual(data["total_predictions"], 0)
         self.assertEqual(data["average_confidence_score"], 0.0)
         self.assertEqual(data["most_common_labels"], {})
-        mock_get_stats.assert_called_once_with(ANY)
+        mock_get_stats.assert_called_once_with(ANY, 7)
 
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.stats_controller.get_stats_data")
@@ -56,7 +56,7 @@ class TestStatsEndpoint(unittest.TestCase):
         self.assertIsInstance(data["average_confidence_score"], float)
         self.assertIsInstance(data["most_common_labels"], dict)
         self.assertGreaterEqual(len(data["most_common_labels"]), 1)
-        mock_get_stats.assert_called_once_with(ANY)
+        mock_get_stats.assert_called_once_with(ANY, 7)
 
     @patch("middlewares.auth.verify_credentials")
     @patch("controllers.stats_controller.get_stats_data")
@@ -79,7 +79,7 @@ class TestStatsEndpoint(unittest.TestCase):
         self.assertIsInstance(data["average_confidence_score"], float)
         self.assertIsInstance(data["most_common_labels"], dict)
         self.assertGreaterEqual(len(data["most_common_labels"]), 1)
-        mock_get_stats.assert_called_once_with(ANY)
+        mock_get_stats.assert_called_once_with(ANY, 7)
 
     # Add two predictions with the same shape, one with a different
     @patch("middlewares.auth.verify_credentials")
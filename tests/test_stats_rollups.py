@@ -0,0 +1,102 @@
+import unittest
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import event
+from fastapi.testclient import TestClient
+from app import app
+from db.setup_db import engine
+from db.utils import init_db, get_db
+from db.dao.predictions import save_prediction_session_dao, save_prediction_batch_dao, delete_prediction_by_uid_dao
+from db.dao.detections import save_detection_object_dao, save_detection_objects_dao, detection_row
+from db.dao.stats import rebuild_stats_rollups_dao
+from models.stats_rollup import LabelHourlyStats, PredictionHourlyStats
+from services.stats_service import get_stats_data
+from services.labels_service import get_unique_labels
+from services.query_cache import query_cache
+
+AUTH = {"Authorization": "Basic dXNlcjpwYXNz"}
+
+
+class TestStatsRollups(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        query_cache.clear()
+        self.db = get_db().__next__()
+        self.old = datetime.utcnow() - timedelta(days=10)
+        save_prediction_session_dao(self.db, "a", "a.jpg", "a-predicted.jpg", None)
+        save_detection_object_dao(self.db, "a", "cat", 0.9, [0, 0, 1, 1])
+        save_detection_objects_dao(self.db, "b", [{"label": "cat", "score": 0.5, "box": [0, 0, 1, 1]},
+                                                  {"label": "dog", "score": 0.4, "box": [0, 0, 1, 1]}],
+                                   session={"original_image": "b.jpg", "predicted_image": "b-predicted.jpg"})
+        save_prediction_batch_dao(self.db, [{"uid": "old", "timestamp": self.old, "original_image": "old.jpg",
+                                             "predicted_image": "old-predicted.jpg"}],
+                                  [{**detection_row("old", "bird", 0.3, [0, 0, 1, 1]), "timestamp": self.old}])
+
+    def tearDown(self):
+        self.db.close()
+
+    def rollups(self):
+        labels = {(row.hour, row.label): (row.count, round(row.score_sum, 6), row.score_min, row.score_max)
+                  for row in self.db.query(LabelHourlyStats)}
+        sessions = {row.hour: row.count for row in self.db.query(PredictionHourlyStats)}
+        return labels, sessions
+
+    def test_inserts_update_the_rollups(self):
+        stats = get_stats_data(self.db, days=7)
+
+        self.assertEqual(stats, {"total_predictions": 2, "average_confidence_score": 0.6,
+                                 "most_common_labels": {"cat": 2, "dog": 1}})
+        self.assertEqual(sorted(get_unique_labels(self.db, days=7)), ["cat", "dog"])
+
+    def test_days_widen_the_window(self):
+        stats = get_stats_data(self.db, days=30)
+
+        self.assertEqual(stats["total_predictions"], 3)
+        self.assertEqual(stats["most_common_labels"]["bird"], 1)
+        self.assertEqual(sorted(get_unique_labels(self.db, days=30)), ["bird", "cat", "dog"])
+
+    def test_delete_recomputes_the_hour(self):
+        delete_prediction_by_uid_dao(self.db, "a")
+
+        labels, sessions = self.rollups()
+        cat = [value for (hour, label), value in labels.items() if label == "cat"]
+        self.assertEqual(cat, [(1, 0.5, 0.5, 0.5)])
+        self.assertEqual(sum(sessions.values()), 2)
+
+    def test_rebuild_matches_the_incremental_rollups(self):
+        incremental = self.rollups()
+        self.db.query(LabelHourlyStats).delete()
+        self.db.query(PredictionHourlyStats).delete()
+
+        rebuild_stats_rollups_dao(self.db)
+        self.db.commit()
+
+        self.assertEqual(self.rollups(), incremental)
+
+    def test_stats_read_only_the_rollups(self):
+        statements = []
+        capture = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            get_stats_data(self.db)
+            get_unique_labels(self.db)
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+        self.assertTrue(statements)
+        for statement in statements:
+            self.assertNotIn("detection_objects", statement)
+            self.assertNotIn("prediction_sessions", statement)
+
+    @patch("middlewares.auth.verify_credentials", return_value=1)
+    def test_endpoints_accept_days(self, mock_verify_credentials):
+        client = TestClient(app)
+
+        stats = client.get("/stats?days=30", headers=AUTH).json()
+        count = client.get("/prediction/count?days=30", headers=AUTH).json()
+        labels = client.get("/labels?days=1", headers=AUTH).json()
+
+        self.assertEqual(stats["total_predictions"], 3)
+        self.assertEqual(count, {"prediction_count": 3})
+        self.assertEqual(sorted(labels["labels"]), ["cat", "dog"])
+        self.assertEqual(client.get("/stats?days=0", headers=AUTH).status_code, 422)
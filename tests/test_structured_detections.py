@@ -0,0 +1,155 @@
+import os
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from unittest.mock import patch
+from sqlalchemy import create_engine, event, inspect, text
+from fastapi.testclient import TestClient
+from app import app
+from db.setup_db import engine
+from db.utils import init_db, get_db
+from db.dao.predictions import (save_prediction_session_dao,
+                                get_predictions_count_dao,
+                                get_all_predictions_by_label_dao,
+                                get_all_predictions_by_score_dao,
+                                get_predictions_by_region_dao,
+                                get_predictions_by_min_area_dao)
+from db.dao.detections import (save_detection_object_dao,
+                               get_detection_objects_by_prediction_uid_dao,
+                               get_average_detection_score_since,
+                               get_most_common_labels_since,
+                               get_unique_labels_since_dao)
+from db.migrations.structured_detections import upgrade
+
+AUTH = {"Authorization": "Basic dXNlcjpwYXNz"}
+
+
+class TestStructuredDetections(unittest.TestCase):
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+        save_prediction_session_dao(self.db, "small", "original.jpg", "predicted.jpg", None)
+        save_detection_object_dao(self.db, "small", "cat", 0.9, [10.0, 10.0, 20.0, 20.0])
+        save_prediction_session_dao(self.db, "large", "original.jpg", "predicted.jpg", None)
+        save_detection_object_dao(self.db, "large", "dog", 0.8, [100.0, 100.0, 300.0, 200.0])
+        save_detection_object_dao(self.db, "large", "cat", 0.7, [0.0, 0.0, 50.0, 50.0])
+
+    def tearDown(self):
+        self.db.close()
+
+    def uids(self, predictions):
+        return sorted(prediction.uid for prediction in predictions)
+
+    def test_box_is_stored_as_numbers(self):
+        obj = get_detection_objects_by_prediction_uid_dao(self.db, "large")[0]
+
+        self.assertEqual((obj.x1, obj.y1, obj.x2, obj.y2, obj.area), (100.0, 100.0, 300.0, 200.0, 20000.0))
+        self.assertEqual(obj.box, "[100.0, 100.0, 300.0, 200.0]")
+
+    def test_region_queries(self):
+        self.assertEqual(self.uids(get_predictions_by_region_dao(self.db, 15, 15, 40, 40)), ["large", "small"])
+        self.assertEqual(self.uids(get_predictions_by_region_dao(self.db, 15, 15, 40, 40, contained=True)), [])
+        self.assertEqual(self.uids(get_predictions_by_region_dao(self.db, 0, 0, 25, 25, contained=True)), ["small"])
+        self.assertEqual(self.uids(get_predictions_by_region_dao(self.db, 150, 150, 160, 160, label="dog")),
+                         ["large"])
+
+    def test_min_area_query(self):
+        self.assertEqual(self.uids(get_predictions_by_min_area_dao(self.db, 2500)), ["large"])
+        self.assertEqual(self.uids(get_predictions_by_min_area_dao(self.db, 1)), ["large", "small"])
+
+    @patch("middlewares.auth.verify_credentials", return_value=1)
+    def test_endpoints(self, mock_verify_credentials):
+        client = TestClient(app)
+
+        region = client.get("/predictions/region?x1=0&y1=0&x2=25&y2=25&contained=true", headers=AUTH)
+        area = client.get("/predictions/area/2500", headers=AUTH)
+        invalid = client.get("/predictions/region?x1=50&y1=0&x2=25&y2=25", headers=AUTH)
+        empty = client.get("/predictions/area/1000000", headers=AUTH)
+
+        self.assertEqual([prediction["uid"] for prediction in region.json()], ["small"])
+        self.assertEqual([prediction["uid"] for prediction in area.json()], ["large"])
+        self.assertEqual(invalid.status_code, 400)
+        self.assertEqual(empty.status_code, 404)
+
+
+class TestQueryPlans(unittest.TestCase):
+    """
+    The listing and stats queries must search an index instead of scanning detection_objects
+    """
+
+    def setUp(self):
+        init_db()
+        self.db = get_db().__next__()
+
+    def tearDown(self):
+        self.db.close()
+
+    @contextmanager
+    def captured_queries(self):
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                statements.append((statement, parameters))
+
+        event.listen(engine, "before_cursor_execute", capture)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, "before_cursor_execute", capture)
+
+    def assert_uses_indexes(self, dao, *args):
+        with self.captured_queries() as statements:
+            dao(self.db, *args)
+        self.assertTrue(statements)
+        for statement, parameters in statements:
+            plan = self.db.connection().exec_driver_sql("EXPLAIN QUERY PLAN " + statement, parameters).fetchall()
+            details = [row[-1] for row in plan]
+            for detail in details:
+                if "detection_objects" in detail or "prediction_sessions" in detail:
+                    self.assertIn("USING", detail, f"{dao.__name__} scans a table: {details}")
+
+    def test_queries_use_indexes(self):
+        since = datetime.utcnow() - timedelta(days=7)
+        self.assert_uses_indexes(get_all_predictions_by_label_dao, "cat")
+        self.assert_uses_indexes(get_all_predictions_by_score_dao, 0.5)
+        self.assert_uses_indexes(get_all_predictions_by_label_dao, "cat", 100, (datetime.utcnow(), "uid"), since)
+        self.assert_uses_indexes(get_predictions_by_min_area_dao, 100.0)
+        self.assert_uses_indexes(get_predictions_by_region_dao, 0, 0, 100, 100)
+        self.assert_uses_indexes(get_predictions_count_dao, since)
+        self.assert_uses_indexes(get_average_detection_score_since, since)
+        self.assert_uses_indexes(get_most_common_labels_since, since)
+        self.assert_uses_indexes(get_unique_labels_since_dao, since)
+
+
+class TestStructuredDetectionsMigration(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.engine = create_engine(f"sqlite:///{os.path.join(self.tmp.name, 'legacy.db')}")
+        # The tables as they were before the numeric box columns and indexes
+        with self.engine.begin() as conn:
+            conn.execute(text("CREATE TABLE prediction_sessions (uid VARCHAR PRIMARY KEY, user_id INTEGER, "
+                              "timestamp DATETIME, original_image VARCHAR, predicted_image VARCHAR)"))
+            conn.execute(text("CREATE TABLE detection_objects (id INTEGER PRIMARY KEY, prediction_uid VARCHAR, "
+                              "label VARCHAR, score FLOAT, box VARCHAR, timestamp DATETIME)"))
+            conn.execute(text("INSERT INTO detection_objects (prediction_uid, label, score, box) VALUES "
+                              "('uid', 'cat', 0.9, '[10.0, 20.0, 30.0, 60.0]'), "
+                              "('uid', 'dog', 0.8, '[0, 0, 5, 5]')"))
+
+    def tearDown(self):
+        self.engine.dispose()
+        self.tmp.cleanup()
+
+    def test_adds_columns_backfills_and_indexes(self):
+        # Act
+        backfilled = upgrade(self.engine, batch_size=1)
+        rerun = upgrade(self.engine)
+
+        # Assert
+        self.assertEqual((backfilled, rerun), (2, 0))
+        with self.engine.connect() as conn:
+            rows = conn.execute(text("SELECT x1, y1, x2, y2, area FROM detection_objects ORDER BY id")).all()
+        self.assertEqual([tuple(row) for row in rows], [(10.0, 20.0, 30.0, 60.0, 800.0), (0.0, 0.0, 5.0, 5.0, 25.0)])
+        indexes = {index["name"] for index in inspect(self.engine).get_indexes("detection_objects")}
+        self.assertIn("ix_detection_objects_label_prediction_uid", indexes)
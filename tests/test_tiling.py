@@ -0,0 +1,53 @@
+import unittest
+import numpy as np
+import torch
+from services.tiling import tile_origins, slice_image, merge_tile_detections, run_tiled_inference
+from services.prediction_service import decode_image
+
+class TestTiling(unittest.TestCase):
+    def test_tile_origins_cover_the_image(self):
+        self.assertEqual(tile_origins(1000, 400, 100), [0, 300, 600])
+        self.assertEqual(tile_origins(1100, 400, 100), [0, 300, 600, 700])
+        self.assertEqual(tile_origins(300, 400, 100), [0])
+
+    def test_slice_image(self):
+        image = np.zeros((500, 900, 3), dtype=np.uint8)
+
+        tiles = slice_image(image, 400, 100)
+
+        self.assertEqual([offset for offset, _ in tiles],
+                         [(0, 0), (300, 0), (500, 0), (0, 100), (300, 100), (500, 100)])
+        self.assertTrue(all(tile.shape == (400, 400, 3) for _, tile in tiles))
+
+    def test_merge_shifts_boxes_and_drops_cross_tile_duplicates(self):
+        # Arrange - the same object seen by two overlapping tiles, plus a distinct one
+        first_tile = torch.tensor([[300.0, 10.0, 380.0, 90.0, 0.9, 1.0]])
+        second_tile = torch.tensor([[2.0, 12.0, 80.0, 90.0, 0.8, 1.0],
+                                    [200.0, 200.0, 250.0, 250.0, 0.7, 2.0]])
+
+        # Act
+        merged = merge_tile_detections([first_tile, second_tile], [(0, 0), (300, 0)], iou=0.5)
+
+        # Assert
+        self.assertEqual(merged.shape, (2, 6))
+        np.testing.assert_allclose(merged[0].numpy(), [300.0, 10.0, 380.0, 90.0, 0.9, 1.0])
+        np.testing.assert_allclose(merged[1].numpy(), [500.0, 200.0, 550.0, 250.0, 0.7, 2.0])
+
+    def test_tiled_inference_returns_boxes_in_image_coordinates(self):
+        # Arrange
+        with open("tests/assets/cat.jpg", "rb") as f:
+            image = decode_image(f.read())
+
+        # Act
+        results = run_tiled_inference(image, tile_size=640, overlap=64, batch_size=8, max_det=100)
+
+        # Assert
+        result = results[0]
+        height, width = image.shape[:2]
+        self.assertEqual(result.orig_shape, (height, width))
+        self.assertLessEqual(len(result.boxes), 100)
+        self.assertGreater(len(result.boxes), 0)
+        boxes = result.boxes.xyxy
+        self.assertTrue(bool((boxes[:, [0, 2]] <= width).all() and (boxes[:, [1, 3]] <= height).all()))
+        # boxes from tiles beyond the first are shifted into place
+        self.assertGreater(float(boxes[:, 2].max()), 640)
@@ -0,0 +1,77 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import Mock, patch
+from services.upload_queue import UploadQueue
+
+class TestUploadQueue(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.upload = Mock()
+        self.on_status = Mock()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_queue(self, **kwargs):
+        return UploadQueue(self.tmp.name, self.upload, self.on_status, workers=2, backoff_s=0.01, **kwargs)
+
+    def queued_files(self):
+        return [name for name in os.listdir(self.tmp.name) if name != "failed"]
+
+    def test_upload_runs_in_the_background(self):
+        # Arrange
+        queue = self.make_queue()
+
+        # Act
+        queue.put("uid", "chat/predicted/cat.jpg", b"image bytes")
+
+        # Assert
+        self.assertTrue(queue.wait_idle(timeout=5))
+        self.upload.assert_called_once_with("chat/predicted/cat.jpg", b"image bytes")
+        self.on_status.assert_called_once_with("uid", "uploaded")
+        self.assertEqual(self.queued_files(), [])
+
+    def test_failed_uploads_are_retried_with_backoff(self):
+        # Arrange
+        self.upload.side_effect = [ConnectionError("slow down"), ConnectionError("slow down"), None]
+        queue = self.make_queue()
+
+        # Act
+        queue.put("uid", "chat/predicted/cat.jpg", b"image bytes")
+
+        # Assert
+        self.assertTrue(queue.wait_idle(timeout=5))
+        self.assertEqual(self.upload.call_count, 3)
+        self.on_status.assert_called_once_with("uid", "uploaded")
+        self.assertEqual(queue.stats()["retries"], 2)
+
+    def test_gives_up_after_max_attempts(self):
+        # Arrange
+        self.upload.side_effect = ConnectionError("S3 is down")
+        queue = self.make_queue(max_attempts=3)
+
+        # Act
+        queue.put("uid", "chat/predicted/cat.jpg", b"image bytes")
+
+        # Assert
+        self.assertTrue(queue.wait_idle(timeout=5))
+        self.assertEqual(self.upload.call_count, 3)
+        self.on_status.assert_called_once_with("uid", "failed")
+        self.assertEqual(self.queued_files(), [])
+        self.assertEqual(len(os.listdir(os.path.join(self.tmp.name, "failed"))), 2)
+
+    def test_queued_uploads_survive_a_restart(self):
+        # Arrange - a job persisted by a process that stopped before uploading it
+        stopped = self.make_queue()
+        with patch.object(stopped, "start"):
+            stopped.put("uid", "chat/predicted/cat.jpg", b"image bytes")
+
+        # Act
+        restarted = self.make_queue()
+        restarted.start()
+
+        # Assert
+        self.assertTrue(restarted.wait_idle(timeout=5))
+        self.upload.assert_called_once_with("chat/predicted/cat.jpg", b"image bytes")
+        self.on_status.assert_called_once_with("uid", "uploaded")